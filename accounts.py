@@ -1,5 +1,5 @@
 from app.app import create_app
-from flask import current_app
+from flask import current_app, g
 from flask_sqlalchemy import get_debug_queries
 
 
@@ -24,6 +24,13 @@ def after_request(response):
     return response
 
 
+@app.teardown_request
+def teardown_request(exception):
+    """Logs database commit count per every client request.
+    Unit of work commits after the response is made, so it's done on teardown"""
+    current_app.logger.info(f'COMMITS COUNT: {g.get("commit_count", 0)}')
+
+
 from app.storage.sqlalchemy import db
 from app.models.sqlalchemy.bank_account import BankAccount
 
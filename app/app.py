@@ -3,11 +3,24 @@ from flask_injector import FlaskInjector
 from flask_restful import Api
 from injector import Injector
 
+from app.commands import register_commands
 from app.dependency_injection import SQLAlchemyModule
 from app.exceptions import (AppException, api_exception_handler,
                             app_exception_handler)
-from app.resources.customer import CustomerResource, CustomersResource
-from config import AppConfig, update_config_class
+from app.resources.bank_account import (BalanceWriteBehindMetricsResource,
+                                        BankAccountBalanceBatchResource,
+                                        BankAccountCoalescingMetricsResource,
+                                        BankAccountFilterMetricsResource,
+                                        BankAccountLedgerResource)
+from app.resources.customer import (CustomerCacheMetricsResource,
+                                    CustomerCoalescingMetricsResource,
+                                    CustomerFilterMetricsResource,
+                                    CustomerResource, CustomersBatchResource,
+                                    CustomersBulkResource,
+                                    CustomersExportResource, CustomersResource)
+from app.resources.transfer import TransfersResource
+from app.storage.sqlalchemy import bind_unit_of_work_to_requests
+from config import AppConfig, update_config_class, validate_config
 
 api = Api()
 
@@ -16,20 +29,49 @@ def create_app(config_class: object = AppConfig, dotenv_filename: str = ''):
     app = Flask(__name__)
 
     app.config.from_object(update_config_class(dotenv_filename, config_class))
+    validate_config(app.config)
 
     api.add_resource(CustomersResource, '/api/customers/', endpoint='customers')
+    api.add_resource(CustomersBulkResource, '/api/customers/bulk', endpoint='customers_bulk')
+    api.add_resource(CustomersBatchResource, '/api/customers/batch', endpoint='customers_batch')
     api.add_resource(CustomerResource, '/api/customers/<string:uuid>', endpoint='customer')
+    api.add_resource(CustomersExportResource, '/api/export/customers.ndjson', endpoint='customers_export')
+    api.add_resource(
+        BankAccountBalanceBatchResource, '/api/accounts/balance-batch', endpoint='bank_account_balance_batch'
+    )
+    api.add_resource(BankAccountLedgerResource, '/api/accounts/<string:iban>/ledger', endpoint='bank_account_ledger')
+    api.add_resource(TransfersResource, '/api/transfers', endpoint='transfers')
+    api.add_resource(
+        BalanceWriteBehindMetricsResource, '/api/metrics/balance-write-behind', endpoint='balance_write_behind_metrics'
+    )
+    api.add_resource(CustomerCacheMetricsResource, '/api/metrics/customer-cache', endpoint='customer_cache_metrics')
+    api.add_resource(CustomerFilterMetricsResource, '/api/metrics/customer-filter', endpoint='customer_filter_metrics')
+    api.add_resource(
+        BankAccountFilterMetricsResource, '/api/metrics/bank-account-filter', endpoint='bank_account_filter_metrics'
+    )
+    api.add_resource(
+        CustomerCoalescingMetricsResource, '/api/metrics/customer-coalescing', endpoint='customer_coalescing_metrics'
+    )
+    api.add_resource(
+        BankAccountCoalescingMetricsResource,
+        '/api/metrics/bank-account-coalescing',
+        endpoint='bank_account_coalescing_metrics'
+    )
     api.init_app(app)
 
     app.errorhandler(400)(api_exception_handler)
     app.errorhandler(422)(api_exception_handler)
     app.errorhandler(AppException)(app_exception_handler)
 
+    bind_unit_of_work_to_requests(app)
+    register_commands(app)
+
     injector = Injector([SQLAlchemyModule(app=app, config=app.config)])
     FlaskInjector(app=app, injector=injector)
+    app.extensions['injector'] = injector
 
     return app
 
 
-from app.models.sqlalchemy import (bank_account, bank_card, customer,
-                                   many_to_many)
+from app.models.sqlalchemy import (balance_shard, bank_account, bank_card,
+                                   customer, ledger, many_to_many)
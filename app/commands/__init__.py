@@ -0,0 +1,15 @@
+from flask import Flask
+
+from app.commands.export import export_command
+from app.commands.hot_account import hot_account_command
+from app.commands.import_customers import import_customers_command
+from app.commands.ledger import compact_ledger_command
+from app.commands.snapshot import snapshot_command
+
+
+def register_commands(app: Flask):
+    app.cli.add_command(compact_ledger_command)
+    app.cli.add_command(hot_account_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_customers_command)
+    app.cli.add_command(snapshot_command)
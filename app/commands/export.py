@@ -0,0 +1,24 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.services.customer import CustomerService
+from app.utils.json_stream import dump_ndjson
+
+
+@click.command('export')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='NDJSON file to write, standard output by default.')
+@with_appcontext
+def export_command(output):
+    """Exports every customer with bank accounts and cards as NDJSON, one customer per line"""
+    service = current_app.extensions['injector'].get(CustomerService)
+
+    def report_throughput(count: int, duration: float):
+        click.echo(
+            f'Exported {count} customers in {duration:.2f}s, {count / duration if duration else 0:.0f} customers/sec.',
+            err=True
+        )
+
+    for chunk in dump_ndjson(service.export(), on_finish=report_throughput):
+        output.write(chunk)
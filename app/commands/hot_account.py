@@ -0,0 +1,42 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.exceptions import AppException
+from app.services.bank_account import BankAccountService
+
+
+@click.group('hot-account')
+def hot_account_command():
+    """Manages sharded balances of heavily updated bank accounts"""
+
+
+@hot_account_command.command('promote')
+@click.argument('iban')
+@click.option('--shards', type=click.IntRange(min=1), help='Number of shards, HOT_ACCOUNT_SHARDS by default.')
+@with_appcontext
+def promote_command(iban, shards):
+    """Spreads balance changes of the bank account over several shards"""
+    service = current_app.extensions['injector'].get(BankAccountService)
+
+    try:
+        shard_count = service.promote_to_hot(iban, shards)
+    except AppException as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'Bank account {iban} is hot with {shard_count} shards.')
+
+
+@hot_account_command.command('demote')
+@click.argument('iban')
+@with_appcontext
+def demote_command(iban):
+    """Folds the shards back into the balance of the bank account"""
+    service = current_app.extensions['injector'].get(BankAccountService)
+
+    try:
+        service.demote_from_hot(iban)
+    except AppException as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'Bank account {iban} is regular.')
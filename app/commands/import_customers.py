@@ -0,0 +1,101 @@
+import csv
+import io
+import os
+import time
+from itertools import islice
+from typing import IO, Iterator
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from marshmallow import ValidationError
+
+from app.schemas.customer import CustomerCreateSchema
+from app.services.customer import CustomerService
+from app.utils.json_stream import iter_ndjson
+
+FORMATS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def iter_csv(stream: IO[bytes]) -> Iterator[dict]:
+    """Yields CSV rows with customer columns and currency and balance of the bank account
+    in the shape of customer creation request"""
+    for row in csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''), restkey='unnamed_columns'):
+        bank_account = {'currency': row.pop('currency', None)}
+
+        balance = row.pop('balance', None)
+        if balance:
+            bank_account['balance'] = balance
+
+        row['bank_account'] = bank_account
+
+        yield row
+
+
+@click.command('import-customers')
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+              help='Format of the file, guessed from its extension by default.')
+@click.option('--batch-size', type=click.IntRange(min=1),
+              help='Rows imported in one transaction, CUSTOMER_IMPORT_BATCH_SIZE by default.')
+@with_appcontext
+def import_customers_command(file, file_format, batch_size):
+    """Imports customers with bank accounts from CSV file with passport_number, first_name, last_name,
+    email, currency and balance columns or from NDJSON file of customer creation requests.
+    Every batch is committed on its own, customers whose passport number is taken are skipped,
+    so the import can be restarted after failure"""
+    if file_format is None:
+        file_format = FORMATS.get(os.path.splitext(file.name)[1].lower())
+
+        if file_format is None:
+            raise click.BadParameter("Can't guess format from file extension, use --format.", param_hint='FILE')
+
+    service = current_app.extensions['injector'].get(CustomerService)
+    schema = CustomerCreateSchema()
+    batch_size = batch_size or int(current_app.config['CUSTOMER_IMPORT_BATCH_SIZE'])
+
+    rows = enumerate(iter_csv(file) if file_format == 'csv' else iter_ndjson(file), start=1)
+    processed, created, duplicates, invalid = 0, 0, 0, 0
+    started_at = time.perf_counter()
+
+    def report_error(number: int, error):
+        nonlocal invalid
+
+        invalid += 1
+        click.echo(f'Row {number}: {error}', err=True)
+
+    while batch := list(islice(rows, batch_size)):
+        numbers, items = [], []
+
+        for number, row in batch:
+            try:
+                items.append(schema.load(row))
+                numbers.append(number)
+            except ValidationError as e:
+                report_error(number, e.messages)
+
+        for number, result in zip(numbers, service.import_batch(items) if items else []):
+            if 'uuid' in result:
+                created += 1
+            elif result['error'] == 'Customer already exist!':
+                duplicates += 1
+            else:
+                report_error(number, result['error'])
+
+        processed += len(batch)
+        duration = time.perf_counter() - started_at
+        click.echo(
+            f'Processed {processed} rows: {created} created, {duplicates} duplicates, {invalid} invalid, '
+            f'{processed / duration if duration else 0:.0f} rows/sec.',
+            err=True
+        )
+
+    duration = time.perf_counter() - started_at
+    click.echo(
+        f'Imported {created} customers in {duration:.2f}s, {processed / duration if duration else 0:.0f} rows/sec.',
+        err=True
+    )
@@ -0,0 +1,16 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.services.bank_account import BankAccountService
+
+
+@click.command('compact-ledger')
+@with_appcontext
+def compact_ledger_command():
+    """Folds ledger entries into bank account balances. Meant to be run periodically, e.g. by cron"""
+    service = current_app.extensions['injector'].get(BankAccountService)
+
+    snapshots = service.compact_ledger()
+
+    click.echo(f'Compacted ledger of {snapshots} bank accounts.')
@@ -0,0 +1,37 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.services.snapshot import SnapshotService
+from app.utils.columnar_writer import FILE_EXTENSIONS
+
+
+@click.command('snapshot')
+@click.option('--output', '-o', type=click.Path(file_okay=False),
+              help='Directory of snapshots, SNAPSHOT_DIRECTORY by default.')
+@click.option('--workers', type=click.IntRange(min=1),
+              help='Number of worker processes and of partitions per table, SNAPSHOT_WORKERS by default.')
+@click.option('--format', 'file_format', type=click.Choice(list(FILE_EXTENSIONS)), default='parquet',
+              show_default=True, help='Format of partition files.')
+@click.option('--incremental', is_flag=True,
+              help='Export only the rows changed since the latest snapshot in the directory.')
+@with_appcontext
+def snapshot_command(output, workers, file_format, incremental):
+    """Exports bank accounts and bank cards into compressed columnar files with a manifest,
+    so that analytics read the files instead of querying the database"""
+    service = current_app.extensions['injector'].get(SnapshotService)
+
+    started_at = time.perf_counter()
+    manifest = service.create(output, workers, file_format, incremental)
+    duration = time.perf_counter() - started_at
+
+    rows = sum(table['rows'] for table in manifest['tables'].values())
+    counts = ', '.join(f'{table["rows"]} {name} rows' for name, table in manifest['tables'].items())
+    kind = f'incremental since {manifest["base"]}' if manifest['base'] else 'full'
+
+    click.echo(
+        f'Snapshot {manifest["id"]} ({kind}): {counts} in {duration:.2f}s, '
+        f'{rows / duration if duration else 0:.0f} rows/sec.'
+    )
@@ -3,10 +3,19 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from injector import Binder, Module, singleton
 
+from app.repositories.sqlalchemy.allocators import (CardNumberAllocator,
+                                                    IBANAllocator,
+                                                    SequenceIBANAllocator)
 from app.repositories.sqlalchemy.bank_account import BankAccountRepository
 from app.repositories.sqlalchemy.customer import CustomerRepository
+from app.repositories.sqlalchemy.snapshot import SnapshotRepository
+from app.services.bank_account import BankAccountService
 from app.services.customer import CustomerService
-from app.storage.sqlalchemy import configure_db
+from app.services.snapshot import SnapshotService
+from app.storage.sqlalchemy import UnitOfWork, configure_db
+from app.utils.hashing_executor import HashingExecutor
+from app.utils.secret_hashing import SecretHasher
+from app.utils.shared_cache import SharedCache
 
 
 class SQLAlchemyModule(Module):
@@ -20,9 +29,25 @@ class SQLAlchemyModule(Module):
 
         binder.bind(interface=SQLAlchemy, to=sqlalchemy_storage, scope=singleton)
         binder.bind(interface=Config, to=self.config, scope=singleton)
+        binder.bind(interface=UnitOfWork, to=UnitOfWork, scope=singleton)
+        binder.bind(interface=IBANAllocator, to=SequenceIBANAllocator, scope=singleton)
+        binder.bind(interface=CardNumberAllocator, to=CardNumberAllocator, scope=singleton)
+        binder.bind(
+            interface=HashingExecutor, to=HashingExecutor(int(self.config['HASHING_POOL_SIZE'])), scope=singleton
+        )
+        binder.bind(interface=SecretHasher, to=SecretHasher, scope=singleton)
+        binder.bind(interface=SharedCache, to=SharedCache(
+            path=self.config['SHARED_CACHE_PATH'],
+            size=int(self.config['SHARED_CACHE_SIZE']),
+            slot_size=int(self.config['SHARED_CACHE_SLOT_SIZE']),
+            ttl=float(self.config['SHARED_CACHE_TTL']),
+        ), scope=singleton)
         binder.bind(interface=BankAccountRepository, to=BankAccountRepository, scope=singleton)
         binder.bind(interface=CustomerRepository, to=CustomerRepository, scope=singleton)
+        binder.bind(interface=SnapshotRepository, to=SnapshotRepository, scope=singleton)
 
         binder.bind(interface=CustomerService, to=CustomerService, scope=singleton)
+        binder.bind(interface=BankAccountService, to=BankAccountService, scope=singleton)
+        binder.bind(interface=SnapshotService, to=SnapshotService, scope=singleton)
 
 
@@ -24,18 +24,36 @@ class DoesNotExistException(AppException):
     """Domain constraint violation"""
 
 
+class NotFoundException(DoesNotExistException):
+    """Resource addressed by the request doesn't exist"""
+
+
 class AccessDeniedException(AppException):
     """Attempt to modify constant data"""
 
 
+class InsufficientFundsException(AppException):
+    """Debit exceeding the balance"""
+
+
+class PreconditionFailedException(AppException):
+    """Changed since the version the client has"""
+
+
 def app_exception_handler(exception):
     http_code = 418
     if isinstance(exception, AlreadyExistException):
         http_code = HTTPStatus.BAD_REQUEST
     elif isinstance(exception, ValidationException):
         http_code = HTTPStatus.BAD_REQUEST
+    elif isinstance(exception, NotFoundException):
+        http_code = HTTPStatus.NOT_FOUND
     elif isinstance(exception, DoesNotExistException):
         http_code = HTTPStatus.BAD_REQUEST
+    elif isinstance(exception, InsufficientFundsException):
+        http_code = HTTPStatus.CONFLICT
+    elif isinstance(exception, PreconditionFailedException):
+        http_code = HTTPStatus.PRECONDITION_FAILED
     r = make_response(
         {'error': str(exception)}, http_code
     )
@@ -0,0 +1,11 @@
+from app.models.sqlalchemy.change_id import change_id_column
+from app.storage.sqlalchemy import db
+
+
+class BalanceShard(db.Model):
+    """Part of the balance of hot bank account. Concurrent changes of hot bank account
+    are spread over its shards, so they don't wait for the same row lock"""
+    iban = db.Column(db.String(34), db.ForeignKey('bank_account.IBAN', ondelete='CASCADE'), primary_key=True)
+    slot = db.Column(db.Integer, primary_key=True)
+    balance = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    change_id = change_id_column()
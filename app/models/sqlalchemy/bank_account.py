@@ -1,8 +1,11 @@
 import enum
-import random
 import hashlib
-from flask import current_app
+import json
+from typing import NamedTuple
 
+from app.models.sqlalchemy.balance_shard import BalanceShard
+from app.models.sqlalchemy.change_id import change_id_column
+from app.models.sqlalchemy.ledger import LedgerEntry
 from app.storage.sqlalchemy import db
 
 
@@ -12,13 +15,11 @@ class CurrencyEnum(enum.Enum):
     EUR = 'EUR'
 
 
-def generate_iban():
-    config = current_app.config
-    country_code = config['IBAN_COUNTRY_IDENTIFIER']
-    bank_identifier = config['IBAN_BANK_IDENTIFIER']
-    iban_length = int(config['IBAN_BBAN_LENGTH'])
+# Source of unique BBAN numbers leased by SequenceIBANAllocator
+bban_sequence = db.Sequence('bank_account_bban_seq', minvalue=0, start=0, metadata=db.Model.metadata)
 
-    bban = ''.join(["%s" % random.randint(0, 9) for _ in range(0, iban_length)])
+
+def format_iban(country_code: str, bank_identifier: str, bban: str) -> str:
     bban_hash = hashlib.shake_256(bban.encode('utf-8')).hexdigest(length=1)
 
     iban = country_code + bban_hash + bank_identifier + bban
@@ -27,12 +28,26 @@ def generate_iban():
 
 
 class BankAccount(db.Model):
+    # Server-generated columns are fetched by INSERT ... RETURNING instead of separate SELECT
+    __mapper_args__ = {'eager_defaults': True}
+
     def __eq__(self, other):
         return self.IBAN == other
 
-    IBAN = db.Column(db.String(34), primary_key=True, default=generate_iban)
+    # Allocated by SequenceIBANAllocator, there's no default so that IBANs are never drawn at random
+    IBAN = db.Column(db.String(34), primary_key=True)
     currency = db.Column(db.Enum(CurrencyEnum), nullable=False)
-    balance = db.Column(db.Float, nullable=False, default=0.0)
+    # Balance as of the last ledger compaction, stored in balance column
+    compacted_balance = db.Column('balance', db.Float, nullable=False, default=0.0)
+    change_id = change_id_column()
+    # Compacted balance plus the entries appended since then and the shards of hot bank account
+    balance = db.column_property(
+        compacted_balance + db.select(db.func.coalesce(db.func.sum(LedgerEntry.amount), 0.0)).where(
+            LedgerEntry.iban == IBAN, db.not_(LedgerEntry.compacted)
+        ).scalar_subquery() + db.select(db.func.coalesce(db.func.sum(BalanceShard.balance), 0.0)).where(
+            BalanceShard.iban == IBAN
+        ).scalar_subquery()
+    )
 
     customers = db.relationship(
         "AssociationBankAccountCustomer",
@@ -40,3 +55,24 @@ class BankAccount(db.Model):
         cascade="all, delete",
         passive_deletes=True,
     )
+
+
+class BankAccountSnapshot(NamedTuple):
+    """Immutable copy of bank account row without ORM state, so it can be cached and shared between threads"""
+    IBAN: str
+    currency: CurrencyEnum
+    compacted_balance: float
+    balance: float
+
+    @classmethod
+    def columns(cls) -> list:
+        return [getattr(BankAccount, field) for field in cls._fields]
+
+    def dumps(self) -> bytes:
+        return json.dumps(self._replace(currency=self.currency.value), separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'BankAccountSnapshot':
+        iban, currency, compacted_balance, balance = json.loads(data)
+
+        return cls(iban, CurrencyEnum(currency), compacted_balance, balance)
@@ -1,60 +1,76 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask import current_app
 
+from app.models.sqlalchemy.change_id import change_id_column
 from app.storage.sqlalchemy import db
 from app.utils.luhn_algorithm import calculate_luhn
 from app.utils.random_sequence_generator import generate_random_digit_sequence
+from app.utils.hashing_executor import HashingExecutor
+from app.utils.secret_hashing import SecretHasher
 from app.exceptions import AccessDeniedException
 
 
-def generate_card_number():
-    config = current_app.config
+# Source of unique customer identifiers leased by CardNumberAllocator
+card_number_sequence = db.Sequence('bank_card_number_seq', minvalue=0, start=0, metadata=db.Model.metadata)
 
-    payment_system_code = config['CARD_NUMBER_PAYMENT_SYSTEM_CODE']
-    bank_card_bank_identifier = config['CARD_NUMBER_BANK_IDENTIFIER']
-    customer_identifier_length = int(config['CARD_NUMBER_CUSTOMER_IDENTIFIED_LENGTH'])
 
-    customer_identifier = generate_random_digit_sequence(customer_identifier_length)
-
-    code = str(payment_system_code) + str(bank_card_bank_identifier) + customer_identifier
+def format_card_number(payment_system_code: str, bank_identifier: str, customer_identifier: str) -> str:
+    code = str(payment_system_code) + str(bank_identifier) + customer_identifier
     check_digit = calculate_luhn(code)
 
     return code + str(check_digit)
 
 
+def get_secret_hasher():
+    """Hasher computing hashes in the calling thread, used when a single card is handled directly"""
+    return SecretHasher(current_app.config, HashingExecutor(0))
+
+
 class BankCard(db.Model):
     __tablename__ = 'bank_card'
 
+    # Server-generated columns are fetched by INSERT ... RETURNING instead of separate SELECT
+    __mapper_args__ = {'eager_defaults': True}
+
     def __eq__(self, other):
         return self.card_number == other
 
-    card_number = db.Column(db.String(16), primary_key=True, default=generate_card_number)
+    # Allocated by CardNumberAllocator, there's no default so that card numbers are never drawn at random
+    card_number = db.Column(db.String(16), primary_key=True)
     expiration_date = db.Column(db.Date(), nullable=False)
 
-    _pin_hash = db.Column(db.String(256))
-    _cvv_hash = db.Column(db.String(256))
+    _pin_hash = db.Column(db.LargeBinary)
+    _cvv_hash = db.Column(db.LargeBinary)
 
     bank_account_iban = db.Column(db.String, db.ForeignKey('bank_account.IBAN', ondelete='CASCADE'))
+    change_id = change_id_column()
     bank_account = db.relationship('BankAccount',
                                    backref=db.backref('cards', lazy=True))
 
     def set_pin(self, pin):
+        self.set_pin_hash(get_secret_hasher().generate_hash(pin, self.card_number).result())
+
+    def set_pin_hash(self, pin_hash):
+        """Sets PIN hash computed beforehand, e.g. by HashingExecutor"""
         if self._pin_hash:
             raise AccessDeniedException('You cannot modify _pin_hash field!')
 
-        self._pin_hash = generate_password_hash(pin)
+        self._pin_hash = pin_hash
 
     def check_pin(self, pin):
-        return check_password_hash(self._pin_hash, pin)
+        return get_secret_hasher().check_hash(self._pin_hash, pin, self.card_number).result()
 
     def set_cvv(self, cvv):
+        self.set_cvv_hash(get_secret_hasher().generate_hash(cvv, self.card_number).result())
+
+    def set_cvv_hash(self, cvv_hash):
+        """Sets CVV hash computed beforehand, e.g. by HashingExecutor"""
         if self._cvv_hash:
             raise AccessDeniedException('You cannot modify _cvv_hash field!')
 
-        self._cvv_hash = generate_password_hash(cvv)
+        self._cvv_hash = cvv_hash
 
     def check_cvv(self, cvv):
-        return check_password_hash(self._cvv_hash, cvv)
+        return get_secret_hasher().check_hash(self._cvv_hash, cvv, self.card_number).result()
 
     @staticmethod
     def generate_pin():
@@ -0,0 +1,16 @@
+from app.storage.sqlalchemy import db
+
+# 64-bit id of the current transaction, which doesn't wrap around unlike xid
+CURRENT_TRANSACTION_ID = '(pg_current_xact_id()::text::bigint)'
+
+
+def change_id_column() -> db.Column:
+    """Id of the transaction which inserted or last updated the row. Every UPDATE issued through SQLAlchemy
+    sets it, so incremental snapshots find rows changed since the previous snapshot.
+    The column isn't indexed, so that balance updates stay HOT"""
+    return db.Column(
+        db.BigInteger,
+        nullable=False,
+        server_default=db.text(CURRENT_TRANSACTION_ID),
+        onupdate=db.text(CURRENT_TRANSACTION_ID),
+    )
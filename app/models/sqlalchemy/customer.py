@@ -1,3 +1,6 @@
+import json
+from typing import Iterable, NamedTuple, Optional
+
 from app.storage.sqlalchemy import db
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
@@ -8,11 +11,21 @@ def generate_uuid():
 
 
 class Customer(db.Model):
+    # Server-generated columns are fetched by INSERT ... RETURNING instead of separate SELECT
+    __mapper_args__ = {'eager_defaults': True}
+    # Pages of customers filtered by last name or email are read by a single index range scan
+    __table_args__ = (
+        db.Index('ix_customer_last_name_uuid', 'last_name', 'uuid'),
+        db.Index('ix_customer_email_uuid', 'email', 'uuid'),
+    )
+
     uuid = db.Column(db.String(40), primary_key=True, default=generate_uuid)
     passport_number = db.Column(db.String(9), unique=True, nullable=False)
     first_name = db.Column(db.String(64), nullable=False)
     last_name = db.Column(db.String(64), nullable=False)
     email = db.Column(db.String, nullable=False)
+    # Bumped by every update, serves as ETag of the customer
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     _password_hash = db.Column(db.String(256))
 
     def set_password(self, password):
@@ -20,3 +33,34 @@ class Customer(db.Model):
 
     def check_password(self, password):
         return check_password_hash(self._password_hash, password)
+
+
+class CustomerSnapshot(NamedTuple):
+    """Immutable copy of customer row without ORM state, so it can be cached and shared between threads"""
+    uuid: str
+    passport_number: str
+    first_name: str
+    last_name: str
+    email: str
+    version: int
+
+    @classmethod
+    def columns(cls, fields: Optional[Iterable[str]] = None) -> list:
+        """Columns of the given fields, of all fields by default. Uuid is always selected"""
+        fields = cls._fields if fields is None else ['uuid', *(field for field in fields if field != 'uuid')]
+
+        return [getattr(Customer, field) for field in fields]
+
+    @classmethod
+    def from_row(cls, row) -> 'CustomerSnapshot':
+        """Fields not selected by the row are None"""
+        values = row._mapping
+
+        return cls._make(values.get(field) for field in cls._fields)
+
+    def dumps(self) -> bytes:
+        return json.dumps(self, separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'CustomerSnapshot':
+        return cls(*json.loads(data))
@@ -0,0 +1,7 @@
+from app.storage.sqlalchemy import db
+
+
+class FlushedSegment(db.Model):
+    """Write-behind spill file whose deltas are applied to balances. It's recorded in the same transaction
+    as the deltas, so the file left by a process died before removing it isn't applied again on recovery"""
+    segment_id = db.Column(db.String(64), primary_key=True)
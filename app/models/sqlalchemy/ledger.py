@@ -0,0 +1,30 @@
+from app.models.sqlalchemy.change_id import change_id_column
+from app.storage.sqlalchemy import db
+
+
+class LedgerEntry(db.Model):
+    """Balance change of bank account. Entries are only appended,
+    compaction folds them into compacted balance of bank account and marks them compacted"""
+    __table_args__ = (
+        db.Index('ix_ledger_entry_iban_id', 'iban', 'id'),
+        db.Index('ix_ledger_entry_uncompacted_iban', 'iban', postgresql_where=db.text('NOT compacted')),
+    )
+
+    entry_id = db.Column('id', db.BigInteger, primary_key=True)
+    iban = db.Column(db.String(34), db.ForeignKey('bank_account.IBAN', ondelete='CASCADE'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    compacted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    change_id = change_id_column()
+
+
+class BalanceSnapshot(db.Model):
+    """Balance of bank account recorded by every compaction which changed it"""
+    __table_args__ = (
+        db.Index('ix_balance_snapshot_iban_id', 'iban', 'id'),
+    )
+
+    snapshot_id = db.Column('id', db.BigInteger, primary_key=True)
+    iban = db.Column(db.String(34), db.ForeignKey('bank_account.IBAN', ondelete='CASCADE'), nullable=False)
+    balance = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
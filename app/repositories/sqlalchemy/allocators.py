@@ -0,0 +1,162 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from flask import Config
+from flask_sqlalchemy import SQLAlchemy
+from injector import inject
+from sqlalchemy import Column, Sequence, String, any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.models.sqlalchemy.bank_account import BankAccount, bban_sequence, format_iban
+from app.models.sqlalchemy.bank_card import BankCard, card_number_sequence, format_card_number
+from app.utils.format_preserving_permutation import FeistelPermutation
+from config import get_secret
+
+
+class SequenceLease:
+    """Leases blocks of unique numbers from database sequence, so only one round trip
+    is made per block_size numbers. Numbers of a block are never shared between processes,
+    since the block is dropped when the process is forked.
+    Numbers are handed out converted by make_value. Values already present in taken_column,
+    e.g. issued by random generator before the sequence was introduced, are skipped"""
+
+    def __init__(
+            self,
+            storage: SQLAlchemy,
+            sequence: Sequence,
+            block_size: int,
+            make_value: Callable[[int], str],
+            taken_column: Column
+    ):
+        self._storage = storage
+        self._sequence = sequence
+        self._block_size = block_size
+        self._make_value = make_value
+        self._taken_column = taken_column
+
+        self._lock = threading.Lock()
+        self._values = []
+        self._pid = os.getpid()
+
+    def _get_taken(self, values: list[str]) -> set[str]:
+        return set(self._storage.session.execute(
+            select(self._taken_column).where(
+                self._taken_column == any_(bindparam('values', values, type_=ARRAY(String)))
+            )
+        ).scalars())
+
+    def _lease_block(self, size: int) -> list[str]:
+        values = []
+
+        while len(values) < size:
+            numbers = self._storage.session.execute(
+                select(self._sequence.next_value()).select_from(func.generate_series(1, size - len(values)))
+            ).scalars().all()
+
+            candidates = [self._make_value(number) for number in sorted(numbers)]
+            taken = self._get_taken(candidates)
+            values.extend(value for value in candidates if value not in taken)
+
+        # Values are popped from the end of the list, so they are handed out in ascending order of numbers
+        return values[::-1]
+
+    def take(self, count: int = 1) -> list[str]:
+        if count < 1:
+            return []
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._values = []
+                self._pid = os.getpid()
+
+            if len(self._values) < count:
+                self._values = self._lease_block(max(self._block_size, count - len(self._values))) + self._values
+
+            taken = self._values[-count:]
+            del self._values[-count:]
+
+            return taken[::-1]
+
+
+class IBANAllocator(ABC):
+    """Produces IBANs for new bank accounts"""
+
+    @abstractmethod
+    def allocate_many(self, count: int) -> list[str]:
+        pass
+
+    def allocate(self) -> str:
+        return self.allocate_many(1)[0]
+
+
+class SequenceIBANAllocator(IBANAllocator):
+    """Maps numbers leased from bank_account_bban_seq through keyed permutation,
+    so BBANs still look random, but can't be duplicated.
+    IBAN_PERMUTATION_KEY must never change once accounts are issued,
+    otherwise new BBANs may collide with existing ones. IBANs of existing accounts,
+    e.g. randomly generated ones, are skipped"""
+
+    @inject
+    def __init__(self, storage: SQLAlchemy, config: Config):
+        self._country_code = config['IBAN_COUNTRY_IDENTIFIER']
+        self._bank_identifier = config['IBAN_BANK_IDENTIFIER']
+        self._bban_length = int(config['IBAN_BBAN_LENGTH'])
+
+        self._permutation = FeistelPermutation(
+            10 ** self._bban_length,
+            get_secret(config, 'IBAN_PERMUTATION_KEY').encode('utf-8')
+        )
+        self._lease = SequenceLease(
+            storage, bban_sequence, int(config['IBAN_ALLOCATOR_BLOCK_SIZE']), self._make_iban, BankAccount.IBAN
+        )
+
+    def _make_iban(self, number: int) -> str:
+        if number >= self._permutation.domain_size:
+            raise OverflowError('BBAN numbers are exhausted!')
+
+        bban = str(self._permutation.permute(number)).zfill(self._bban_length)
+
+        return format_iban(self._country_code, self._bank_identifier, bban)
+
+    def allocate_many(self, count: int) -> list[str]:
+        return self._lease.take(count)
+
+
+class CardNumberAllocator:
+    """Maps numbers leased from bank_card_number_seq through keyed permutation
+    into customer identifier part of the card number within configured BIN.
+    CARD_NUMBER_PERMUTATION_KEY must never change once cards are issued.
+    Numbers of existing cards, e.g. randomly generated ones, are skipped"""
+
+    @inject
+    def __init__(self, storage: SQLAlchemy, config: Config):
+        self._payment_system_code = config['CARD_NUMBER_PAYMENT_SYSTEM_CODE']
+        self._bank_identifier = config['CARD_NUMBER_BANK_IDENTIFIER']
+        self._customer_identifier_length = int(config['CARD_NUMBER_CUSTOMER_IDENTIFIED_LENGTH'])
+
+        self._permutation = FeistelPermutation(
+            10 ** self._customer_identifier_length,
+            get_secret(config, 'CARD_NUMBER_PERMUTATION_KEY').encode('utf-8')
+        )
+        self._lease = SequenceLease(
+            storage,
+            card_number_sequence,
+            int(config['CARD_NUMBER_ALLOCATOR_BLOCK_SIZE']),
+            self._make_card_number,
+            BankCard.card_number
+        )
+
+    def _make_card_number(self, number: int) -> str:
+        if number >= self._permutation.domain_size:
+            raise OverflowError('Card numbers are exhausted!')
+
+        customer_identifier = str(self._permutation.permute(number)).zfill(self._customer_identifier_length)
+
+        return format_card_number(self._payment_system_code, self._bank_identifier, customer_identifier)
+
+    def allocate(self) -> str:
+        card_number, = self._lease.take()
+
+        return card_number
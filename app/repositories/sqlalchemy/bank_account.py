@@ -1,14 +1,31 @@
-from typing import Union
+import random
+import time
+from itertools import islice
+from typing import Iterable, Optional, Union
 
 from flask import Config
 from flask_sqlalchemy import SQLAlchemy
 from injector import inject
-from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy import (Float, String, bindparam, case, cast, column, delete, distinct, func, literal, or_, select,
+                        true, update, values)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.exc import IntegrityError
 from psycopg2.errors import ForeignKeyViolation, UniqueViolation
 
-from app.exceptions import DoesNotExistException, AlreadyExistException
-from app.models.sqlalchemy.bank_account import BankAccount
+from app.exceptions import (AlreadyExistException, DoesNotExistException, InsufficientFundsException,
+                            ValidationException)
+from app.models.sqlalchemy.balance_shard import BalanceShard
+from app.models.sqlalchemy.bank_account import BankAccount, BankAccountSnapshot, CurrencyEnum
+from app.models.sqlalchemy.flushed_segment import FlushedSegment
+from app.models.sqlalchemy.ledger import BalanceSnapshot, LedgerEntry
 from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
+from app.repositories.sqlalchemy.allocators import IBANAllocator
+from app.repositories.sqlalchemy.cache import ReadThroughCache
+from app.repositories.sqlalchemy.key_filter import ExistingKeysFilter
+from app.storage.sqlalchemy import UnitOfWork, db
+from app.utils.shared_cache import SharedCache
+from config import is_enabled
 
 
 class BankAccountRepository:
@@ -16,51 +33,132 @@ class BankAccountRepository:
     def __init__(
             self,
             storage: SQLAlchemy,
-            config: Config
+            config: Config,
+            iban_allocator: IBANAllocator,
+            unit_of_work: UnitOfWork,
+            shared_cache: Optional[SharedCache] = None
     ):
         self._storage = storage
         self._config = config
+        self._iban_allocator = iban_allocator
+        self._unit_of_work = unit_of_work
+
+        self._cache = ReadThroughCache(
+            'bank_account',
+            storage=storage,
+            unit_of_work=unit_of_work,
+            local=None,
+            shared=shared_cache if shared_cache is not None and shared_cache.is_enabled else None,
+            encode=BankAccountSnapshot.dumps,
+            decode=BankAccountSnapshot.loads,
+        )
+        self._keys = ExistingKeysFilter(
+            'bank_account',
+            key_column=BankAccount.IBAN,
+            storage=storage,
+            false_positive_rate=float(config['NEGATIVE_LOOKUP_FILTER_FALSE_POSITIVE_RATE']),
+            refresh_interval=float(config['NEGATIVE_LOOKUP_FILTER_REFRESH_INTERVAL']),
+            enabled=is_enabled(config['NEGATIVE_LOOKUP_FILTER']),
+        )
+
+        self._append_only = is_enabled(config['LEDGER_APPEND_ONLY'])
+        self._balance_batch_chunk_size = int(config['BALANCE_BATCH_CHUNK_SIZE'])
+
+        self._default_shard_count = int(config['HOT_ACCOUNT_SHARDS'])
+        self._shard_counts_ttl = float(config['HOT_ACCOUNT_CACHE_TTL'])
+        self._shard_counts = {}
+        self._shard_counts_loaded_at = None
 
     def create(self, data: dict, customer_uuid: str):
-        while True:
-            try:
-                bank_account = BankAccount(
-                    currency=data['currency'],
-                    balance=data['balance'] if 'balance' in data else 0.0,
-                )
-
-                self._storage.session.add(bank_account)
-                self._storage.session.commit()
-
-                break
-            except IntegrityError:
-                '''There's very small chance to generate duplicated IBAN
-                But since this chance still exists, we have to repeat the operation'''
-                self._storage.session.rollback()
-            except DataError:
-                self._storage.session.rollback()
-                raise DoesNotExistException('Currency does not exist!')
+        # Attributes keep the assigned values after commit, so they are converted
+        # to the types the row would be loaded with
+        try:
+            currency = CurrencyEnum(data['currency'])
+        except ValueError:
+            raise DoesNotExistException('Currency does not exist!')
+
+        bank_account = BankAccount(
+            IBAN=self._iban_allocator.allocate(),
+            currency=currency,
+            compacted_balance=float(data['balance']) if 'balance' in data else 0.0,
+        )
 
         association_row = AssociationBankAccountCustomer(
             bank_account_id=bank_account.IBAN,
             customer_id=customer_uuid
         )
 
-        self._storage.session.add(association_row)
-        self._storage.session.commit()
+        self._storage.session.add_all([bank_account, association_row])
+        self._keys.add([bank_account.IBAN])
+        self._unit_of_work.commit()
 
         return bank_account
 
-    def get_by_iban(self, iban: str) -> BankAccount:
-        bank_account = self._storage.session.query(
-            BankAccount
+    def bulk_create(self, data: list[dict], customer_uuids: list[str]) -> list[str]:
+        """Creates bank account for every customer using one INSERT ... SELECT per table.
+        Columns are sent as arrays unnested by the database, so the statements have a few parameters
+        and don't grow with the number of rows. Returns IBANs in the order of input data"""
+        ibans = self._iban_allocator.allocate_many(len(data))
+
+        bank_accounts = func.unnest(
+            bindparam('ibans', ibans, type_=ARRAY(String)),
+            bindparam('currencies', [item['currency'] for item in data], type_=ARRAY(String)),
+            bindparam('balances', [float(item.get('balance', 0.0)) for item in data], type_=ARRAY(Float)),
+        ).table_valued('iban', 'currency', 'balance').render_derived()
+
+        self._storage.session.execute(insert(BankAccount).from_select(
+            ['IBAN', 'currency', 'balance'],
+            select(
+                bank_accounts.c.iban,
+                cast(bank_accounts.c.currency, BankAccount.__table__.c.currency.type),
+                bank_accounts.c.balance,
+            )
+        ))
+
+        associations = func.unnest(
+            bindparam('ibans', ibans, type_=ARRAY(String)),
+            bindparam('customer_uuids', customer_uuids, type_=ARRAY(String)),
+        ).table_valued('iban', 'customer_uuid').render_derived()
+
+        self._storage.session.execute(insert(AssociationBankAccountCustomer).from_select(
+            ['bank_account_id', 'customer_id'],
+            select(associations.c.iban, associations.c.customer_uuid)
+        ))
+
+        self._keys.add(ibans)
+        self._unit_of_work.commit()
+
+        return ibans
+
+    def _load_snapshot(self, iban: str) -> Optional[BankAccountSnapshot]:
+        row = self._storage.session.query(
+            *BankAccountSnapshot.columns()
         ).filter_by(IBAN=iban).first()
 
-        if not bank_account:
+        return BankAccountSnapshot(*row) if row else None
+
+    def get_by_iban(self, iban: str) -> BankAccountSnapshot:
+        """Reads through the cache shared by processes of the host, if SHARED_CACHE_PATH is set.
+        Every balance change invalidates the cached snapshot"""
+        if not self._keys.might_contain(iban):
+            raise DoesNotExistException('BankAccount does not exist!')
+
+        bank_account = self._cache.get(iban, self._load_snapshot)
+
+        if bank_account is None:
+            self._keys.record_false_positive()
             raise DoesNotExistException('BankAccount does not exist!')
 
         return bank_account
 
+    @property
+    def filter_stats(self) -> dict:
+        return self._keys.stats
+
+    @property
+    def coalescing_stats(self) -> dict:
+        return self._cache.coalescing_stats
+
     def get_owned_by_customer(self, customer_uuid) -> list[BankAccount]:
         return self._storage.session.query(
             BankAccount
@@ -71,20 +169,28 @@ class BankAccountRepository:
         ).all()
 
     def delete(self, iban: str) -> bool:
+        self._cache.invalidate([iban])
+
         is_deleted = self._storage.session.query(
             BankAccount
         ).filter_by(IBAN=iban).delete()
 
-        self._storage.session.commit()
+        if is_deleted:
+            self._keys.discard([iban])
+
+        self._unit_of_work.commit()
 
         return is_deleted
 
     def bulk_delete(self, ibans: list[str]) -> None:
+        self._cache.invalidate(ibans)
+
         is_deleted = self._storage.session.query(
             BankAccount
         ).filter(BankAccount.IBAN.in_(ibans)).delete()
 
-        self._storage.session.commit()
+        self._keys.discard(ibans)
+        self._unit_of_work.commit()
 
         return is_deleted
 
@@ -109,15 +215,355 @@ class BankAccountRepository:
 
             raise e
 
-        self._storage.session.commit()
+        self._unit_of_work.commit()
+
+    def _expire_balances(self, ibans):
+        """Bank accounts already loaded into the session or cached would keep old balances otherwise"""
+        self._cache.invalidate(ibans)
+
+        for iban in ibans:
+            bank_account = self._storage.session.identity_map.get(identity_key(BankAccount, iban))
+
+            if bank_account is not None:
+                self._storage.session.expire(bank_account, ['compacted_balance', 'balance'])
+
+    def _get_shard_count(self, iban: str) -> int:
+        """Returns the number of shards of hot bank account or 0 for regular one.
+        Hot bank accounts are few, so all of them are cached for HOT_ACCOUNT_CACHE_TTL seconds"""
+        if self._shard_counts_loaded_at is None or \
+                time.monotonic() - self._shard_counts_loaded_at > self._shard_counts_ttl:
+            self._shard_counts = dict(self._storage.session.execute(
+                select(BalanceShard.iban, func.count()).group_by(BalanceShard.iban)
+            ).all())
+            self._shard_counts_loaded_at = time.monotonic()
+
+        return self._shard_counts.get(iban, 0)
+
+    def _update_shard(self, iban: str, amount: Union[int, float]) -> bool:
+        shard_count = self._get_shard_count(iban)
+
+        if not shard_count:
+            return False
+
+        is_updated = self._storage.session.query(
+            BalanceShard
+        ).filter_by(iban=iban, slot=random.randrange(shard_count)).update({
+            BalanceShard.balance: BalanceShard.balance + amount
+        }, synchronize_session=False)
+
+        if not is_updated:
+            # Bank account was demoted or resharded since the cache was loaded
+            self._shard_counts_loaded_at = None
+
+        return is_updated
 
     def update_balance_by_amount(self, iban: str, amount: Union[int, float]) -> bool:
-        result = self._storage.session.query(
-            BankAccount
-        ).filter_by(IBAN=iban).update({
-            BankAccount.balance: BankAccount.balance + amount
-        })
+        """Records balance change in the ledger. In append-only mode only the entry is inserted,
+        so concurrent changes of the same bank account don't wait for its row lock.
+        Otherwise the change is applied to a random shard of hot bank account or to the balance itself"""
+        entry = select(BankAccount.IBAN, literal(amount, Float), literal(not self._append_only)).where(
+            BankAccount.IBAN == iban
+        )
+
+        if not self._append_only and not self._update_shard(iban, amount):
+            self._storage.session.query(
+                BankAccount
+            ).filter_by(IBAN=iban).update({
+                BankAccount.compacted_balance: BankAccount.compacted_balance + amount
+            })
 
-        self._storage.session.commit()
+        result = self._storage.session.execute(
+            insert(LedgerEntry).from_select(['iban', 'amount', 'compacted'], entry)
+        ).rowcount
+
+        self._expire_balances([iban])
+        self._unit_of_work.commit()
 
         return result
+
+    def _apply_balance_deltas_chunk(self, chunk: list[tuple[str, float]]) -> set[str]:
+        # Deltas are sent once and referenced by both locking and updating parts of the statement
+        deltas = select(
+            values(column('iban', String), column('amount', Float), name='chunk').data(chunk)
+        ).cte('deltas')
+
+        if self._append_only:
+            entries = select(deltas.c.iban, deltas.c.amount, literal(False)).join(
+                BankAccount, BankAccount.IBAN == deltas.c.iban
+            )
+        else:
+            locked = select(BankAccount.IBAN).where(
+                BankAccount.IBAN.in_(select(deltas.c.iban))
+            ).order_by(BankAccount.IBAN).with_for_update().cte('locked')
+
+            updated = update(BankAccount).where(
+                BankAccount.IBAN == deltas.c.iban,
+                BankAccount.IBAN.in_(select(locked.c.IBAN)),
+            ).values({
+                BankAccount.compacted_balance: BankAccount.compacted_balance + deltas.c.amount
+            }).returning(BankAccount.IBAN, deltas.c.amount).cte('updated')
+
+            entries = select(updated.c.IBAN, updated.c.amount, literal(True))
+
+        return set(self._storage.session.execute(
+            insert(LedgerEntry).from_select(['iban', 'amount', 'compacted'], entries).returning(LedgerEntry.iban)
+        ).scalars())
+
+    def apply_balance_deltas(
+            self,
+            deltas: Iterable[tuple[str, Union[int, float]]],
+            flushed_segment_ids: Iterable[str] = (),
+            released_segment_ids: Iterable[str] = ()
+    ) -> list[str]:
+        """Adds amounts to balances of bank accounts. Deltas of the same bank account are summed up first,
+        then every BALANCE_BATCH_CHUNK_SIZE bank accounts are updated and recorded in the ledger
+        with a single statement. Bank accounts are locked in IBAN order, as transfers do.
+        Write-behind spill files holding the deltas are recorded in the same transaction,
+        and the records of files already removed are dropped.
+        Returns IBANs of nonexistent bank accounts, which are skipped"""
+        totals = {}
+        for iban, amount in deltas:
+            totals[iban] = totals.get(iban, 0.0) + amount
+
+        items = iter(sorted(totals.items()))
+        missing_ibans = []
+
+        while chunk := list(islice(items, self._balance_batch_chunk_size)):
+            applied_ibans = self._apply_balance_deltas_chunk(chunk)
+            missing_ibans.extend(iban for iban, _ in chunk if iban not in applied_ibans)
+
+        if released_segment_ids := list(released_segment_ids):
+            self._storage.session.execute(
+                delete(FlushedSegment).where(FlushedSegment.segment_id.in_(released_segment_ids))
+            )
+        if flushed_segment_ids := list(flushed_segment_ids):
+            self._storage.session.execute(
+                insert(FlushedSegment), [{'segment_id': segment_id} for segment_id in flushed_segment_ids]
+            )
+
+        self._expire_balances(totals)
+        self._unit_of_work.commit()
+
+        return missing_ibans
+
+    def get_flushed_segments(self, segment_ids: list[str]) -> set[str]:
+        """Returns ids of write-behind spill files whose deltas are already applied"""
+        return set(self._storage.session.execute(
+            select(FlushedSegment.segment_id).where(FlushedSegment.segment_id.in_(segment_ids))
+        ).scalars())
+
+    def _fold_shards(self, iban: str) -> bool:
+        """Moves the balance of shards into compacted balance and removes them with a single statement"""
+        removed = delete(BalanceShard).where(
+            BalanceShard.iban == iban
+        ).returning(BalanceShard.balance).cte('removed')
+
+        return self._storage.session.execute(
+            update(BankAccount).where(
+                BankAccount.IBAN == iban
+            ).values({
+                BankAccount.compacted_balance: BankAccount.compacted_balance + select(
+                    func.coalesce(func.sum(removed.c.balance), 0.0)
+                ).scalar_subquery()
+            }).execution_options(synchronize_session=False)
+        ).rowcount
+
+    def promote_to_hot(self, iban: str, shard_count: Optional[int] = None) -> int:
+        """Splits further balance changes of bank account over shard_count shards. Returns the number of shards"""
+        shard_count = shard_count or self._default_shard_count
+
+        if not self._fold_shards(iban):
+            raise DoesNotExistException('BankAccount does not exist!')
+
+        self._storage.session.execute(
+            insert(BalanceShard).values([{'iban': iban, 'slot': slot} for slot in range(shard_count)])
+        )
+
+        self._expire_balances([iban])
+        self._unit_of_work.commit()
+
+        self._shard_counts[iban] = shard_count
+
+        return shard_count
+
+    def demote_from_hot(self, iban: str):
+        if not self._fold_shards(iban):
+            raise DoesNotExistException('BankAccount does not exist!')
+
+        self._expire_balances([iban])
+        self._unit_of_work.commit()
+
+        self._shard_counts.pop(iban, None)
+
+    def debit(self, iban: str, amount: Union[int, float]) -> float:
+        """Takes amount from bank account unless the balance would go negative and returns the new balance.
+        Funds are checked and taken by a single statement, so concurrent debits can't overdraw the account.
+        In append-only mode the row is locked first, as transfers do"""
+        if amount <= 0:
+            raise ValidationException('Debit amount must be positive!')
+
+        if self._append_only:
+            self._storage.session.execute(
+                select(BankAccount.IBAN).where(BankAccount.IBAN == iban).with_for_update()
+            )
+
+            debited = select(
+                BankAccount.IBAN, (BankAccount.balance - amount).label('balance')
+            ).where(
+                BankAccount.IBAN == iban,
+                BankAccount.balance >= amount,
+            ).cte('debited')
+        else:
+            # Concurrent update makes the condition be checked again on the updated row
+            debited = update(BankAccount).where(
+                BankAccount.IBAN == iban,
+                BankAccount.balance >= amount,
+            ).values({
+                BankAccount.compacted_balance: BankAccount.compacted_balance - amount
+            }).returning(BankAccount.IBAN, BankAccount.balance.label('balance')).cte('debited')
+
+        entries = insert(LedgerEntry).from_select(
+            ['iban', 'amount', 'compacted'],
+            select(debited.c.IBAN, literal(-amount, Float), literal(not self._append_only)),
+        ).returning(LedgerEntry.entry_id).cte('entries')
+
+        balance = self._storage.session.execute(
+            select(debited.c.balance, select(func.count()).select_from(entries).scalar_subquery())
+        ).scalar()
+
+        if balance is None:
+            if not self.is_exists(iban):
+                raise DoesNotExistException('BankAccount does not exist!')
+
+            raise InsufficientFundsException('Insufficient funds!')
+
+        self._expire_balances([iban])
+        self._unit_of_work.commit()
+
+        return balance
+
+    def transfer(self, source_iban: str, target_iban: str, amount: Union[int, float]) -> dict[str, float]:
+        """Moves amount between bank accounts with a single statement and returns new balances by IBAN.
+        Rows are locked in IBAN order, so concurrent transfers between the same accounts
+        wait for each other instead of deadlocking. Currency and funds are checked on the locked rows"""
+        ibans = sorted([source_iban, target_iban])
+
+        if self._append_only:
+            # Locked rows aren't updated, so the balances have to be read by the next statement,
+            # which sees ledger entries committed by transactions that held the locks before
+            self._storage.session.execute(
+                select(BankAccount.IBAN).where(BankAccount.IBAN.in_(ibans)).order_by(BankAccount.IBAN).with_for_update()
+            )
+
+        locked = select(
+            BankAccount.IBAN, BankAccount.currency, BankAccount.balance.label('balance')
+        ).where(
+            BankAccount.IBAN.in_(ibans)
+        ).order_by(BankAccount.IBAN).with_for_update(of=BankAccount).cte('locked')
+
+        checked = select(
+            func.count().label('found'),
+            func.count(distinct(locked.c.currency)).label('currencies'),
+            func.coalesce(
+                func.bool_and(or_(locked.c.IBAN != source_iban, locked.c.balance >= amount)), False
+            ).label('has_funds'),
+        ).cte('checked')
+
+        change = case((locked.c.IBAN == source_iban, -amount), else_=amount)
+        moved = select(
+            locked.c.IBAN, change.label('amount'), (locked.c.balance + change).label('balance')
+        ).select_from(locked.join(checked, true())).where(
+            checked.c.found == len(ibans),
+            checked.c.currencies == 1,
+            checked.c.has_funds,
+        ).cte('moved')
+
+        # Data-modifying CTEs are rendered only when referenced, so rows they write are counted
+        written = [insert(LedgerEntry).from_select(
+            ['iban', 'amount', 'compacted'], select(moved.c.IBAN, moved.c.amount, literal(not self._append_only))
+        ).returning(LedgerEntry.entry_id).cte('entries')]
+
+        if not self._append_only:
+            written.append(update(BankAccount).where(
+                BankAccount.IBAN == moved.c.IBAN
+            ).values({
+                BankAccount.compacted_balance: BankAccount.compacted_balance + moved.c.amount
+            }).returning(BankAccount.IBAN).cte('updated'))
+
+        statement = select(
+            checked.c.found, checked.c.currencies, checked.c.has_funds, moved.c.IBAN, moved.c.balance,
+            *(select(func.count()).select_from(cte).scalar_subquery() for cte in written)
+        ).select_from(checked.outerjoin(moved, true()))
+
+        rows = self._storage.session.execute(statement).all()
+
+        found, currencies, has_funds = rows[0][:3]
+
+        if found < len(ibans):
+            raise DoesNotExistException('BankAccount does not exist!')
+
+        if currencies > 1:
+            raise ValidationException('Currencies of bank accounts do not match!')
+
+        if not has_funds:
+            raise InsufficientFundsException('Insufficient funds!')
+
+        self._expire_balances(ibans)
+        self._unit_of_work.commit()
+
+        return {row.IBAN: row.balance for row in rows}
+
+    def compact_ledger(self) -> int:
+        """Folds entries appended since the last compaction into compacted balance of bank accounts
+        and records balance snapshots of the changed bank accounts with a single statement.
+        Bank accounts are locked in IBAN order, as transfers do. Returns the number of snapshots"""
+        folded = update(LedgerEntry).where(
+            db.not_(LedgerEntry.compacted)
+        ).values(compacted=True).returning(LedgerEntry.iban, LedgerEntry.amount).cte('folded')
+
+        totals = select(
+            folded.c.iban, func.sum(folded.c.amount).label('amount')
+        ).group_by(folded.c.iban).cte('totals')
+
+        locked = select(BankAccount.IBAN).where(
+            BankAccount.IBAN.in_(select(totals.c.iban))
+        ).order_by(BankAccount.IBAN).with_for_update().cte('locked')
+
+        updated = update(BankAccount).where(
+            BankAccount.IBAN == totals.c.iban,
+            BankAccount.IBAN.in_(select(locked.c.IBAN)),
+        ).values({
+            BankAccount.compacted_balance: BankAccount.compacted_balance + totals.c.amount
+        }).returning(BankAccount.IBAN, BankAccount.compacted_balance).cte('updated')
+
+        ibans = self._storage.session.execute(
+            insert(BalanceSnapshot).from_select(
+                ['iban', 'balance'], select(updated.c.IBAN, updated.c.balance)
+            ).returning(BalanceSnapshot.iban)
+        ).scalars().all()
+
+        self._cache.invalidate(ibans)
+        self._storage.session.expire_all()
+        self._unit_of_work.commit()
+
+        return len(ibans)
+
+    def get_ledger_entries(self, iban: str, limit: int, before_id: Optional[int] = None) -> list[LedgerEntry]:
+        """Returns up to limit entries of bank account, newest first.
+        Pages are sought by entry id, so every page costs one index range scan"""
+        query = self._storage.session.query(
+            LedgerEntry
+        ).filter(LedgerEntry.iban == iban)
+
+        if before_id is not None:
+            query = query.filter(LedgerEntry.entry_id < before_id)
+
+        return query.order_by(LedgerEntry.entry_id.desc()).limit(limit).all()
+
+    def is_exists(self, iban: str) -> bool:
+        if not self._keys.might_contain(iban):
+            return False
+
+        return self._storage.session.query(
+            BankAccount.IBAN
+        ).filter_by(IBAN=iban).first() is not None
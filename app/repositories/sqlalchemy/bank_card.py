@@ -1,10 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from injector import inject
 from sqlalchemy.exc import IntegrityError
-from psycopg2.errors import ForeignKeyViolation, UniqueViolation
+from psycopg2.errors import ForeignKeyViolation
 
 from app.exceptions import DoesNotExistException
 from app.models.sqlalchemy.bank_card import BankCard
+from app.repositories.sqlalchemy.allocators import CardNumberAllocator
+from app.storage.sqlalchemy import UnitOfWork
+from app.utils.secret_hashing import SecretHasher
 
 
 class BankCardRepository:
@@ -12,41 +15,45 @@ class BankCardRepository:
     def __init__(
             self,
             storage: SQLAlchemy,
+            card_number_allocator: CardNumberAllocator,
+            unit_of_work: UnitOfWork,
+            secret_hasher: SecretHasher,
     ):
         self._storage = storage
+        self._card_number_allocator = card_number_allocator
+        self._unit_of_work = unit_of_work
+        self._secret_hasher = secret_hasher
 
     def create(self, data: dict, bank_account_iban: str) -> tuple[BankCard, str, str]:
-        while True:
-            try:
-                bank_card = BankCard(
-                    expiration_date=data['expiration_date'],
-                    bank_account_iban=bank_account_iban,
-                )
-
-                self._storage.session.add(bank_card)
-                self._storage.session.commit()
+        """Issues bank card with a single INSERT, since card number can't be duplicated
+        and PIN/CVV hashes are computed beforehand"""
+        cvv = BankCard.generate_cvv()
+        pin = BankCard.generate_pin()
 
-                break
-            except IntegrityError as e:
-                self._storage.session.rollback()
+        card_number = self._card_number_allocator.allocate()
 
-                if isinstance(e.orig, ForeignKeyViolation):
-                    raise DoesNotExistException('BankAccount does not exist!')
+        cvv_hash = self._secret_hasher.generate_hash(cvv, card_number)
+        pin_hash = self._secret_hasher.generate_hash(pin, card_number)
 
-                if isinstance(e.orig, UniqueViolation):
-                    '''There's very small chance to generate duplicated card_number
-                    But since this chance still exists, we have to repeat the operation'''
-                    continue
+        bank_card = BankCard(
+            card_number=card_number,
+            expiration_date=data['expiration_date'],
+            bank_account_iban=bank_account_iban,
+        )
 
-                raise e
+        bank_card.set_cvv_hash(cvv_hash.result())
+        bank_card.set_pin_hash(pin_hash.result())
 
-        cvv = BankCard.generate_cvv()
-        pin = BankCard.generate_pin()
+        try:
+            self._storage.session.add(bank_card)
+            self._unit_of_work.commit()
+        except IntegrityError as e:
+            self._storage.session.rollback()
 
-        bank_card.set_cvv(cvv)
-        bank_card.set_pin(pin)
+            if isinstance(e.orig, ForeignKeyViolation):
+                raise DoesNotExistException('BankAccount does not exist!')
 
-        self._storage.session.commit()
+            raise e
 
         return bank_card, pin, cvv
 
@@ -60,6 +67,14 @@ class BankCardRepository:
 
         return bank_card
 
+    def update_secret_hashes(self, card_number: str, data: dict):
+        """Replaces stored hashes of the same PIN/CVV, e.g. when they are re-hashed with another scheme"""
+        self._storage.session.query(
+            BankCard
+        ).filter_by(card_number=card_number).update(data)
+
+        self._unit_of_work.commit()
+
     def get_attached_to_bank_account(self, bank_account_iban: str) -> list[BankCard]:
         return self._storage.session.query(
             BankCard
@@ -70,7 +85,7 @@ class BankCardRepository:
             BankCard
         ).filter(BankCard.card_number.in_(card_numbers)).delete()
 
-        self._storage.session.commit()
+        self._unit_of_work.commit()
 
         return is_deleted
 
@@ -79,6 +94,6 @@ class BankCardRepository:
             BankCard
         ).filter_by(card_number=card_number).delete()
 
-        self._storage.session.commit()
+        self._unit_of_work.commit()
 
         return is_deleted
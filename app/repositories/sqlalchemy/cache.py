@@ -0,0 +1,113 @@
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from flask_sqlalchemy import SQLAlchemy
+
+from app.storage.sqlalchemy import UnitOfWork
+from app.utils.lru_cache import LRUCache
+from app.utils.shared_cache import SharedCache
+from app.utils.single_flight import SingleFlight
+
+
+class ReadThroughCache:
+    """Looks values up in the in-process tier, then in the tier shared by processes of the host,
+    and loads them from the database on miss. Either tier may be omitted.
+    Entries of the in-process tier remember the generation of the key in the shared tier,
+    so invalidation made by any process drops them as well.
+    Keys changed by the current transaction bypass both tiers until it ends,
+    so it reads its own changes and uncommitted data is never cached.
+    Concurrent misses of a key wait for a single load, which is restarted for callers coming after invalidation"""
+    WRITTEN_KEYS = 'read_through_cache_written_keys'
+
+    def __init__(
+            self,
+            namespace: str,
+            storage: SQLAlchemy,
+            unit_of_work: UnitOfWork,
+            local: Optional[LRUCache],
+            shared: Optional[SharedCache],
+            encode: Callable[[Any], bytes],
+            decode: Callable[[bytes], Any]
+    ):
+        self._namespace = namespace
+        self._storage = storage
+        self._unit_of_work = unit_of_work
+        self._local = local
+        self._shared = shared
+        self._encode = encode
+        self._decode = decode
+
+        self._flights = SingleFlight()
+
+    def _shared_key(self, key: Hashable) -> bytes:
+        return f'{self._namespace}:{key}'.encode('utf-8')
+
+    def get(self, key: Hashable, load: Callable[[Hashable], Optional[Any]]) -> Optional[Any]:
+        """Returns cached value or the one returned by load, None returned by load isn't cached.
+        Concurrent misses of the same key share a single load"""
+        if (self._namespace, key) in self._storage.session.info.get(self.WRITTEN_KEYS, ()):
+            return load(key)
+
+        if self._local:
+            entry = self._local.get(key)
+
+            if entry is not None:
+                token, value = entry
+
+                if token == (self._shared.token(self._shared_key(key)) if self._shared else None):
+                    return value
+
+                self._local.discard(key)
+
+        return self._flights.do(key, lambda: self._fetch(key, load))
+
+    def _fetch(self, key: Hashable, load: Callable[[Hashable], Optional[Any]]) -> Optional[Any]:
+        shared_key = self._shared_key(key)
+        shared_token = self._shared.token(shared_key) if self._shared else None
+        local_token = self._local.token() if self._local else None
+
+        data = self._shared.get(shared_key) if self._shared else None
+        if data is not None:
+            value = self._decode(data)
+        else:
+            value = load(key)
+
+            if value is None:
+                return None
+
+            if self._shared:
+                self._shared.put(shared_key, self._encode(value), shared_token)
+
+        if self._local:
+            self._local.put(key, (shared_token, value), local_token)
+
+        return value
+
+    @property
+    def coalescing_stats(self) -> dict:
+        return self._flights.stats
+
+    def _drop(self, keys: list[Hashable]):
+        for key in keys:
+            # Load in flight could read the row before the change
+            self._flights.forget(key)
+
+            if self._local:
+                self._local.invalidate(key)
+
+            if self._shared:
+                self._shared.invalidate(self._shared_key(key))
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        """Drops cached values at once and after the current transaction ends,
+        since others could load the old rows until then"""
+        keys = list(keys)
+        written_keys = self._storage.session.info.setdefault(self.WRITTEN_KEYS, set())
+        written_keys.update((self._namespace, key) for key in keys)
+
+        self._drop(keys)
+
+        def after_transaction():
+            written_keys.difference_update((self._namespace, key) for key in keys)
+            self._drop(keys)
+
+        self._unit_of_work.after_transaction(after_transaction)
@@ -1,9 +1,38 @@
+import csv
+import io
+from typing import Iterator, Optional
+
+from flask import Config
 from flask_sqlalchemy import SQLAlchemy
 from injector import inject
-from app.models.sqlalchemy.customer import Customer
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.bank_card import BankCard
+from app.models.sqlalchemy.customer import Customer, CustomerSnapshot, generate_uuid
 from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
-from app.exceptions import AlreadyExistException, DoesNotExistException
+from app.repositories.sqlalchemy.cache import ReadThroughCache
+from app.repositories.sqlalchemy.key_filter import ExistingKeysFilter
+from app.storage.sqlalchemy import UnitOfWork
+from app.utils.lru_cache import LRUCache
+from app.utils.shared_cache import SharedCache
+from app.exceptions import AlreadyExistException, DoesNotExistException, PreconditionFailedException
+from sqlalchemy import Column, Integer, MetaData, String, Table, any_, bindparam, select, text, update
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import IntegrityError
+from config import is_enabled
+
+# Rows of imported batch are copied here before they are merged, temporary tables aren't WAL-logged
+customer_import = Table(
+    'customer_import',
+    MetaData(),
+    Column('line', Integer, nullable=False),
+    Column('uuid', String(40), nullable=False),
+    Column('passport_number', String(9), nullable=False),
+    Column('first_name', String(64), nullable=False),
+    Column('last_name', String(64), nullable=False),
+    Column('email', String, nullable=False),
+    prefixes=['TEMPORARY'],
+)
 
 
 class CustomerRepository:
@@ -11,16 +40,48 @@ class CustomerRepository:
     def __init__(
         self,
         storage: SQLAlchemy,
+        config: Config,
+        unit_of_work: UnitOfWork,
+        shared_cache: Optional[SharedCache] = None,
     ):
         self._storage = storage
+        self._unit_of_work = unit_of_work
+        self._export_batch_size = int(config['CUSTOMER_EXPORT_BATCH_SIZE'])
+
+        self._local_cache = LRUCache(
+            max_memory=int(config['CUSTOMER_CACHE_MAX_MEMORY']),
+            ttl=float(config['CUSTOMER_CACHE_TTL']),
+        )
+        self._shared_cache = shared_cache if shared_cache is not None and shared_cache.is_enabled else None
+        self._cache = ReadThroughCache(
+            'customer',
+            storage=storage,
+            unit_of_work=unit_of_work,
+            local=self._local_cache if self._local_cache.is_enabled else None,
+            shared=self._shared_cache,
+            encode=CustomerSnapshot.dumps,
+            decode=CustomerSnapshot.loads,
+        )
+        self._keys = ExistingKeysFilter(
+            'customer',
+            key_column=Customer.uuid,
+            storage=storage,
+            false_positive_rate=float(config['NEGATIVE_LOOKUP_FILTER_FALSE_POSITIVE_RATE']),
+            refresh_interval=float(config['NEGATIVE_LOOKUP_FILTER_REFRESH_INTERVAL']),
+            enabled=is_enabled(config['NEGATIVE_LOOKUP_FILTER']),
+        )
 
     def is_exists(self, uuid: str) -> bool:
+        if not self._keys.might_contain(uuid):
+            return False
+
         return self._storage.session.query(
             Customer.uuid
         ).filter_by(uuid=uuid).first() is not None
 
     def create(self, data: dict) -> Customer:
         customer = Customer(
+            uuid=generate_uuid(),
             passport_number=data['passport_number'],
             first_name=data['first_name'],
             last_name=data['last_name'],
@@ -29,44 +90,243 @@ class CustomerRepository:
 
         try:
             self._storage.session.add(customer)
-            self._storage.session.commit()
+            self._keys.add([customer.uuid])
+            self._unit_of_work.commit()
         except IntegrityError:
             self._storage.session.rollback()
             raise AlreadyExistException('Customer already exist!')
 
         return customer
 
-    def update(self, uuid: str, data: dict):
+    def bulk_create(self, data: list[dict]) -> list[Optional[str]]:
+        """Creates customers using one multi-row INSERT. Returns uuid for every created customer
+        in the order of input data and None for the ones whose passport_number is already taken"""
+        customer_rows = [{
+            'uuid': generate_uuid(),
+            'passport_number': item['passport_number'],
+            'first_name': item['first_name'],
+            'last_name': item['last_name'],
+            'email': item['email'],
+        } for item in data]
+
+        created_uuids = set(self._storage.session.execute(
+            insert(Customer).values(customer_rows).on_conflict_do_nothing().returning(Customer.uuid)
+        ).scalars())
+
+        self._keys.add(list(created_uuids))
+        self._unit_of_work.commit()
+
+        return [
+            customer_row['uuid'] if customer_row['uuid'] in created_uuids else None for customer_row in customer_rows
+        ]
+
+    def _copy_to_staging(self, data: list[dict], uuids: list[str]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        for line, (item, uuid) in enumerate(zip(data, uuids)):
+            writer.writerow([line, uuid, item['passport_number'], item['first_name'], item['last_name'], item['email']])
+
+        buffer.seek(0)
+
+        connection = self._storage.session.connection()
+        customer_import.create(connection, checkfirst=True)
+        # Rows of the previous batch are kept until the end of the session
+        connection.execute(text(f'TRUNCATE {customer_import.name}'))
+
+        columns = ', '.join(column.name for column in customer_import.columns)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {customer_import.name} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    def import_batch(self, data: list[dict]) -> list[Optional[str]]:
+        """Creates customers by COPY into staging table and one INSERT ... SELECT, which skips
+        passport numbers already taken or repeated earlier in the batch. Returns uuid for every created
+        customer in the order of input data and None for the skipped ones, like bulk_create"""
+        uuids = [generate_uuid() for _ in data]
+        self._copy_to_staging(data, uuids)
+
+        first_occurrences = select(
+            customer_import.c.uuid,
+            customer_import.c.passport_number,
+            customer_import.c.first_name,
+            customer_import.c.last_name,
+            customer_import.c.email,
+        ).distinct(customer_import.c.passport_number).order_by(
+            customer_import.c.passport_number, customer_import.c.line
+        )
+
+        created_uuids = set(self._storage.session.execute(
+            insert(Customer).from_select(
+                ['uuid', 'passport_number', 'first_name', 'last_name', 'email'], first_occurrences
+            ).on_conflict_do_nothing().returning(Customer.uuid)
+        ).scalars())
+
+        self._keys.add(list(created_uuids))
+        self._unit_of_work.commit()
+
+        return [uuid if uuid in created_uuids else None for uuid in uuids]
+
+    def update(self, uuid: str, data: dict, expected_versions: Optional[list[int]] = None) -> Optional[int]:
+        """Bumps version of the customer and returns the new one, or None if the customer doesn't exist.
+        If expected_versions are given, the customer is updated only if it's still at one of them,
+        the check and the update are a single statement, so no row is locked in advance"""
+        self._cache.invalidate([uuid])
+
+        statement = update(Customer).where(Customer.uuid == uuid)
+        if expected_versions is not None:
+            statement = statement.where(Customer.version.in_(expected_versions))
+
         try:
-            self._storage.session.query(
-                Customer
-            ).filter_by(uuid=uuid).update(data)
+            version = self._storage.session.execute(
+                statement.values(**data, version=Customer.version + 1).returning(Customer.version)
+            ).scalar()
 
-            self._storage.session.commit()
+            self._unit_of_work.commit()
         except IntegrityError:
             self._storage.session.rollback()
             raise AlreadyExistException('Customer already exist!')
 
+        if version is None and expected_versions is not None and self.is_exists(uuid):
+            raise PreconditionFailedException('Customer was changed!')
+
+        return version
+
     def delete(self, uuid: str) -> bool:
+        self._cache.invalidate([uuid])
+
         is_deleted = self._storage.session.query(
             Customer
         ).filter_by(uuid=uuid).delete()
 
-        self._storage.session.commit()
+        if is_deleted:
+            self._keys.discard([uuid])
+
+        self._unit_of_work.commit()
 
         return is_deleted
 
-    def get_by_uuid(self, uuid: str) -> Customer:
-        customer = self._storage.session.query(
-            Customer
+    def _load_snapshot(self, uuid: str) -> Optional[CustomerSnapshot]:
+        row = self._storage.session.query(
+            *CustomerSnapshot.columns()
         ).filter_by(uuid=uuid).first()
 
-        if not customer:
+        return CustomerSnapshot(*row) if row else None
+
+    def get_page(
+            self,
+            limit: int,
+            after_uuid: Optional[str] = None,
+            last_name: Optional[str] = None,
+            email: Optional[str] = None,
+            fields: Optional[list[str]] = None
+    ) -> list[CustomerSnapshot]:
+        """Returns customers ordered by uuid starting after the given one,
+        so that any page is read by one index range scan, unlike OFFSET skipping all previous rows.
+        If fields are given, only their columns and uuid are selected, the others are None"""
+        statement = select(*CustomerSnapshot.columns(fields))
+
+        if after_uuid is not None:
+            statement = statement.where(Customer.uuid > after_uuid)
+        if last_name is not None:
+            statement = statement.where(Customer.last_name == last_name)
+        if email is not None:
+            statement = statement.where(Customer.email == email)
+
+        return [
+            CustomerSnapshot.from_row(row)
+            for row in self._storage.session.execute(statement.order_by(Customer.uuid).limit(limit))
+        ]
+
+    def iter_export_rows(self) -> Iterator[Row]:
+        """Yields customers joined with their bank accounts and cards, one row per card,
+        ordered by customer and bank account. Rows are fetched from server-side cursor
+        CUSTOMER_EXPORT_BATCH_SIZE at a time, so memory doesn't grow with the number of customers.
+        The cursor is opened by the first next(), e.g. once streaming response is being sent"""
+        statement = select(
+            *CustomerSnapshot.columns(),
+            BankAccount.IBAN,
+            BankAccount.currency,
+            BankAccount.balance,
+            BankCard.card_number,
+            BankCard.expiration_date,
+        ).select_from(Customer).outerjoin(
+            AssociationBankAccountCustomer, AssociationBankAccountCustomer.customer_id == Customer.uuid
+        ).outerjoin(
+            BankAccount, BankAccount.IBAN == AssociationBankAccountCustomer.bank_account_id
+        ).outerjoin(
+            BankCard, BankCard.bank_account_iban == BankAccount.IBAN
+        ).order_by(Customer.uuid, BankAccount.IBAN, BankCard.card_number)
+
+        yield from self._storage.session.execute(statement.execution_options(yield_per=self._export_batch_size))
+
+    def get_version(self, uuid: str) -> int:
+        if not self._keys.might_contain(uuid):
+            raise DoesNotExistException('Customer does not exist!')
+
+        version = self._storage.session.execute(
+            select(Customer.version).where(Customer.uuid == uuid)
+        ).scalar()
+
+        if version is None:
+            self._keys.record_false_positive()
+            raise DoesNotExistException('Customer does not exist!')
+
+        return version
+
+    def get_by_uuid(self, uuid: str) -> CustomerSnapshot:
+        """Reads through the cache of CUSTOMER_CACHE_MAX_MEMORY bytes kept up to CUSTOMER_CACHE_TTL seconds
+        and the cache shared by processes of the host, if SHARED_CACHE_PATH is set"""
+        if not self._keys.might_contain(uuid):
+            raise DoesNotExistException('Customer does not exist!')
+
+        customer = self._cache.get(uuid, self._load_snapshot)
+
+        if customer is None:
+            self._keys.record_false_positive()
             raise DoesNotExistException('Customer does not exist!')
 
         return customer
 
+    def get_many(self, uuids: list[str], fields: Optional[list[str]] = None) -> dict[str, CustomerSnapshot]:
+        """Reads customers by one SELECT ... WHERE uuid = ANY(array), which is the same statement
+        whatever the number of uuids. Uuids rejected by the filter aren't queried, missing ones aren't in the result.
+        Fields are selected like by get_page"""
+        uuids = [uuid for uuid in set(uuids) if self._keys.might_contain(uuid)]
+        if not uuids:
+            return {}
+
+        customers = {
+            row.uuid: CustomerSnapshot.from_row(row)
+            for row in self._storage.session.execute(select(*CustomerSnapshot.columns(fields)).where(
+                Customer.uuid == any_(bindparam('uuids', uuids, type_=ARRAY(String)))
+            ))
+        }
+
+        for _ in range(len(uuids) - len(customers)):
+            self._keys.record_false_positive()
+
+        return customers
+
+    @property
+    def cache_stats(self) -> dict:
+        return self._local_cache.stats
+
+    @property
+    def shared_cache_stats(self) -> dict:
+        return self._shared_cache.stats if self._shared_cache is not None else {'enabled': False}
+
+    @property
+    def filter_stats(self) -> dict:
+        return self._keys.stats
+
+    @property
+    def coalescing_stats(self) -> dict:
+        return self._cache.coalescing_stats
+
     def has_bank_account(self, uuid: str) -> bool:
+        if not self._keys.might_contain(uuid):
+            return False
+
         return self._storage.session.query(
             AssociationBankAccountCustomer.customer_id
         ).filter_by(customer_id=uuid).first() is not None
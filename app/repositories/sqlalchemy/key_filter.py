@@ -0,0 +1,274 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import wait
+from typing import Iterable
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import String, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.utils.bloom_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+class ExistingKeysFilter:
+    """Bloom filter of the keys of a table, which answers lookups of nonexistent keys without a query.
+
+    The filter is built by a background thread streaming all keys, lookups made before it's built
+    go to the database. Keys created by any process are announced with NOTIFY in the creating transaction,
+    the thread LISTENs before streaming, so keys committed during the build aren't lost.
+    Builds run in a thread of their own, so notifications keep being added to the current filter
+    and are copied into the one being built.
+    Removed keys stay in the filter as false positives, the filter is rebuilt every refresh_interval seconds
+    or as soon as removed keys make up a quarter of it"""
+    MIN_CAPACITY = 1024
+    STREAM_BUFFER_SIZE = 10000
+    POLL_INTERVAL = 1.0
+    RETRY_INTERVAL = 5.0
+
+    def __init__(
+            self,
+            name: str,
+            key_column: InstrumentedAttribute,
+            storage: SQLAlchemy,
+            false_positive_rate: float,
+            refresh_interval: float,
+            enabled: bool
+    ):
+        self._channel = f'{name}_created'
+        self._key_column = key_column
+        self._storage = storage
+        self._false_positive_rate = false_positive_rate
+        self._refresh_interval = refresh_interval
+        self._enabled = enabled
+
+        self._lock = threading.Lock()
+        self._stopped = None
+        self._ready = threading.Event()
+        self._pid = None
+
+        self._filter = None
+        # Keys added while the filter is rebuilt, they are copied into the new one
+        self._pending = None
+        self._built_at = None
+        self._removed = 0
+
+        self._definite_misses = 0
+        self._passed_lookups = 0
+        self._false_positives = 0
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    def _start(self):
+        """Starts the thread in the first process using the filter and again in forked ones,
+        whose copy of the filter misses keys created after the fork"""
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._filter, self._pending = None, None
+            self._ready.clear()
+            # Every thread gets its own event, so a stopped thread still finishing doesn't get restarted
+            self._stopped = threading.Event()
+
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run,
+                args=(self._storage.engine, self._stopped),
+                name=f'{self._channel}-filter',
+                daemon=True
+            ).start()
+
+    def stop(self):
+        """Lets the thread exit within POLL_INTERVAL seconds, it isn't waited for"""
+        if self._pid != os.getpid():
+            return
+
+        self._stopped.set()
+        self._pid = None
+
+    def wait_until_ready(self, timeout: float) -> bool:
+        self._start()
+
+        return self._ready.wait(timeout)
+
+    def might_contain(self, key: str) -> bool:
+        """False means the key definitely doesn't exist, True means it has to be looked up"""
+        if not self._enabled:
+            return True
+
+        self._start()
+
+        bloom_filter = self._filter
+        if bloom_filter is None:
+            return True
+
+        with self._lock:
+            if key in bloom_filter:
+                self._passed_lookups += 1
+                return True
+
+            self._definite_misses += 1
+            return False
+
+    def record_false_positive(self):
+        """Called when the key passed by the filter is missing in the database"""
+        if self._enabled and self._filter is not None:
+            with self._lock:
+                self._false_positives += 1
+
+    def add(self, keys: list[str]):
+        """Adds keys of the rows inserted in the current transaction and announces them
+        to other processes once the transaction is committed. Should be called before the commit"""
+        if not self._enabled or not keys:
+            return
+
+        self._start()
+
+        self._storage.session.execute(select(
+            func.pg_notify(self._channel, func.unnest(bindparam('keys', keys, type_=ARRAY(String))))
+        ))
+
+        self._add_to_filter(keys)
+
+    def _add_to_filter(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                if self._filter is not None:
+                    self._filter.add(key)
+
+                if self._pending is not None:
+                    self._pending.append(key)
+
+    def discard(self, keys: list[str]):
+        if not self._enabled:
+            return
+
+        with self._lock:
+            self._removed += len(keys)
+
+    def _is_stale(self) -> bool:
+        with self._lock:
+            return self._filter is not None and (
+                time.monotonic() - self._built_at > self._refresh_interval or self._removed * 4 > len(self._filter)
+            )
+
+    def _start_build(self, builder: ThreadPoolExecutor, engine: Engine, cancelled: threading.Event) -> Future:
+        # Keys are collected before the build reads its snapshot, so none are missed in between
+        with self._lock:
+            self._pending = []
+
+        return builder.submit(self._build, engine, cancelled)
+
+    def _build(self, engine: Engine, cancelled: threading.Event):
+        try:
+            with engine.connect() as connection:
+                count = connection.execute(
+                    select(func.count()).select_from(self._key_column.class_)
+                ).scalar()
+                # Room for keys created until the next rebuild
+                bloom_filter = BloomFilter(max(self.MIN_CAPACITY, count * 2), self._false_positive_rate)
+
+                for key in connection.execution_options(
+                        stream_results=True, max_row_buffer=self.STREAM_BUFFER_SIZE
+                ).execute(select(self._key_column)).scalars():
+                    bloom_filter.add(key)
+
+            with self._lock:
+                # Notifications aren't drained anymore, so the filter would miss keys created from now on
+                if cancelled.is_set():
+                    return
+
+                for key in self._pending:
+                    bloom_filter.add(key)
+
+                self._filter = bloom_filter
+                self._built_at = time.monotonic()
+                self._removed = 0
+        finally:
+            with self._lock:
+                self._pending = None
+
+        self._ready.set()
+
+    def _listen(self, engine: Engine, stopped: threading.Event):
+        connection = engine.raw_connection()
+        # The connection is kept for the lifetime of the thread, so it shouldn't hold a slot of the pool
+        connection.detach()
+        builder = ThreadPoolExecutor(1, thread_name_prefix=f'{self._channel}-filter-build')
+        cancelled = threading.Event()
+
+        try:
+            dbapi_connection = connection.connection
+            dbapi_connection.set_session(autocommit=True)
+            dbapi_connection.cursor().execute(f'LISTEN {self._channel}')
+
+            build = self._start_build(builder, engine, cancelled)
+
+            while not stopped.is_set():
+                if build is not None and build.done():
+                    # Raises the error of the build
+                    build.result()
+                    build = None
+
+                if build is None and self._is_stale():
+                    build = self._start_build(builder, engine, cancelled)
+
+                if wait([dbapi_connection], self.POLL_INTERVAL):
+                    dbapi_connection.poll()
+                    self._add_to_filter(notify.payload for notify in dbapi_connection.notifies)
+                    dbapi_connection.notifies.clear()
+        finally:
+            cancelled.set()
+            builder.shutdown(wait=False)
+            connection.close()
+
+    def _run(self, engine: Engine, stopped: threading.Event):
+        while not stopped.is_set():
+            try:
+                self._listen(engine, stopped)
+            except Exception:
+                logger.exception(
+                    'Filter of %s lost notifications, lookups go to the database until rebuilt', self._channel
+                )
+
+                # Keys created while the connection was lost are unknown
+                with self._lock:
+                    self._filter = None
+                self._ready.clear()
+
+                stopped.wait(self.RETRY_INTERVAL)
+
+    @property
+    def stats(self) -> dict:
+        if not self._enabled:
+            return {'enabled': False}
+
+        with self._lock:
+            bloom_filter = self._filter
+            absent_lookups = self._definite_misses + self._false_positives
+
+            return {
+                'enabled': True,
+                'ready': bloom_filter is not None,
+                'added_keys': len(bloom_filter) if bloom_filter is not None else None,
+                'removed_keys': self._removed,
+                'memory': bloom_filter.memory if bloom_filter is not None else None,
+                'hash_count': bloom_filter.hash_count if bloom_filter is not None else None,
+                'expected_false_positive_rate': bloom_filter.false_positive_rate if bloom_filter is not None else None,
+                'definite_misses': self._definite_misses,
+                'passed_lookups': self._passed_lookups,
+                'false_positives': self._false_positives,
+                'observed_false_positive_rate': self._false_positives / absent_lookups if absent_lookups else None,
+            }
@@ -0,0 +1,165 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple, Optional
+
+import pyarrow
+from flask_sqlalchemy import SQLAlchemy
+from injector import inject
+from sqlalchemy import BigInteger, String, Text, cast, create_engine, func, or_, select, text
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import ColumnElement
+
+from app.models.sqlalchemy.balance_shard import BalanceShard
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.bank_card import BankCard
+from app.models.sqlalchemy.ledger import LedgerEntry
+from app.utils.columnar_writer import ColumnarWriter
+
+# Worker processes import only this module, and mappers need every model related to the exported ones
+from app.models.sqlalchemy import customer, many_to_many  # noqa: F401
+
+
+class SnapshotTable(NamedTuple):
+    key: ColumnElement
+    columns: list
+    schema: pyarrow.Schema
+    # Condition matching rows changed by transactions from the given change id on
+    changed_since: Callable[[int], ColumnElement]
+
+
+def _bank_account_changed_since(change_id: int) -> ColumnElement:
+    # Balance of bank account also changes with uncompacted ledger entries and shards of hot bank account
+    return or_(
+        BankAccount.change_id >= change_id,
+        BankAccount.IBAN.in_(
+            select(LedgerEntry.iban).where(~LedgerEntry.compacted, LedgerEntry.change_id >= change_id)
+        ),
+        BankAccount.IBAN.in_(select(BalanceShard.iban).where(BalanceShard.change_id >= change_id)),
+    )
+
+
+SNAPSHOT_TABLES = {
+    'bank_account': SnapshotTable(
+        key=BankAccount.IBAN,
+        columns=[BankAccount.IBAN, cast(BankAccount.currency, String), BankAccount.balance],
+        schema=pyarrow.schema([
+            ('iban', pyarrow.string()),
+            ('currency', pyarrow.string()),
+            ('balance', pyarrow.float64()),
+        ]),
+        changed_since=_bank_account_changed_since,
+    ),
+    'bank_card': SnapshotTable(
+        key=BankCard.card_number,
+        columns=[BankCard.card_number, BankCard.expiration_date, BankCard.bank_account_iban],
+        schema=pyarrow.schema([
+            ('card_number', pyarrow.string()),
+            ('expiration_date', pyarrow.date32()),
+            ('bank_account_iban', pyarrow.string()),
+        ]),
+        changed_since=lambda change_id: BankCard.change_id >= change_id,
+    ),
+}
+
+
+class Partition(NamedTuple):
+    """Range of keys from lower inclusive to upper exclusive, None stands for unbounded end"""
+    lower: Optional[str]
+    upper: Optional[str]
+
+
+class ExportedSnapshot(NamedTuple):
+    snapshot_id: str
+    # Every transaction not visible in the snapshot has at least this id,
+    # so the next incremental snapshot exports rows changed from it on
+    next_change_id: int
+    partitions: dict[str, list[Partition]]
+
+
+def export_partition(
+        database_uri: str,
+        snapshot_id: str,
+        table_name: str,
+        partition: Partition,
+        since_change_id: Optional[int],
+        path: str,
+        file_format: str,
+        batch_size: int
+) -> int:
+    """Writes rows of the partition as they are read from the exported snapshot, batch_size rows at a time.
+    Runs in worker process, which opens its own connection. Returns the number of written rows"""
+    table = SNAPSHOT_TABLES[table_name]
+
+    statement = select(*table.columns).order_by(table.key)
+    if partition.lower is not None:
+        statement = statement.where(table.key >= partition.lower)
+    if partition.upper is not None:
+        statement = statement.where(table.key < partition.upper)
+    if since_change_id is not None:
+        statement = statement.where(table.changed_since(since_change_id))
+
+    engine = create_engine(database_uri, poolclass=NullPool)
+
+    try:
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level='REPEATABLE READ')
+
+            with connection.begin(), ColumnarWriter(path, table.schema, file_format) as writer:
+                # Has to be the first statement of the transaction
+                connection.execute(text('SET TRANSACTION SNAPSHOT :snapshot_id'), {'snapshot_id': snapshot_id})
+
+                result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(statement)
+                for rows in result.partitions(batch_size):
+                    writer.write_rows(rows)
+
+                return writer.rows
+    finally:
+        engine.dispose()
+
+
+class SnapshotRepository:
+    @inject
+    def __init__(self, storage: SQLAlchemy):
+        self._storage = storage
+
+    @property
+    def database_uri(self) -> str:
+        return self._storage.engine.url.render_as_string(hide_password=False)
+
+    @staticmethod
+    def _get_partitions(connection, table: SnapshotTable, count: int) -> list[Partition]:
+        """Splits keys into count ranges of about the same number of rows"""
+        boundaries = []
+
+        if count > 1:
+            fractions = [index / count for index in range(1, count)]
+            boundaries = connection.execute(
+                select(func.percentile_disc(array(fractions)).within_group(table.key))
+            ).scalar() or []
+
+        # Tables with fewer rows than partitions have repeated boundaries, and empty ones have none
+        boundaries = sorted({boundary for boundary in boundaries if boundary is not None})
+
+        return [Partition(lower, upper) for lower, upper in zip([None] + boundaries, boundaries + [None])]
+
+    @contextmanager
+    def export_snapshot(self, partitions: int) -> Iterator[ExportedSnapshot]:
+        """Keeps REPEATABLE READ transaction open while the block runs, so that worker processes
+        can read the same data by importing its snapshot. Key ranges are computed from the snapshot as well"""
+        with self._storage.engine.connect() as connection:
+            connection = connection.execution_options(isolation_level='REPEATABLE READ')
+
+            with connection.begin():
+                next_change_id = connection.execute(
+                    select(cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger))
+                ).scalar()
+                snapshot_id = connection.execute(select(func.pg_export_snapshot())).scalar()
+
+                yield ExportedSnapshot(
+                    snapshot_id=snapshot_id,
+                    next_change_id=next_change_id,
+                    partitions={
+                        name: self._get_partitions(connection, table, partitions)
+                        for name, table in SNAPSHOT_TABLES.items()
+                    },
+                )
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+from flask import Config
+from injector import inject
+from app.services.bank_account import BankAccountService
+from flask_restful import Resource
+from app.schemas.bank_account import BalanceBatchSchema
+from app.schemas.ledger import LedgerPageSchema, LedgerQuerySchema
+from app.schemas.metrics import CoalescingStatsSchema, KeyFilterStatsSchema, WriteBehindMetricsSchema
+from webargs.flaskparser import use_args
+from app.utils.response_serializer import serialize_response
+
+
+class BankAccountLedgerResource(Resource):
+    @inject
+    def __init__(self, service: BankAccountService, config: Config):
+        self.service = service
+        self.page_size = int(config['LEDGER_PAGE_SIZE'])
+
+    @use_args(LedgerQuerySchema(), location='query')
+    @serialize_response(LedgerPageSchema(), HTTPStatus.OK)
+    def get(self, query, iban: str):
+        """Returns bank account ledger newest entries first.
+        Next page is requested with next_before of the previous one"""
+        return self.service.get_ledger_page(iban, query.get('limit', self.page_size), query.get('before'))
+
+
+class BankAccountBalanceBatchResource(Resource):
+    @inject
+    def __init__(self, service: BankAccountService):
+        self.service = service
+
+    @use_args(BalanceBatchSchema())
+    @serialize_response(BalanceBatchSchema(), HTTPStatus.OK)
+    def post(self, batch):
+        """Applies balance deltas at once, deltas of nonexistent bank accounts are reported and skipped"""
+        return self.service.apply_balance_deltas(batch)
+
+
+class BalanceWriteBehindMetricsResource(Resource):
+    @inject
+    def __init__(self, service: BankAccountService):
+        self.service = service
+
+    @serialize_response(WriteBehindMetricsSchema(), HTTPStatus.OK)
+    def get(self):
+        """Returns flush latency and coalescing ratio of buffered balance changes of this process"""
+        return self.service.get_write_behind_metrics()
+
+
+class BankAccountFilterMetricsResource(Resource):
+    @inject
+    def __init__(self, service: BankAccountService):
+        self.service = service
+
+    @serialize_response(KeyFilterStatsSchema(), HTTPStatus.OK)
+    def get(self):
+        """Returns counters of the filter of existing IBANs of this process"""
+        return self.service.get_filter_stats()
+
+
+class BankAccountCoalescingMetricsResource(Resource):
+    @inject
+    def __init__(self, service: BankAccountService):
+        self.service = service
+
+    @serialize_response(CoalescingStatsSchema(), HTTPStatus.OK)
+    def get(self):
+        """Returns how many concurrent bank account reads of this process waited for a fetch made by another one"""
+        return self.service.get_coalescing_stats()
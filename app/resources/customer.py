@@ -1,16 +1,62 @@
 from http import HTTPStatus
+from itertools import islice
+from typing import Optional
+from flask import Config, Flask, Response, request, stream_with_context
 from injector import inject
+from marshmallow import ValidationError
 from app.services.customer import CustomerService
 from flask_restful import Resource
-from app.schemas.customer import CustomerCreateSchema, CustomerUpdateSchema, CustomerRetrieveSchema
+from app.schemas.customer import (CustomerBatchSchema, CustomerCreateSchema, CustomerListQuerySchema,
+                                  CustomerPageSchema, CustomerRetrieveQuerySchema, CustomerRetrieveSchema,
+                                  CustomerUpdateSchema)
+from app.schemas.metrics import CacheStatsSchema, CoalescingStatsSchema, KeyFilterStatsSchema
 from webargs.flaskparser import use_args
+from werkzeug.datastructures import ETags
+from werkzeug.http import quote_etag
+from app.utils.json_stream import dump_ndjson, iter_json_array, iter_ndjson
 from app.utils.response_serializer import serialize_response
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+
+
+def parse_versions(etags: ETags) -> list[int]:
+    """Versions given by ETags of customer, tags not issued by the application can't match"""
+    return [int(tag) for tag in etags.as_set() if tag.isdigit()]
+
+
+def only_customer_fields(field_names: Optional[list[str]], *other_fields: str) -> Optional[list[str]]:
+    """Argument `only` of schema dumping the requested fields of customers nested in the response"""
+    if field_names is None:
+        return None
+
+    return [*(f'customers.{name}' for name in field_names), *other_fields]
+
 
 class CustomersResource(Resource):
     @inject
-    def __init__(self, service: CustomerService):
+    def __init__(self, service: CustomerService, config: Config):
         self.service = service
+        self.page_size = int(config['CUSTOMER_PAGE_SIZE'])
+
+    @use_args(CustomerListQuerySchema(), location='query')
+    def get(self, query):
+        """Returns customers ordered by uuid, optionally filtered by last_name and email.
+        Next page is requested with next_cursor of the previous one.
+        With comma-separated uuid, returns these customers instead, like CustomersBatchResource.
+        With comma-separated fields, only these fields of customers are read and returned"""
+        field_names = query.get('field_names')
+
+        if 'uuid' in query:
+            schema = CustomerBatchSchema(only=only_customer_fields(field_names, 'missing_uuids'))
+
+            return schema.dump(self.service.get_many(query['uuid'], field_names)), HTTPStatus.OK
+
+        filters = {key: query[key] for key in ('last_name', 'email') if key in query}
+        schema = CustomerPageSchema(only=only_customer_fields(field_names, 'next_cursor'))
+
+        return schema.dump(self.service.get_page(
+            query.get('limit', self.page_size), query.get('cursor'), filters, field_names
+        )), HTTPStatus.OK
 
     @use_args(CustomerCreateSchema())
     @serialize_response(CustomerCreateSchema(), HTTPStatus.CREATED)
@@ -18,20 +64,171 @@ class CustomersResource(Resource):
         return self.service.create(customer)
 
 
+class CustomersBulkResource(Resource):
+    @inject
+    def __init__(self, service: CustomerService, config: Config):
+        self.service = service
+        self.chunk_size = int(config['CUSTOMER_BULK_CREATE_CHUNK_SIZE'])
+
+    def post(self):
+        """Accepts JSON array or NDJSON stream of customers and creates them chunk by chunk.
+        Every chunk is written in its own transaction, so errors are reported per item.
+        Malformed JSON array is reported as error of the item it starts at, and the items before it
+        are still created, since earlier chunks are already committed"""
+        if request.mimetype in NDJSON_MIMETYPES:
+            items = iter_ndjson(request.stream)
+        else:
+            items = iter_json_array(request.stream)
+
+        schema = CustomerCreateSchema(many=True)
+        created, errors = [], []
+
+        offset = 0
+        malformed_error = None
+        while malformed_error is None:
+            chunk = []
+            try:
+                chunk.extend(islice(items, self.chunk_size))
+            except ValueError as e:
+                malformed_error = f'Malformed JSON: {e}'
+
+            if not chunk:
+                break
+
+            try:
+                valid_data, validation_errors = schema.load(chunk), {}
+            except ValidationError as e:
+                valid_data, validation_errors = e.valid_data, e.messages
+
+            indexes = [index for index in range(len(chunk)) if index not in validation_errors]
+            results = self.service.bulk_create([valid_data[index] for index in indexes])
+
+            errors.extend(
+                {'index': offset + index, 'errors': messages} for index, messages in validation_errors.items()
+            )
+            for index, result in zip(indexes, results):
+                if 'uuid' in result:
+                    created.append({'index': offset + index, 'uuid': result['uuid']})
+                else:
+                    errors.append({'index': offset + index, 'errors': {'error': result['error']}})
+
+            offset += len(chunk)
+
+        if malformed_error is not None:
+            errors.append({'index': offset, 'errors': {'error': malformed_error}})
+
+        errors.sort(key=lambda error: error['index'])
+
+        return {'created': created, 'errors': errors}, HTTPStatus.OK
+
+
+class CustomersBatchResource(Resource):
+    @inject
+    def __init__(self, service: CustomerService):
+        self.service = service
+
+    @use_args(CustomerBatchSchema())
+    def post(self, batch):
+        """Returns customers by the list of uuids too long for query string, in the order of the list.
+        All of them are read by one query, uuids of nonexistent customers are reported.
+        With the list of fields, only these fields of customers are read and returned"""
+        field_names = batch.get('field_names')
+        schema = CustomerBatchSchema(only=only_customer_fields(field_names, 'missing_uuids'))
+
+        return schema.dump(self.service.get_many(batch['uuids'], field_names)), HTTPStatus.OK
+
+
 class CustomerResource(Resource):
     @inject
     def __init__(self, service: CustomerService):
         self.service = service
 
     @use_args(CustomerUpdateSchema())
-    @serialize_response(None, HTTPStatus.NO_CONTENT)
     def patch(self, customer, uuid: str):
-        self.service.update(uuid, customer)
+        """Updates the customer. With If-Match only if it's still at one of the given versions,
+        If-Match: * matches any version of the existing customer"""
+        expected_versions = None
+        if request.if_match and not request.if_match.star_tag:
+            expected_versions = parse_versions(request.if_match)
+
+        version = self.service.update(uuid, customer, expected_versions, must_exist=request.if_match.star_tag)
+
+        return '', HTTPStatus.NO_CONTENT, {'ETag': quote_etag(str(version))}
 
     @serialize_response(None, HTTPStatus.NO_CONTENT)
     def delete(self, uuid: str):
         self.service.delete(uuid)
 
-    @serialize_response(CustomerRetrieveSchema(), HTTPStatus.OK)
-    def get(self, uuid: str):
-        return self.service.get_by_uuid(uuid)
+    @use_args(CustomerRetrieveQuerySchema(), location='query')
+    def get(self, query, uuid: str):
+        """Returns the customer with its version as ETag. If it matches If-None-Match,
+        only the version is read and the body is omitted.
+        Comma-separated fields only filter the response: unlike the listing and multi-get,
+        all columns of the customer are read, since it's served from the cache of whole customers"""
+        if request.if_none_match:
+            version = str(self.service.get_version(uuid))
+
+            if request.if_none_match.contains_weak(version):
+                return '', HTTPStatus.NOT_MODIFIED, {'ETag': quote_etag(version)}
+
+        customer = self.service.get_by_uuid(uuid)
+
+        return (
+            CustomerRetrieveSchema(only=query.get('field_names')).dump(customer),
+            HTTPStatus.OK,
+            {'ETag': quote_etag(str(customer.version))}
+        )
+
+
+class CustomersExportResource(Resource):
+    @inject
+    def __init__(self, service: CustomerService, app: Flask):
+        self.service = service
+        self.logger = app.logger
+
+    def get(self):
+        """Streams every customer with bank accounts and cards as NDJSON, one customer per line.
+        Customers are read while the response is sent, so memory stays flat whatever their number"""
+        def log_throughput(count: int, duration: float):
+            self.logger.info(
+                'Exported %d customers in %.2fs, %.0f customers/sec',
+                count, duration, count / duration if duration else 0
+            )
+
+        return Response(
+            stream_with_context(dump_ndjson(self.service.export(), on_finish=log_throughput)),
+            mimetype=NDJSON_MIMETYPES[0]
+        )
+
+
+class CustomerCacheMetricsResource(Resource):
+    @inject
+    def __init__(self, service: CustomerService):
+        self.service = service
+
+    @serialize_response(CacheStatsSchema(), HTTPStatus.OK)
+    def get(self):
+        """Returns counters of customer cache of this process and of the cache shared by processes of the host"""
+        return self.service.get_cache_stats()
+
+
+class CustomerFilterMetricsResource(Resource):
+    @inject
+    def __init__(self, service: CustomerService):
+        self.service = service
+
+    @serialize_response(KeyFilterStatsSchema(), HTTPStatus.OK)
+    def get(self):
+        """Returns counters of the filter of existing customer uuids of this process"""
+        return self.service.get_filter_stats()
+
+
+class CustomerCoalescingMetricsResource(Resource):
+    @inject
+    def __init__(self, service: CustomerService):
+        self.service = service
+
+    @serialize_response(CoalescingStatsSchema(), HTTPStatus.OK)
+    def get(self):
+        """Returns how many concurrent customer reads of this process waited for a fetch made by another one"""
+        return self.service.get_coalescing_stats()
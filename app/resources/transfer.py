@@ -0,0 +1,18 @@
+from http import HTTPStatus
+from injector import inject
+from app.services.bank_account import BankAccountService
+from flask_restful import Resource
+from app.schemas.transfer import TransferSchema
+from webargs.flaskparser import use_args
+from app.utils.response_serializer import serialize_response
+
+
+class TransfersResource(Resource):
+    @inject
+    def __init__(self, service: BankAccountService):
+        self.service = service
+
+    @use_args(TransferSchema())
+    @serialize_response(TransferSchema(), HTTPStatus.OK)
+    def post(self, transfer):
+        return self.service.transfer(transfer)
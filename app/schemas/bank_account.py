@@ -1,4 +1,4 @@
-from marshmallow import fields, Schema, validates, ValidationError
+from marshmallow import fields, Schema, validate, validates, ValidationError
 import re
 
 
@@ -24,3 +24,14 @@ class BankAccountSchema(Schema):
         if currency.upper() not in ALLOWED_CURRENCY_LIST:
             raise ValidationError("Not a valid currency.")
         return currency
+
+
+class BalanceDeltaSchema(Schema):
+    iban = fields.String(required=True)
+    amount = fields.Float(required=True)
+
+
+class BalanceBatchSchema(Schema):
+    deltas = fields.Nested(BalanceDeltaSchema, many=True, required=True, load_only=True,
+                           validate=validate.Length(min=1))
+    missing_ibans = fields.List(fields.String(), dump_only=True)
@@ -1,7 +1,13 @@
 from marshmallow import fields, Schema, validates, ValidationError, validate
+from webargs.fields import DelimitedList
+import base64
+import binascii
 import re
 from app.schemas.bank_account import BankAccountSchema
 
+# Customers read by one request, the ids are given in query string of GET or in body of POST
+MAX_BATCH_SIZE = 500
+
 
 class BaseCustomerSchema(Schema):
     passport_number = fields.String(required=True)
@@ -39,3 +45,57 @@ class CustomerUpdateSchema(BaseCustomerSchema):
 
 class CustomerRetrieveSchema(BaseCustomerSchema):
     pass
+
+
+def field_name_of(schema_class: type[Schema]) -> fields.String:
+    """Name of a field of the schema, requested fields are the only ones dumped"""
+    return fields.String(validate=validate.OneOf(list(schema_class().fields)))
+
+
+class CustomerRetrieveQuerySchema(Schema):
+    """Fields of a single customer only filter the response, the customer is read and cached whole"""
+    field_names = DelimitedList(field_name_of(CustomerRetrieveSchema), data_key='fields',
+                                validate=validate.Length(min=1))
+
+
+class CursorField(fields.Field):
+    """Key of the last item of the page, encoded so that clients don't rely on its format"""
+    def _serialize(self, value, attr, obj, **kwargs):
+        if value is None:
+            return None
+
+        return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            return base64.b64decode(value + '=' * (-len(value) % 4), altchars=b'-_', validate=True).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError, TypeError):
+            raise ValidationError('Not a valid cursor.')
+
+
+class CustomerListItemSchema(CustomerRetrieveSchema):
+    uuid = fields.String()
+
+
+class CustomerPageSchema(Schema):
+    customers = fields.Nested(CustomerListItemSchema, many=True)
+    next_cursor = CursorField(allow_none=True)
+
+
+class CustomerListQuerySchema(Schema):
+    limit = fields.Integer(validate=validate.Range(min=1, max=500))
+    cursor = CursorField()
+    last_name = fields.String(validate=validate.Length(max=64))
+    email = fields.String()
+    uuid = DelimitedList(fields.String(), validate=validate.Length(min=1, max=MAX_BATCH_SIZE))
+    field_names = DelimitedList(field_name_of(CustomerListItemSchema), data_key='fields',
+                                validate=validate.Length(min=1))
+
+
+class CustomerBatchSchema(Schema):
+    uuids = fields.List(fields.String(), required=True, load_only=True,
+                        validate=validate.Length(min=1, max=MAX_BATCH_SIZE))
+    field_names = fields.List(field_name_of(CustomerListItemSchema), data_key='fields', load_only=True,
+                              validate=validate.Length(min=1))
+    customers = fields.Nested(CustomerListItemSchema, many=True, dump_only=True)
+    missing_uuids = fields.List(fields.String(), dump_only=True)
@@ -0,0 +1,17 @@
+from marshmallow import fields, Schema, validate
+
+
+class LedgerEntrySchema(Schema):
+    entry_id = fields.Integer(data_key='id')
+    amount = fields.Float()
+    created_at = fields.DateTime()
+
+
+class LedgerPageSchema(Schema):
+    entries = fields.Nested(LedgerEntrySchema, many=True)
+    next_before = fields.Integer(allow_none=True)
+
+
+class LedgerQuerySchema(Schema):
+    limit = fields.Integer(validate=validate.Range(min=1, max=500))
+    before = fields.Integer(validate=validate.Range(min=1))
@@ -0,0 +1,56 @@
+from marshmallow import fields, Schema
+
+
+class WriteBehindMetricsSchema(Schema):
+    enabled = fields.Boolean()
+    pending_entries = fields.Integer()
+    pending_keys = fields.Integer()
+    flushes = fields.Integer()
+    failed_flushes = fields.Integer()
+    flushed_entries = fields.Integer()
+    flushed_keys = fields.Integer()
+    coalescing_ratio = fields.Float(allow_none=True)
+    last_flush_latency_ms = fields.Float(allow_none=True)
+    max_flush_latency_ms = fields.Float(allow_none=True)
+    average_flush_latency_ms = fields.Float(allow_none=True)
+
+
+class SharedCacheStatsSchema(Schema):
+    enabled = fields.Boolean()
+    hits = fields.Integer()
+    misses = fields.Integer()
+    hit_rate = fields.Float(allow_none=True)
+    average_latency_us = fields.Float(allow_none=True)
+
+
+class CacheStatsSchema(Schema):
+    entries = fields.Integer()
+    memory = fields.Integer()
+    max_memory = fields.Integer()
+    hits = fields.Integer()
+    misses = fields.Integer()
+    evictions = fields.Integer()
+    expirations = fields.Integer()
+    hit_rate = fields.Float(allow_none=True)
+    average_latency_us = fields.Float(allow_none=True)
+    shared = fields.Nested(SharedCacheStatsSchema)
+
+
+class KeyFilterStatsSchema(Schema):
+    enabled = fields.Boolean()
+    ready = fields.Boolean()
+    added_keys = fields.Integer(allow_none=True)
+    removed_keys = fields.Integer()
+    memory = fields.Integer(allow_none=True)
+    hash_count = fields.Integer(allow_none=True)
+    expected_false_positive_rate = fields.Float(allow_none=True)
+    definite_misses = fields.Integer()
+    passed_lookups = fields.Integer()
+    false_positives = fields.Integer()
+    observed_false_positive_rate = fields.Float(allow_none=True)
+
+
+class CoalescingStatsSchema(Schema):
+    fetches = fields.Integer()
+    coalesced = fields.Integer()
+    coalesced_rate = fields.Float(allow_none=True)
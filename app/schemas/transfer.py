@@ -0,0 +1,14 @@
+from marshmallow import fields, Schema, validate, validates_schema, ValidationError
+
+
+class TransferSchema(Schema):
+    source_iban = fields.String(required=True)
+    target_iban = fields.String(required=True)
+    amount = fields.Float(required=True, validate=validate.Range(min=0, min_inclusive=False))
+    source_balance = fields.Float(dump_only=True)
+    target_balance = fields.Float(dump_only=True)
+
+    @validates_schema
+    def validate_bank_accounts(self, data, **kwargs):
+        if data.get('source_iban') == data.get('target_iban'):
+            raise ValidationError('Source and target bank accounts must differ.', 'target_iban')
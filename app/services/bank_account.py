@@ -1,22 +1,127 @@
-from typing import Union
+import os
+from typing import Optional, Union
+
+from flask import Config, Flask
+from injector import inject
 
 from app.repositories.sqlalchemy.bank_account import BankAccountRepository
-from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.bank_account import BankAccount, BankAccountSnapshot
 from app.exceptions import DoesNotExistException
+from app.utils.write_behind import WriteBehindBuffer
+from config import is_enabled
 
 
 class BankAccountService:
+    @inject
     def __init__(
         self,
-        bank_account_repository: BankAccountRepository
+        bank_account_repository: BankAccountRepository,
+        config: Config,
+        app: Flask
     ):
         self._bank_account_repository = bank_account_repository
+        self._app = app
+
+        self._balance_buffer = None
+        if is_enabled(config['BALANCE_WRITE_BEHIND']):
+            self._balance_buffer = WriteBehindBuffer(
+                self._flush_balance_deltas,
+                self._find_flushed_segments,
+                interval=int(config['BALANCE_WRITE_BEHIND_INTERVAL']) / 1000,
+                max_entries=int(config['BALANCE_WRITE_BEHIND_MAX_ENTRIES']),
+                spill_directory=config['BALANCE_WRITE_BEHIND_SPILL_DIRECTORY'] or os.path.join(
+                    app.instance_path, 'balance-write-behind'
+                ),
+            )
+            self._balance_buffer.start()
 
     def create(self, data: dict, customer_uuid: str) -> BankAccount:
         return self._bank_account_repository.create(data, customer_uuid)
 
     def update_balance_by_amount(self, iban: str, amount: Union[float, int]) -> None:
-        self._bank_account_repository.update_balance_by_amount(iban, amount)
+        """With BALANCE_WRITE_BEHIND enabled the change is only buffered and reaches the database
+        with the next flush, so it isn't visible to reads until then"""
+        if self._balance_buffer is not None:
+            self._balance_buffer.add(iban, amount)
+        else:
+            self._bank_account_repository.update_balance_by_amount(iban, amount)
+
+    def _flush_balance_deltas(
+        self,
+        deltas: list[tuple[str, float]],
+        segment_ids: list[str],
+        released_segment_ids: list[str]
+    ) -> None:
+        # Called by flushing thread, which has no application context of its own
+        with self._app.app_context():
+            missing_ibans = self._bank_account_repository.apply_balance_deltas(
+                deltas, segment_ids, released_segment_ids
+            )
+
+        if missing_ibans:
+            self._app.logger.warning('Buffered balance changes of nonexistent bank accounts dropped: %s', missing_ibans)
+
+    def _find_flushed_segments(self, segment_ids: list[str]) -> set[str]:
+        with self._app.app_context():
+            return self._bank_account_repository.get_flushed_segments(segment_ids)
+
+    def flush_balance_changes(self) -> int:
+        """Writes buffered balance changes to the database. Returns the number of changed bank accounts"""
+        if self._balance_buffer is None:
+            return 0
+
+        return self._balance_buffer.flush()
+
+    def get_write_behind_metrics(self) -> dict:
+        if self._balance_buffer is None:
+            return {'enabled': False}
+
+        return dict(self._balance_buffer.metrics, enabled=True)
+
+    def get_filter_stats(self) -> dict:
+        return self._bank_account_repository.filter_stats
+
+    def get_coalescing_stats(self) -> dict:
+        return self._bank_account_repository.coalescing_stats
+
+    def debit(self, iban: str, amount: Union[float, int]) -> float:
+        return self._bank_account_repository.debit(iban, amount)
+
+    def transfer(self, data: dict) -> dict:
+        balances = self._bank_account_repository.transfer(data['source_iban'], data['target_iban'], data['amount'])
+
+        return dict(
+            data,
+            source_balance=balances[data['source_iban']],
+            target_balance=balances[data['target_iban']],
+        )
+
+    def apply_balance_deltas(self, data: dict) -> dict:
+        missing_ibans = self._bank_account_repository.apply_balance_deltas(
+            (delta['iban'], delta['amount']) for delta in data['deltas']
+        )
+
+        return {'missing_ibans': missing_ibans}
+
+    def get_ledger_page(self, iban: str, limit: int, before_id: Optional[int] = None) -> dict:
+        entries = self._bank_account_repository.get_ledger_entries(iban, limit + 1, before_id)
+
+        if not entries and not self._bank_account_repository.is_exists(iban):
+            raise DoesNotExistException('BankAccount does not exist!')
+
+        return {
+            'entries': entries[:limit],
+            'next_before': entries[limit - 1].entry_id if len(entries) > limit else None,
+        }
+
+    def promote_to_hot(self, iban: str, shard_count: Optional[int] = None) -> int:
+        return self._bank_account_repository.promote_to_hot(iban, shard_count)
+
+    def demote_from_hot(self, iban: str) -> None:
+        self._bank_account_repository.demote_from_hot(iban)
+
+    def compact_ledger(self) -> int:
+        return self._bank_account_repository.compact_ledger()
 
     def delete(self, iban: str) -> None:
         is_deleted = self._bank_account_repository.delete(iban)
@@ -34,5 +139,5 @@ class BankAccountService:
             bank_account.IBAN for bank_account in bank_accounts
         ])
 
-    def get_by_iban(self, iban: str) -> BankAccount:
+    def get_by_iban(self, iban: str) -> BankAccountSnapshot:
         return self._bank_account_repository.get_by_iban(iban)
@@ -1,14 +1,17 @@
 from app.exceptions import DoesNotExistException
 from app.repositories.sqlalchemy.bank_card import BankCardRepository
 from app.models.sqlalchemy.bank_card import BankCard
+from app.utils.secret_hashing import SecretHasher
 
 
 class BankCardService:
     def __init__(
         self,
-        bank_card_repository: BankCardRepository
+        bank_card_repository: BankCardRepository,
+        secret_hasher: SecretHasher
     ):
         self._bank_card_repository = bank_card_repository
+        self._secret_hasher = secret_hasher
 
     def create(self, data: dict, bank_account_iban: str) -> tuple[BankCard, str, str]:
         return self._bank_card_repository.create(data, bank_account_iban)
@@ -28,3 +31,24 @@ class BankCardService:
 
     def get_by_card_number(self, card_number: str) -> BankCard:
         return self._bank_card_repository.get_by_card_number(card_number)
+
+    def _check_secret(self, card_number: str, secret: str, field: str) -> bool:
+        """Checks secret against the hash stored in the field.
+        Hash made by another scheme than the configured one is replaced after successful check"""
+        bank_card = self._bank_card_repository.get_by_card_number(card_number)
+        stored_hash = getattr(bank_card, field)
+
+        is_valid = self._secret_hasher.check_hash(stored_hash, secret, card_number).result()
+
+        if is_valid and self._secret_hasher.needs_rehash(stored_hash):
+            self._bank_card_repository.update_secret_hashes(card_number, {
+                field: self._secret_hasher.generate_hash(secret, card_number).result()
+            })
+
+        return is_valid
+
+    def check_pin(self, card_number: str, pin: str) -> bool:
+        return self._check_secret(card_number, pin, '_pin_hash')
+
+    def check_cvv(self, card_number: str, cvv: str) -> bool:
+        return self._check_secret(card_number, cvv, '_cvv_hash')
@@ -1,7 +1,11 @@
-from app.exceptions import DoesNotExistException
+from typing import Callable, Iterator, Optional
+
+from app.exceptions import DoesNotExistException, NotFoundException, PreconditionFailedException
+from app.models.sqlalchemy.bank_account import CurrencyEnum
 from app.repositories.sqlalchemy.customer import CustomerRepository
 from app.repositories.sqlalchemy.bank_account import BankAccountRepository
-from app.models.sqlalchemy.customer import Customer
+from app.models.sqlalchemy.customer import Customer, CustomerSnapshot
+from app.storage.sqlalchemy import UnitOfWork
 from injector import inject
 
 
@@ -10,28 +14,165 @@ class CustomerService:
     def __init__(
         self,
         customer_repository: CustomerRepository,
-        bank_account_repository: BankAccountRepository
+        bank_account_repository: BankAccountRepository,
+        unit_of_work: UnitOfWork
     ):
         self._customer_repository = customer_repository
         self._bank_account_repository = bank_account_repository
+        self._unit_of_work = unit_of_work
 
     def create(self, data: dict) -> Customer:
         """Creates customer and bank account for him.
-        Customer can't exist without bank account due to domain constraints"""
-        customer = self._customer_repository.create(data)
+        Customer can't exist without bank account due to domain constraints,
+        so both are written in a single transaction"""
+        with self._unit_of_work:
+            customer = self._customer_repository.create(data)
 
-        self._bank_account_repository.create(data['bank_account'], customer.uuid)
+            self._bank_account_repository.create(data['bank_account'], customer.uuid)
 
         return customer
 
+    def bulk_create(self, data: list[dict]) -> list[dict]:
+        """Creates customers with their bank accounts in one transaction, which is committed
+        even if the call is a part of larger unit of work, e.g. request of bulk creation.
+        Returns either created customer uuid or error message for every item in the order of input data"""
+        return self._create_with_bank_accounts(data, self._customer_repository.bulk_create)
+
+    def import_batch(self, data: list[dict]) -> list[dict]:
+        """Same as bulk_create, but customers are copied through staging table, which pays off for batches
+        of thousands of rows, e.g. of import-customers command"""
+        return self._create_with_bank_accounts(data, self._customer_repository.import_batch)
+
+    def _create_with_bank_accounts(
+            self,
+            data: list[dict],
+            create_customers: Callable[[list[dict]], list[Optional[str]]]
+    ) -> list[dict]:
+        results = [{} for _ in data]
+        valid_items = []
+
+        for result, item in zip(results, data):
+            if item['bank_account']['currency'] not in CurrencyEnum.__members__:
+                result['error'] = 'Currency does not exist!'
+            else:
+                valid_items.append((result, item))
+
+        if not valid_items:
+            return results
+
+        with self._unit_of_work:
+            uuids = create_customers([item for _, item in valid_items])
+
+            created_items = [(item, uuid) for (_, item), uuid in zip(valid_items, uuids) if uuid is not None]
+            if created_items:
+                self._bank_account_repository.bulk_create(
+                    [item['bank_account'] for item, _ in created_items],
+                    [uuid for _, uuid in created_items]
+                )
+
+            self._unit_of_work.checkpoint()
+
+        for (result, _), uuid in zip(valid_items, uuids):
+            if uuid is None:
+                result['error'] = 'Customer already exist!'
+            else:
+                result['uuid'] = uuid
+
+        return results
+
     def delete(self, uuid: str) -> None:
         is_deleted = self._customer_repository.delete(uuid)
 
         if not is_deleted:
             raise DoesNotExistException('Customer does not exist!')
 
-    def update(self, uuid: str, data: dict) -> None:
-        self._customer_repository.update(uuid, data)
+    def update(
+            self,
+            uuid: str,
+            data: dict,
+            expected_versions: Optional[list[int]] = None,
+            must_exist: bool = False
+    ) -> int:
+        """Returns the new version of the customer. If it doesn't exist, the precondition fails
+        when must_exist is set, like If-Match: * matching any existing customer"""
+        version = self._customer_repository.update(uuid, data, expected_versions)
+
+        if version is None:
+            if must_exist:
+                raise PreconditionFailedException('Customer does not exist!')
+
+            raise NotFoundException('Customer does not exist!')
+
+        return version
 
-    def get_by_uuid(self, uuid: str) -> Customer:
+    def get_page(
+            self,
+            limit: int,
+            cursor: Optional[str] = None,
+            filters: Optional[dict] = None,
+            fields: Optional[list[str]] = None
+    ) -> dict:
+        customers = self._customer_repository.get_page(limit + 1, cursor, fields=fields, **(filters or {}))
+
+        return {
+            'customers': customers[:limit],
+            'next_cursor': customers[limit - 1].uuid if len(customers) > limit else None,
+        }
+
+    def export(self) -> Iterator[dict]:
+        """Yields every customer with bank accounts and their cards, assembled from the rows of one join
+        as they are fetched, so only the current customer is kept in memory"""
+        customer, bank_account = None, None
+
+        for row in self._customer_repository.iter_export_rows():
+            if customer is None or customer['uuid'] != row.uuid:
+                if customer is not None:
+                    yield customer
+
+                customer = {field: getattr(row, field) for field in CustomerSnapshot._fields}
+                customer['bank_accounts'] = []
+                bank_account = None
+
+            if row.IBAN is not None and (bank_account is None or bank_account['iban'] != row.IBAN):
+                bank_account = {
+                    'iban': row.IBAN,
+                    'currency': row.currency.value,
+                    'balance': row.balance,
+                    'cards': [],
+                }
+                customer['bank_accounts'].append(bank_account)
+
+            if row.card_number is not None:
+                bank_account['cards'].append({
+                    'card_number': row.card_number,
+                    'expiration_date': row.expiration_date.isoformat(),
+                })
+
+        if customer is not None:
+            yield customer
+
+    def get_version(self, uuid: str) -> int:
+        return self._customer_repository.get_version(uuid)
+
+    def get_by_uuid(self, uuid: str) -> CustomerSnapshot:
         return self._customer_repository.get_by_uuid(uuid)
+
+    def get_many(self, uuids: list[str], fields: Optional[list[str]] = None) -> dict:
+        """Returns customers in the order of the given uuids, repeated ones only once, and uuids of missing customers"""
+        uuids = list(dict.fromkeys(uuids))
+        customers = self._customer_repository.get_many(uuids, fields)
+
+        return {
+            'customers': [customers[uuid] for uuid in uuids if uuid in customers],
+            'missing_uuids': [uuid for uuid in uuids if uuid not in customers],
+        }
+
+    def get_cache_stats(self) -> dict:
+        """Counters of the in-process customer cache and of the cache shared by processes of the host"""
+        return dict(self._customer_repository.cache_stats, shared=self._customer_repository.shared_cache_stats)
+
+    def get_filter_stats(self) -> dict:
+        return self._customer_repository.filter_stats
+
+    def get_coalescing_stats(self) -> dict:
+        return self._customer_repository.coalescing_stats
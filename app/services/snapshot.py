@@ -0,0 +1,114 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Config, Flask
+from injector import inject
+
+from app.repositories.sqlalchemy.snapshot import SnapshotRepository, export_partition
+from app.utils.columnar_writer import FILE_EXTENSIONS
+
+
+class SnapshotService:
+    MANIFEST_NAME = 'manifest.json'
+
+    @inject
+    def __init__(self, snapshot_repository: SnapshotRepository, config: Config, app: Flask):
+        self._snapshot_repository = snapshot_repository
+
+        self._directory = config['SNAPSHOT_DIRECTORY'] or os.path.join(app.instance_path, 'snapshots')
+        self._workers = int(config['SNAPSHOT_WORKERS'])
+        self._batch_size = int(config['SNAPSHOT_BATCH_SIZE'])
+
+    def get_latest_manifest(self, directory: Optional[str] = None) -> Optional[dict]:
+        """Manifest is written once all partitions are, so unfinished snapshots are skipped"""
+        directory = directory or self._directory
+        if not os.path.isdir(directory):
+            return None
+
+        for name in sorted(os.listdir(directory), reverse=True):
+            manifest_path = os.path.join(directory, name, self.MANIFEST_NAME)
+
+            if os.path.isfile(manifest_path):
+                with open(manifest_path, encoding='utf-8') as file:
+                    return json.load(file)
+
+        return None
+
+    def create(
+            self,
+            directory: Optional[str] = None,
+            workers: Optional[int] = None,
+            file_format: str = 'parquet',
+            incremental: bool = False
+    ) -> dict:
+        """Exports bank accounts and bank cards into SNAPSHOT_DIRECTORY/<id>/<table>/part-<n> files,
+        one per key range, by a pool of worker processes reading the same database snapshot.
+        Incremental snapshot has only the rows changed since the latest snapshot in the directory,
+        deleted rows are left out of full snapshots only. Returns the manifest written along with the files"""
+        directory = directory or self._directory
+        workers = workers or self._workers
+
+        base = self.get_latest_manifest(directory) if incremental else None
+        since_change_id = base['next_change_id'] if base is not None else None
+
+        created_at = datetime.now(timezone.utc)
+        snapshot_name = created_at.strftime('%Y%m%dT%H%M%S%fZ')
+        snapshot_path = os.path.join(directory, snapshot_name)
+
+        with self._snapshot_repository.export_snapshot(workers) as snapshot, ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            futures = {}
+
+            for table_name, partitions in snapshot.partitions.items():
+                os.makedirs(os.path.join(snapshot_path, table_name))
+
+                for index, partition in enumerate(partitions):
+                    file_name = os.path.join(table_name, f'part-{index:05}{FILE_EXTENSIONS[file_format]}')
+                    futures[table_name, file_name, partition] = pool.submit(
+                        export_partition,
+                        self._snapshot_repository.database_uri,
+                        snapshot.snapshot_id,
+                        table_name,
+                        partition,
+                        since_change_id,
+                        os.path.join(snapshot_path, file_name),
+                        file_format,
+                        self._batch_size,
+                    )
+
+            tables = {table_name: {'rows': 0, 'partitions': []} for table_name in snapshot.partitions}
+            for (table_name, file_name, partition), future in futures.items():
+                rows = future.result()
+
+                tables[table_name]['rows'] += rows
+                tables[table_name]['partitions'].append({
+                    'path': file_name,
+                    'lower': partition.lower,
+                    'upper': partition.upper,
+                    'rows': rows,
+                    'bytes': os.path.getsize(os.path.join(snapshot_path, file_name)),
+                })
+
+        manifest = {
+            'id': snapshot_name,
+            'created_at': created_at.isoformat(),
+            'format': file_format,
+            'base': base['id'] if base is not None else None,
+            'since_change_id': since_change_id,
+            'next_change_id': snapshot.next_change_id,
+            'tables': tables,
+        }
+
+        # Renamed into place, so readers never see partially written manifest
+        manifest_path = os.path.join(snapshot_path, self.MANIFEST_NAME)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+        return manifest
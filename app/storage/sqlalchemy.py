@@ -1,11 +1,122 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask import Flask
+from flask import Flask, g, has_request_context
+from injector import inject
 
 
-db = SQLAlchemy()
+# Instances stay loaded after commit, so serializing them doesn't issue reload SELECTs
+SESSION_OPTIONS = {'expire_on_commit': False}
+
+db = SQLAlchemy(session_options=SESSION_OPTIONS)
 
 
 def configure_db(app: Flask):
     db.init_app(app)
 
     return db
+
+
+class UnitOfWork:
+    """Lets repositories take part in a transaction owned by the caller.
+    While unit of work is active repositories only flush their changes,
+    the outermost block commits them at once or rolls them back on exception.
+    Every request is wrapped into unit of work, see bind_unit_of_work_to_requests.
+    The state is kept in the session, so the object itself can be shared between threads"""
+    DEPTH_KEY = 'unit_of_work_depth'
+    CALLBACKS_KEY = 'unit_of_work_callbacks'
+
+    @inject
+    def __init__(self, storage: SQLAlchemy):
+        self._storage = storage
+
+    @property
+    def is_active(self) -> bool:
+        return self._storage.session.info.get(self.DEPTH_KEY, 0) > 0
+
+    def __enter__(self):
+        self.begin()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end(commit=exc_type is None)
+
+    def begin(self):
+        info = self._storage.session.info
+        info[self.DEPTH_KEY] = info.get(self.DEPTH_KEY, 0) + 1
+
+    def end(self, commit: bool):
+        info = self._storage.session.info
+        info[self.DEPTH_KEY] -= 1
+
+        if info[self.DEPTH_KEY] == 0:
+            if commit:
+                self._commit()
+            else:
+                self._rollback()
+
+    def reset(self):
+        """Rolls back unit of work left open, e.g. by unhandled exception"""
+        if self.is_active:
+            self._storage.session.info[self.DEPTH_KEY] = 0
+            self._rollback()
+
+    def after_transaction(self, callback):
+        """Calls callback once the current transaction is committed or rolled back,
+        e.g. to drop cached data which concurrent readers could load before the commit"""
+        self._storage.session.info.setdefault(self.CALLBACKS_KEY, []).append(callback)
+
+    def commit(self):
+        """Commits changes unless they belong to caller-owned transaction"""
+        if self.is_active:
+            self._storage.session.flush()
+        else:
+            self._commit()
+
+    def checkpoint(self):
+        """Commits changes made so far and keeps unit of work open.
+        Used by operations which write independent batches within one request"""
+        self._commit()
+
+    def _commit(self):
+        self._storage.session.commit()
+
+        if has_request_context():
+            g.commit_count = g.get('commit_count', 0) + 1
+
+        self._run_callbacks()
+
+    def _rollback(self):
+        self._storage.session.rollback()
+        self._run_callbacks()
+
+    def _run_callbacks(self):
+        for callback in self._storage.session.info.pop(self.CALLBACKS_KEY, []):
+            callback()
+
+
+@inject
+def begin_request_unit_of_work(unit_of_work: UnitOfWork):
+    g.commit_count = 0
+    unit_of_work.begin()
+
+
+@inject
+def end_request_unit_of_work(response, unit_of_work: UnitOfWork):
+    if unit_of_work.is_active:
+        unit_of_work.end(commit=response.status_code < 400)
+
+    return response
+
+
+@inject
+def reset_request_unit_of_work(exception, unit_of_work: UnitOfWork):
+    unit_of_work.reset()
+
+
+def bind_unit_of_work_to_requests(app: Flask):
+    """Makes every request a single transaction. Changes are committed once after the view
+    or rolled back when error response is returned, e.g. when AppException is raised.
+    Has to be called before FlaskInjector is initialized, so that the handlers are injected"""
+    app.before_request(begin_request_unit_of_work)
+    app.after_request(end_request_unit_of_work)
+    app.teardown_request(reset_request_unit_of_work)
@@ -0,0 +1,49 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Set of strings answering membership with no false negatives and
+    false positives at about false_positive_rate while it holds up to capacity keys.
+    Keys can't be removed, removed keys only add false positives until the filter is rebuilt"""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        capacity = max(capacity, 1)
+
+        self._size = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self._hash_count = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, key: str):
+        # Double hashing derives all positions from a single digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+        return ((first + i * second) % self._size for i in range(self._hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+        self._count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        """Number of added keys, keys added several times are counted several times"""
+        return self._count
+
+    @property
+    def memory(self) -> int:
+        return len(self._bits)
+
+    @property
+    def hash_count(self) -> int:
+        return self._hash_count
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Expected rate for the number of keys added so far"""
+        return (1 - math.exp(-self._hash_count * self._count / self._size)) ** self._hash_count
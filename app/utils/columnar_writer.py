@@ -0,0 +1,50 @@
+from typing import Iterable
+
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+
+# Both formats can be memory-mapped by readers, e.g. pyarrow.parquet.read_table(path, memory_map=True)
+FILE_EXTENSIONS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+COMPRESSION = 'zstd'
+
+
+class ColumnarWriter:
+    """Writes rows to compressed Parquet or Arrow IPC file batch by batch,
+    so only one batch of rows is kept in memory"""
+
+    def __init__(self, path: str, schema: pyarrow.Schema, file_format: str):
+        self._schema = schema
+        self._rows = 0
+
+        if file_format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(path, schema, compression=COMPRESSION)
+        else:
+            self._writer = pyarrow.ipc.new_file(
+                path, schema, options=pyarrow.ipc.IpcWriteOptions(compression=COMPRESSION)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._writer.close()
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def write_rows(self, rows: Iterable[tuple]):
+        """Rows are tuples of values in the order of schema fields"""
+        columns = list(zip(*rows))
+        if not columns:
+            return
+
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+        self._rows += len(columns[0])
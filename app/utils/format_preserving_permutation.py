@@ -0,0 +1,66 @@
+import hashlib
+import hmac
+
+
+class FeistelPermutation:
+    """Keyed bijection of [0, domain_size) onto itself.
+    Balanced Feistel network works on the smallest even-bit domain covering domain_size
+    and cycle walking brings results that fall outside back into the range,
+    so sequential numbers are mapped to unique random looking ones"""
+
+    def __init__(self, domain_size: int, key: bytes, rounds: int = 8):
+        if domain_size < 2:
+            raise ValueError('Domain size must be greater than 1.')
+
+        self._domain_size = domain_size
+        self._key = key
+        self._rounds = rounds
+
+        self._half_bits = max(1, ((domain_size - 1).bit_length() + 1) // 2)
+        self._half_mask = (1 << self._half_bits) - 1
+
+    @property
+    def domain_size(self) -> int:
+        return self._domain_size
+
+    def _round_function(self, round_number: int, value: int) -> int:
+        message = round_number.to_bytes(1, 'big') + value.to_bytes((self._half_bits + 7) // 8, 'big')
+        digest = hmac.new(self._key, message, hashlib.sha256).digest()
+
+        return int.from_bytes(digest, 'big') & self._half_mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._half_mask
+
+        for round_number in range(self._rounds):
+            left, right = right, left ^ self._round_function(round_number, right)
+
+        return (left << self._half_bits) | right
+
+    def _decrypt(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._half_mask
+
+        for round_number in reversed(range(self._rounds)):
+            left, right = right ^ self._round_function(round_number, left), left
+
+        return (left << self._half_bits) | right
+
+    def permute(self, value: int) -> int:
+        if not 0 <= value < self._domain_size:
+            raise ValueError('Value is out of permutation domain.')
+
+        value = self._encrypt(value)
+        while value >= self._domain_size:
+            value = self._encrypt(value)
+
+        return value
+
+    def inverse(self, value: int) -> int:
+        if not 0 <= value < self._domain_size:
+            raise ValueError('Value is out of permutation domain.')
+
+        value = self._decrypt(value)
+        while value >= self._domain_size:
+            value = self._decrypt(value)
+
+        return value
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+def completed_future(function, *args) -> Future:
+    """Calls function in the calling thread and wraps the outcome into a future"""
+    future = Future()
+
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+
+    return future
+
+
+class HashingExecutor:
+    """Runs expensive hashing in a pool of worker processes, so request threads
+    only wait on futures instead of holding the GIL for the whole key derivation.
+    The pool is started on first use and restarted in forked processes.
+    With pool_size 0 functions are called in the calling thread"""
+
+    def __init__(self, pool_size: int):
+        self._pool_size = pool_size
+
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # Spawned workers don't inherit database connections and locks of the application process
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._pool_size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                self._pid = os.getpid()
+
+            return self._pool
+
+    def submit(self, function, *args) -> Future:
+        """Function and arguments have to be picklable"""
+        if self._pool_size < 1:
+            return completed_future(function, *args)
+
+        return self._get_pool().submit(function, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown()
+
+            self._pool = None
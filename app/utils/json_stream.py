@@ -0,0 +1,124 @@
+import codecs
+import json
+import time
+from typing import IO, Callable, Iterable, Iterator, Optional
+
+READ_SIZE = 64 * 1024
+WRITE_SIZE = 64 * 1024
+
+WHITESPACE = ' \t\n\r'
+
+
+def iter_ndjson(stream: IO[bytes]) -> Iterator:
+    """Yields objects of newline delimited JSON stream one by one.
+    Malformed lines are yielded as raw strings so that they are reported by schema validation"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line.decode('utf-8', errors='replace')
+
+
+def iter_json_array(stream: IO[bytes], read_size: int = READ_SIZE) -> Iterator:
+    """Yields items of top-level JSON array without loading the whole document into memory.
+    Raises ValueError if the stream is not a valid JSON array"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+
+    buffer = ''
+    position = 0
+    is_eof = False
+
+    def read_more():
+        nonlocal buffer, position, is_eof
+
+        chunk = stream.read(read_size)
+        is_eof = not chunk
+
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=is_eof)
+        position = 0
+
+    def next_char() -> str:
+        nonlocal position
+
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+
+            if position < len(buffer):
+                return buffer[position]
+
+            if is_eof:
+                raise ValueError('Unexpected end of JSON array.')
+
+            read_more()
+
+    if next_char() != '[':
+        raise ValueError('JSON array expected.')
+    position += 1
+
+    if next_char() == ']':
+        return
+
+    while True:
+        next_char()
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if is_eof:
+                    raise
+                read_more()
+                continue
+
+            if end == len(buffer) and not is_eof:
+                # Scalars may be cut by read boundary, so the item is decoded again with the next chunk
+                read_more()
+                continue
+
+            break
+
+        yield item
+        position = end
+
+        char = next_char()
+        position += 1
+
+        if char == ']':
+            return
+
+        if char != ',':
+            raise ValueError('Comma or end of JSON array expected.')
+
+
+def dump_ndjson(
+        items: Iterable,
+        write_size: int = WRITE_SIZE,
+        on_finish: Optional[Callable[[int, float], None]] = None
+) -> Iterator[str]:
+    """Yields items as newline delimited JSON in chunks of about write_size characters,
+    so that the output isn't written line by line. on_finish gets the number of items and seconds spent"""
+    started_at = time.perf_counter()
+    count = 0
+    lines, size = [], 0
+
+    for item in items:
+        line = json.dumps(item, separators=(',', ':')) + '\n'
+        lines.append(line)
+        size += len(line)
+        count += 1
+
+        if size >= write_size:
+            yield ''.join(lines)
+            lines, size = [], 0
+
+    if lines:
+        yield ''.join(lines)
+
+    if on_finish is not None:
+        on_finish(count, time.perf_counter() - started_at)
@@ -0,0 +1,134 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Approximate cost of OrderedDict node and entry tuple kept for every key
+ENTRY_OVERHEAD = 150
+
+
+def estimate_size(key: Hashable, value: Any) -> int:
+    """Shallow size of key and value plus the size of value items, enough for flat tuples of strings"""
+    size = sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+
+    if isinstance(value, tuple):
+        size += sum(sys.getsizeof(item) for item in value)
+
+    return size
+
+
+class LRUCache:
+    """Thread-safe cache bounded by approximate memory size of its entries.
+    Least recently used entries are evicted when the size exceeds max_memory,
+    entries older than ttl seconds are dropped on access.
+    Values should be immutable, since they are shared between threads.
+
+    Loaders take a token before reading the source and put the value with it.
+    The value is dropped if the key was invalidated in between,
+    so a slow loader can't bring back data changed by concurrent writer"""
+
+    def __init__(self, max_memory: int, ttl: float, sizeof: Callable[[Hashable, Any], int] = estimate_size):
+        self._max_memory = max_memory
+        self._ttl = ttl
+        self._sizeof = sizeof
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._memory = 0
+        self._invalidations = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._total_latency = 0.0
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._max_memory > 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._memory -= size
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        started = time.perf_counter()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+
+            self._total_latency += time.perf_counter() - started
+
+        return entry[2] if entry is not None else None
+
+    def token(self) -> int:
+        with self._lock:
+            return self._invalidations
+
+    def put(self, key: Hashable, value: Any, token: int) -> bool:
+        size = self._sizeof(key, value)
+
+        with self._lock:
+            # Invalidations are rare, so any of them makes values loaded before it suspicious
+            if token != self._invalidations or size > self._max_memory:
+                return False
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self._ttl, size, value)
+            self._memory += size
+
+            while self._memory > self._max_memory:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+            return True
+
+    def discard(self, key: Hashable):
+        """Removes entry found outdated by the caller, unlike invalidate doesn't affect running loads"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._invalidations += 1
+
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+            self._memory = 0
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+
+            return {
+                'entries': len(self._entries),
+                'memory': self._memory,
+                'max_memory': self._max_memory,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_rate': self._hits / lookups if lookups else None,
+                'average_latency_us': self._total_latency / lookups * 1e6 if lookups else None,
+            }
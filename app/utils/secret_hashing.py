@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+
+from flask import Config
+from injector import inject
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.utils.hashing_executor import HashingExecutor, completed_future
+from config import get_secret
+
+
+class HashingScheme(ABC):
+    """Hashes short secrets such as PINs and CVVs. Every scheme recognizes its own hashes,
+    so hashes made by different schemes can be stored in the same column"""
+    is_expensive = False
+
+    @abstractmethod
+    def identifies(self, stored_hash: bytes) -> bool:
+        pass
+
+    @abstractmethod
+    def generate(self, secret: str, context: bytes) -> bytes:
+        pass
+
+    @abstractmethod
+    def check(self, stored_hash: bytes, secret: str, context: bytes) -> bool:
+        pass
+
+
+class WerkzeugHashingScheme(HashingScheme):
+    """Salted key derivation of werkzeug. Used for cards issued before keyed hashing was introduced"""
+    is_expensive = True
+
+    def identifies(self, stored_hash: bytes) -> bool:
+        # Werkzeug hashes start with the name of the method, e.g. pbkdf2:sha256:...
+        return stored_hash[:1].isalpha()
+
+    def generate(self, secret: str, context: bytes) -> bytes:
+        return generate_password_hash(secret).encode('ascii')
+
+    def check(self, stored_hash: bytes, secret: str, context: bytes) -> bool:
+        return check_password_hash(stored_hash.decode('ascii'), secret)
+
+
+class HMACSHA256HashingScheme(HashingScheme):
+    """HMAC-SHA256 keyed with server-side pepper over the context, e.g. card number, and the secret.
+    Key derivation can't make 4-digit keyspace harder to brute force,
+    so the pepper kept outside of the database protects the hashes instead"""
+    TAG = b'\x01'
+
+    def __init__(self, pepper: bytes):
+        self._pepper = pepper
+
+    def identifies(self, stored_hash: bytes) -> bool:
+        return stored_hash[:1] == self.TAG
+
+    def generate(self, secret: str, context: bytes) -> bytes:
+        return self.TAG + hmac.new(self._pepper, context + b'\x00' + secret.encode('utf-8'), hashlib.sha256).digest()
+
+    def check(self, stored_hash: bytes, secret: str, context: bytes) -> bool:
+        return hmac.compare_digest(stored_hash, self.generate(secret, context))
+
+
+class SecretHasher:
+    """Hashes secrets with the scheme selected by PIN_HASH_SCHEME and checks them
+    against any known scheme. Expensive schemes are run by hashing executor.
+    Keyed hashes are checked only if PIN_HASH_PEPPER is set, it's required when they are generated"""
+
+    @inject
+    def __init__(self, config: Config, hashing_executor: HashingExecutor):
+        self._hashing_executor = hashing_executor
+
+        schemes = {'werkzeug': WerkzeugHashingScheme()}
+        if config['PIN_HASH_SCHEME'] == 'hmac-sha256' or config.get('PIN_HASH_PEPPER'):
+            schemes['hmac-sha256'] = HMACSHA256HashingScheme(get_secret(config, 'PIN_HASH_PEPPER').encode('utf-8'))
+
+        self._scheme = schemes[config['PIN_HASH_SCHEME']]
+        self._schemes = list(schemes.values())
+
+    def _submit(self, scheme: HashingScheme, function, *args) -> Future:
+        if scheme.is_expensive:
+            return self._hashing_executor.submit(function, *args)
+
+        return completed_future(function, *args)
+
+    def _identify(self, stored_hash: bytes) -> HashingScheme:
+        for scheme in self._schemes:
+            if scheme.identifies(stored_hash):
+                return scheme
+
+        raise ValueError('Unknown hashing scheme.')
+
+    def generate_hash(self, secret: str, context: str) -> Future:
+        return self._submit(self._scheme, self._scheme.generate, secret, context.encode('utf-8'))
+
+    def check_hash(self, stored_hash: bytes, secret: str, context: str) -> Future:
+        scheme = self._identify(stored_hash)
+
+        return self._submit(scheme, scheme.check, stored_hash, secret, context.encode('utf-8'))
+
+    def needs_rehash(self, stored_hash: bytes) -> bool:
+        return not self._scheme.identifies(stored_hash)
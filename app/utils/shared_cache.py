@@ -0,0 +1,230 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Magic, slot size, slot count, stripe count, epoch
+HEADER = struct.Struct('<8sIIIxxxxQ')
+MAGIC = b'ACCSHC01'
+# Sequence number, epoch, stripe generation, expiration time, key length, value length
+SLOT_HEADER = struct.Struct('<QQQdHH')
+GENERATION = struct.Struct('<Q')
+
+EPOCH_OFFSET = HEADER.size - GENERATION.size
+WAYS = 4
+STRIPE_COUNT = 65536
+
+
+def _hash(key: bytes) -> int:
+    # Built-in hash is salted per process, so it can't address memory shared by processes
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+class SharedCache:
+    """Hash table in memory-mapped file shared by all processes of the host opening the same path.
+    Layout of the table is a part of the file name, so processes with different settings or versions
+    use separate files and never reinitialize a file mapped by others.
+    Every key maps to a bucket of WAYS fixed-size slots, the slot expiring first is replaced.
+    Values which don't fit into a slot aren't cached.
+
+    Keys are spread over generation counters. Invalidation increments the counter of the key,
+    which makes every process treat entries written with the previous generation as missing,
+    and clear increments the epoch shared by all keys. Readers take no locks: every slot has
+    a sequence number, which is odd while the slot is written, so torn reads are retried as misses.
+    Writers are serialized by lock of the file and of the process"""
+
+    def __init__(self, path: Optional[str], size: int, slot_size: int, ttl: float):
+        self._slot_size = slot_size
+        self._ttl = ttl
+
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._total_latency = 0.0
+
+        self._file = None
+        self._map = None
+
+        if path:
+            stripes_size = STRIPE_COUNT * GENERATION.size
+            self._slot_count = max(WAYS, (size - HEADER.size - stripes_size) // slot_size // WAYS * WAYS)
+            self._slots_offset = HEADER.size + stripes_size
+            self._open(
+                f'{path}.{MAGIC.decode().lower()}-{slot_size}x{self._slot_count}',
+                self._slots_offset + self._slot_count * slot_size
+            )
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._map is not None
+
+    def _open(self, path: str, size: int):
+        # Not opened in append mode, where the header would be written at the end of the file
+        self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), 'r+b')
+        fcntl.lockf(self._file, fcntl.LOCK_EX)
+
+        try:
+            self._file.seek(0)
+            header = self._file.read(HEADER.size)
+            expected = (MAGIC, self._slot_size, self._slot_count, STRIPE_COUNT)
+
+            if len(header) < HEADER.size or HEADER.unpack(header)[:4] != expected or os.fstat(
+                    self._file.fileno()).st_size != size:
+                # New file or one left by a process died while initializing it. Header is written last,
+                # so no process has mapped the file yet
+                self._file.truncate(0)
+                self._file.truncate(size)
+                self._file.seek(0)
+                self._file.write(HEADER.pack(*expected, 0))
+                self._file.flush()
+
+            self._map = mmap.mmap(self._file.fileno(), size)
+        finally:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def _locate(self, key: bytes) -> tuple[int, int]:
+        """Returns offsets of key generation counter and of the first slot of key bucket"""
+        key_hash = _hash(key)
+        bucket = (key_hash >> 16) % (self._slot_count // WAYS)
+
+        return (
+            HEADER.size + (key_hash % STRIPE_COUNT) * GENERATION.size,
+            self._slots_offset + bucket * WAYS * self._slot_size,
+        )
+
+    def _read_counter(self, offset: int) -> int:
+        return GENERATION.unpack_from(self._map, offset)[0]
+
+    def _increment_counter(self, offset: int):
+        GENERATION.pack_into(self._map, offset, self._read_counter(offset) + 1)
+
+    def token(self, key: bytes) -> tuple[int, int]:
+        """Epoch and generation of the key. Value loaded after the token was taken is put with it,
+        so it's dropped if the key was invalidated during loading"""
+        generation_offset, _ = self._locate(key)
+
+        return self._read_counter(EPOCH_OFFSET), self._read_counter(generation_offset)
+
+    def _read_slot(self, offset: int, key: bytes, token: tuple[int, int], now: float) -> Optional[bytes]:
+        sequence, epoch, generation, expires_at, key_length, value_length = SLOT_HEADER.unpack_from(self._map, offset)
+
+        if sequence % 2 or (epoch, generation) != token or expires_at < now or key_length != len(key):
+            return None
+
+        data_offset = offset + SLOT_HEADER.size
+        if self._map[data_offset:data_offset + key_length] != key:
+            return None
+
+        value = self._map[data_offset + key_length:data_offset + key_length + value_length]
+
+        # The slot was rewritten while being read
+        if self._read_counter(offset) != sequence:
+            return None
+
+        return value
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        started = time.perf_counter()
+
+        token = self.token(key)
+        _, bucket_offset = self._locate(key)
+        now = time.time()
+
+        value = None
+        for way in range(WAYS):
+            value = self._read_slot(bucket_offset + way * self._slot_size, key, token, now)
+
+            if value is not None:
+                break
+
+        with self._stats_lock:
+            self._total_latency += time.perf_counter() - started
+
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        return value
+
+    @contextmanager
+    def _write_lock(self):
+        # File locks are held by process, so threads of the process are serialized separately
+        with self._lock:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    def put(self, key: bytes, value: bytes, token: tuple[int, int]) -> bool:
+        if SLOT_HEADER.size + len(key) + len(value) > self._slot_size:
+            return False
+
+        generation_offset, bucket_offset = self._locate(key)
+
+        with self._write_lock():
+            if (self._read_counter(EPOCH_OFFSET), self._read_counter(generation_offset)) != token:
+                return False
+
+            # Slot of the same key, otherwise the one expiring first, free and outdated slots expire at 0
+            target, target_expires_at = None, None
+            for way in range(WAYS):
+                offset = bucket_offset + way * self._slot_size
+                _, epoch, generation, expires_at, key_length, _ = SLOT_HEADER.unpack_from(self._map, offset)
+                data_offset = offset + SLOT_HEADER.size
+                slot_key = self._map[data_offset:data_offset + key_length]
+
+                if slot_key == key:
+                    target = offset
+                    break
+
+                if (epoch, generation) != self.token(slot_key):
+                    expires_at = 0.0
+
+                if target is None or expires_at < target_expires_at:
+                    target, target_expires_at = offset, expires_at
+
+            sequence = self._read_counter(target)
+            GENERATION.pack_into(self._map, target, sequence + 1)
+            SLOT_HEADER.pack_into(
+                self._map, target, sequence + 1, *token, time.time() + self._ttl, len(key), len(value)
+            )
+            data_offset = target + SLOT_HEADER.size
+            self._map[data_offset:data_offset + len(key) + len(value)] = key + value
+            GENERATION.pack_into(self._map, target, sequence + 2)
+
+        return True
+
+    def invalidate(self, key: bytes):
+        generation_offset, _ = self._locate(key)
+
+        with self._write_lock():
+            self._increment_counter(generation_offset)
+
+    def clear(self):
+        with self._write_lock():
+            self._increment_counter(EPOCH_OFFSET)
+
+    @property
+    def stats(self) -> dict:
+        if not self.is_enabled:
+            return {'enabled': False}
+
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+
+            return {
+                'enabled': True,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else None,
+                'average_latency_us': self._total_latency / lookups * 1e6 if lookups else None,
+            }
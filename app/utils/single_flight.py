@@ -0,0 +1,74 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs concurrent calls for the same key once, callers coming while the call is in flight
+    wait for it and get its result or exception. Results should be immutable, since they are shared.
+    Built on threading primitives, which are patched by gevent and eventlet,
+    so callers are coalesced under green threads as well"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        self._fetches = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._fetches += 1
+                is_leader = True
+            else:
+                self._coalesced += 1
+                is_leader = False
+
+        if not is_leader:
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+            call.done.set()
+
+        return call.result
+
+    def forget(self, key: Hashable):
+        """Makes the next caller start a new call instead of joining the one in flight,
+        e.g. when the data it reads was changed after it started"""
+        with self._lock:
+            self._calls.pop(key, None)
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self._fetches + self._coalesced
+
+            return {
+                'fetches': self._fetches,
+                'coalesced': self._coalesced,
+                'coalesced_rate': self._coalesced / requests if requests else None,
+            }
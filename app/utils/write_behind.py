@@ -0,0 +1,331 @@
+import atexit
+import fcntl
+import glob
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Sums up deltas per key in memory and passes them to flush function in batches,
+    every interval seconds or as soon as max_entries deltas are buffered.
+    Every delta is written to a spill file before add returns, and the file is removed
+    only after its deltas are flushed, so the next buffer started with the same spill directory
+    picks up deltas of a crashed process. Files are written through to the OS, not fsynced,
+    so they survive a crash of the process but not of the host.
+    Spill files of live buffers are locked, so several processes can share the directory.
+
+    Flush function gets ids of spill files holding the deltas and has to record them
+    in the same transaction as the deltas, so find_flushed_function tells the files
+    which were flushed by a process died before removing them, and these aren't flushed twice.
+    It also gets ids of the files removed since the previous flush, whose records aren't needed anymore.
+    Flush function may fail after its transaction is committed, so deltas of a failed flush are flushed again
+    only if find_flushed_function doesn't find their files"""
+    SPILL_SUFFIX = '.spill'
+
+    def __init__(
+            self,
+            flush_function: Callable[[list[tuple[str, float]], list[str], list[str]], None],
+            find_flushed_function: Callable[[list[str]], Iterable[str]],
+            interval: float,
+            max_entries: int,
+            spill_directory: str
+    ):
+        self._flush_function = flush_function
+        self._find_flushed_function = find_flushed_function
+        self._interval = interval
+        self._max_entries = max_entries
+        self._spill_directory = spill_directory
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self._pending = {}
+        self._pending_entries = 0
+        # Spill files holding pending deltas, new deltas are written to the last one
+        self._segments = []
+        self._is_recovered = False
+        # Ids of flushed spill files removed since the last flush
+        self._released_segment_ids = []
+        # Deltas, their number and spill files of failed flushes, which could be committed before the failure
+        self._failed = []
+
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._flushed_entries = 0
+        self._flushed_keys = 0
+        self._total_latency = 0.0
+        self._last_latency = None
+        self._max_latency = None
+
+    def _open_segment(self):
+        path = os.path.join(self._spill_directory, f'{os.getpid()}-{uuid.uuid4().hex}{self.SPILL_SUFFIX}')
+        file = open(path, 'a', encoding='utf-8')
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        self._segments.append((path, file))
+
+    def _get_segment_id(self, path: str) -> str:
+        return os.path.basename(path)[:-len(self.SPILL_SUFFIX)]
+
+    def _claim_segment(self, path: str):
+        """Returns spill file left by a dead process locked, or None if it's in use or already gone"""
+        try:
+            file = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The file could be flushed and removed by its owner between open and flock
+            if os.stat(path).st_ino == os.fstat(file.fileno()).st_ino:
+                return file
+        except (BlockingIOError, FileNotFoundError):
+            pass
+
+        file.close()
+
+        return None
+
+    def _recover(self):
+        """Takes over spill files of dead processes. Files already flushed are only removed"""
+        claimed = []
+        for path in sorted(glob.glob(os.path.join(self._spill_directory, '*' + self.SPILL_SUFFIX))):
+            file = self._claim_segment(path)
+
+            if file is not None:
+                claimed.append((path, file))
+
+        try:
+            flushed_ids = set(self._find_flushed_function(
+                [self._get_segment_id(path) for path, _ in claimed]
+            )) if claimed else set()
+        except Exception:
+            # Files are claimed again by the next attempt
+            for _, file in claimed:
+                file.close()
+
+            raise
+
+        recovered, deltas, entries = [], {}, 0
+        for path, file in claimed:
+            if self._get_segment_id(path) in flushed_ids:
+                os.unlink(path)
+                file.close()
+                self._released_segment_ids.append(self._get_segment_id(path))
+                continue
+
+            for line in file:
+                # The last line may be cut by the crash, its delta wasn't acknowledged
+                if not line.endswith('\n'):
+                    break
+
+                key, amount = line[:-1].split('\t')
+                deltas[key] = deltas.get(key, 0.0) + float(amount)
+                entries += 1
+
+            recovered.append((path, file))
+
+        with self._lock:
+            for key, amount in deltas.items():
+                self._pending[key] = self._pending.get(key, 0.0) + amount
+
+            self._pending_entries += entries
+            self._segments = recovered + self._segments
+            self._is_recovered = True
+
+    def _resolve_failed(self):
+        """Removes spill files of failed flushes found flushed and returns deltas of the rest to pending ones"""
+        flushed_ids = set(self._find_flushed_function(
+            [self._get_segment_id(path) for _, _, segments in self._failed for path, _ in segments]
+        ))
+
+        with self._lock:
+            for pending, entries, segments in self._failed:
+                # Spill files of a flush are recorded in one transaction, so it's enough to check one of them
+                if self._get_segment_id(segments[0][0]) in flushed_ids:
+                    for path, file in segments:
+                        os.unlink(path)
+                        file.close()
+                        self._released_segment_ids.append(self._get_segment_id(path))
+
+                    self._flushed_entries += entries
+                    self._flushed_keys += len(pending)
+                    continue
+
+                for key, amount in pending.items():
+                    self._pending[key] = self._pending.get(key, 0.0) + amount
+
+                self._pending_entries += entries
+                self._segments = segments + self._segments
+
+            self._failed = []
+
+    def start(self):
+        """Starts flushing thread, deltas of dead processes are recovered by the first flush.
+        Called by add as well, so the buffer keeps working in forked processes"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            if self._pid is None:
+                atexit.register(self.shutdown)
+
+            # Deltas and spill files inherited from the parent process still belong to the parent
+            self._pending, self._pending_entries, self._segments = {}, 0, []
+            self._is_recovered, self._released_segment_ids, self._failed = False, [], []
+
+            os.makedirs(self._spill_directory, exist_ok=True)
+            self._open_segment()
+
+            self._pid = os.getpid()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='write-behind-flush', daemon=True)
+            self._thread.start()
+
+    def add(self, key: str, amount: float):
+        self.start()
+
+        with self._lock:
+            spill_file = self._segments[-1][1]
+            spill_file.write(f'{key}\t{float(amount)!r}\n')
+            spill_file.flush()
+
+            self._pending[key] = self._pending.get(key, 0.0) + amount
+            self._pending_entries += 1
+
+            if self._pending_entries >= self._max_entries:
+                self._wakeup.set()
+
+    def flush(self) -> int:
+        """Passes pending deltas to flush function and removes their spill files.
+        If flush function fails, the deltas are kept for the next flush. Returns the number of keys flushed"""
+        with self._flush_lock:
+            if not self._is_recovered:
+                self._recover()
+
+            if self._failed:
+                self._resolve_failed()
+
+            with self._lock:
+                if not self._pending:
+                    return 0
+
+                pending, entries, segments = self._pending, self._pending_entries, self._segments
+                self._pending, self._pending_entries, self._segments = {}, 0, []
+                self._open_segment()
+
+            segment_ids = [self._get_segment_id(path) for path, _ in segments]
+            started = time.perf_counter()
+
+            try:
+                self._flush_function(list(pending.items()), segment_ids, self._released_segment_ids)
+            except Exception:
+                with self._lock:
+                    self._failed.append((pending, entries, segments))
+                    self._failed_flushes += 1
+
+                raise
+
+            latency = time.perf_counter() - started
+
+            # Crash before the files are removed is handled by recovery, which finds them flushed
+            for path, file in segments:
+                # Removed while still locked, so the file can't be claimed as left by a dead process
+                os.unlink(path)
+                file.close()
+
+            self._released_segment_ids = segment_ids
+
+            with self._lock:
+                self._flushes += 1
+                self._flushed_entries += entries
+                self._flushed_keys += len(pending)
+                self._total_latency += latency
+                self._last_latency = latency
+                self._max_latency = max(latency, self._max_latency or 0.0)
+
+            return len(pending)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+
+            # The rest of deltas is flushed by shutdown
+            if self._stopped.is_set():
+                break
+
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Write-behind flush failed, deltas are kept for the next one')
+
+    def shutdown(self):
+        """Stops flushing thread and flushes the rest of deltas.
+        Spill files are kept if the last flush fails"""
+        if self._pid != os.getpid():
+            return
+
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Write-behind flush failed on shutdown, deltas are left in spill files')
+
+        if self._released_segment_ids:
+            try:
+                self._flush_function([], [], self._released_segment_ids)
+            except Exception:
+                logger.exception('Records of removed write-behind spill files are left')
+
+        with self._lock:
+            for path, file in self._segments:
+                if not self._pending:
+                    os.unlink(path)
+
+                file.close()
+
+            # Spill files of failed flushes are left to recovery, which tells whether they were flushed
+            for _, _, segments in self._failed:
+                for _, file in segments:
+                    file.close()
+
+            self._segments, self._failed = [], []
+            self._pid = None
+
+    @property
+    def metrics(self) -> dict:
+        with self._lock:
+            failed_keys = set().union(*(pending for pending, _, _ in self._failed))
+
+            return {
+                'pending_entries': self._pending_entries + sum(entries for _, entries, _ in self._failed),
+                'pending_keys': len(self._pending.keys() | failed_keys),
+                'flushes': self._flushes,
+                'failed_flushes': self._failed_flushes,
+                'flushed_entries': self._flushed_entries,
+                'flushed_keys': self._flushed_keys,
+                'coalescing_ratio': self._flushed_entries / self._flushed_keys if self._flushed_keys else None,
+                'last_flush_latency_ms': _to_milliseconds(self._last_latency),
+                'max_flush_latency_ms': _to_milliseconds(self._max_latency),
+                'average_flush_latency_ms': _to_milliseconds(
+                    self._total_latency / self._flushes if self._flushes else None
+                ),
+            }
+
+
+def _to_milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return seconds * 1000 if seconds is not None else None
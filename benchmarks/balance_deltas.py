@@ -0,0 +1,49 @@
+"""Measures applying balance deltas one by one and in batches of different chunk sizes.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.balance_deltas [accounts] [deltas]
+"""
+import random
+import sys
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.repositories.sqlalchemy.allocators import IBANAllocator
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+CHUNK_SIZES = (100, 1000, 10000)
+
+
+def main(accounts: int, count: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        injector = app.extensions['injector']
+
+        def create_repository(chunk_size: int) -> BankAccountRepository:
+            return BankAccountRepository(
+                storage=db,
+                config=dict(app.config, LEDGER_APPEND_ONLY='false', BALANCE_BATCH_CHUNK_SIZE=chunk_size),
+                iban_allocator=injector.get(IBANAllocator),
+                unit_of_work=injector.get(UnitOfWork),
+            )
+
+        repository = create_repository(CHUNK_SIZES[0])
+        ibans = repository.bulk_create([{'currency': 'BYN'}] * accounts, ['BenchmarkUUID'] * accounts)
+        deltas = [(random.choice(ibans), random.randint(-100, 100)) for _ in range(count)]
+
+        with measure('One by one', count // 10):
+            for iban, amount in deltas[:count // 10]:
+                repository.update_balance_by_amount(iban, amount)
+
+        for chunk_size in CHUNK_SIZES:
+            with measure(f'Batch, {chunk_size} accounts per statement', count):
+                create_repository(chunk_size).apply_balance_deltas(deltas)
+
+        repository.bulk_delete(ibans)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000,
+    )
@@ -0,0 +1,113 @@
+"""Measures `flask snapshot` of bank accounts and bank cards with different numbers of worker processes,
+an incremental snapshot after a few balance changes, and the analysts' SUM of balances by currency
+read from memory-mapped snapshot files versus the same query against the database.
+Bank cards are generated by a single INSERT ... SELECT for the existing bank accounts.
+Run benchmarks.customer_import first to have millions of bank accounts.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.balance_snapshot [cards] [changed balances]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow
+import pyarrow.ipc
+from sqlalchemy import func, literal, select, text
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.bank_card import BankCard
+from app.services.snapshot import SnapshotService
+from app.storage.sqlalchemy import db
+
+WORKER_COUNTS = (1, 2, 4)
+
+
+def seed_cards(count: int):
+    """Adds bank cards until the table has at least count rows, one per bank account"""
+    missing = count - db.session.query(func.count(BankCard.card_number)).scalar()
+
+    if missing > 0:
+        accounts = select(BankAccount.IBAN).where(
+            ~BankAccount.IBAN.in_(select(BankCard.bank_account_iban))
+        ).limit(missing).subquery()
+
+        db.session.execute(BankCard.__table__.insert().from_select(
+            ['card_number', 'expiration_date', 'bank_account_iban'],
+            select(
+                literal('9') + func.left(func.md5(accounts.c.IBAN), 15),
+                func.current_date() + 365 * 4,
+                accounts.c.IBAN,
+            )
+        ))
+        db.session.commit()
+        db.session.execute(text('ANALYZE bank_card'))
+        db.session.commit()
+
+
+def sum_balances_from_files(path: str, manifest: dict) -> dict:
+    table = pyarrow.concat_tables(
+        pyarrow.ipc.open_file(pyarrow.memory_map(os.path.join(path, partition['path']))).read_all()
+        for partition in manifest['tables']['bank_account']['partitions']
+    )
+
+    return {
+        row['currency']: row['balance_sum']
+        for row in table.group_by('currency').aggregate([('balance', 'sum')]).to_pylist()
+    }
+
+
+def sum_balances_from_database() -> dict:
+    return dict(db.session.execute(
+        select(BankAccount.currency, func.sum(BankAccount.balance)).group_by(BankAccount.currency)
+    ).all())
+
+
+def main(cards: int = 1000000, changed_balances: int = 1000):
+    app = create_benchmark_app()
+
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        seed_cards(cards)
+        service = app.extensions['injector'].get(SnapshotService)
+
+        for workers in WORKER_COUNTS:
+            for file_format in ('parquet', 'arrow'):
+                started_at = time.perf_counter()
+                manifest = service.create(os.path.join(directory, f'{file_format}-{workers}'), workers, file_format)
+                duration = time.perf_counter() - started_at
+
+                rows = sum(table['rows'] for table in manifest['tables'].values())
+                size = sum(
+                    partition['bytes'] for table in manifest['tables'].values() for partition in table['partitions']
+                )
+                print(
+                    f'Full snapshot, {file_format}, {workers} workers: {rows} rows in {duration:.2f}s, '
+                    f'{rows / duration:.0f} rows/sec, {size / 1024 / 1024:.1f}MiB'
+                )
+
+        arrow_directory = os.path.join(directory, f'arrow-{WORKER_COUNTS[-1]}')
+        full_manifest = service.get_latest_manifest(arrow_directory)
+        full_path = os.path.join(arrow_directory, full_manifest['id'])
+
+        for title, function in (
+                ('SUM by currency, memory-mapped Arrow files',
+                 lambda: sum_balances_from_files(full_path, full_manifest)),
+                ('SUM by currency, database', sum_balances_from_database),
+        ):
+            started_at = time.perf_counter()
+            result = function()
+            print(f'{title}: {(time.perf_counter() - started_at) * 1000:.0f}ms, {result}')
+
+        db.session.execute(BankAccount.__table__.update().where(BankAccount.IBAN.in_(
+            select(BankAccount.IBAN).limit(changed_balances).scalar_subquery()
+        )).values({BankAccount.compacted_balance: BankAccount.compacted_balance + 1}))
+        db.session.commit()
+
+        with measure(f'Incremental snapshot after {changed_balances} balance changes', changed_balances):
+            manifest = service.create(arrow_directory, file_format='arrow', incremental=True)
+        print(f'Incremental snapshot rows: {manifest["tables"]["bank_account"]["rows"]} bank accounts')
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:3]))
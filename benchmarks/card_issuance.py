@@ -0,0 +1,74 @@
+"""Measures bank card issuance throughput with werkzeug PIN/CVV hashing done in the request thread
+and in hashing process pools of 1, 4 and 8 workers, compared to keyed hashing.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.card_issuance [count] [threads]
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.repositories.sqlalchemy.allocators import CardNumberAllocator
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.repositories.sqlalchemy.bank_card import BankCardRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+from app.utils.hashing_executor import HashingExecutor
+from app.utils.secret_hashing import SecretHasher
+
+BANK_CARD_DATA = {
+    'expiration_date': date(2030, 1, 1),
+}
+
+SCHEMES = (('werkzeug', 0), ('werkzeug', 1), ('werkzeug', 4), ('werkzeug', 8), ('hmac-sha256', 0))
+
+
+def issue_cards(app, repository: BankCardRepository, iban: str, count: int, threads: int) -> list[str]:
+    """Issues cards from several threads, like concurrent requests of one application process"""
+    def issue(cards_count: int) -> list[str]:
+        with app.app_context():
+            return [repository.create(BANK_CARD_DATA, iban)[0].card_number for _ in range(cards_count)]
+
+    with ThreadPoolExecutor(threads) as pool:
+        batches = pool.map(issue, [count // threads + (i < count % threads) for i in range(threads)])
+
+        return [card_number for batch in batches for card_number in batch]
+
+
+def main(count: int, threads: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        injector = app.extensions['injector']
+        bank_account_repository = injector.get(BankAccountRepository)
+        card_number_allocator = injector.get(CardNumberAllocator)
+        unit_of_work = injector.get(UnitOfWork)
+
+        iban = bank_account_repository.create({'currency': 'BYN'}, 'BenchmarkUUID').IBAN
+
+        for scheme, pool_size in SCHEMES:
+            hashing_executor = HashingExecutor(pool_size)
+            repository = BankCardRepository(
+                storage=db,
+                card_number_allocator=card_number_allocator,
+                unit_of_work=unit_of_work,
+                secret_hasher=SecretHasher(dict(app.config, PIN_HASH_SCHEME=scheme), hashing_executor),
+            )
+
+            # Workers are started before measuring, as it happens once per application process
+            hashing_executor.submit(pow, 2, 2).result()
+
+            title = f'{scheme}, ' + (f'{pool_size} hashing workers' if pool_size else 'hashing in request threads')
+            with measure(f'{title}, {threads} threads', count):
+                card_numbers = issue_cards(app, repository, iban, count, threads)
+
+            hashing_executor.shutdown()
+            repository.bulk_delete(card_numbers)
+
+        bank_account_repository.bulk_delete([iban])
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )
@@ -0,0 +1,48 @@
+"""Compares rows/sec of single-item customer creation with bulk endpoint.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_bulk_create [count]
+"""
+import json
+import sys
+
+from benchmarks.utils import create_benchmark_app, generate_customers_data, measure
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.customer import Customer
+from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
+from app.storage.sqlalchemy import db
+
+
+def cleanup(uuids: list[str]):
+    ibans = db.session.query(
+        AssociationBankAccountCustomer.bank_account_id
+    ).filter(AssociationBankAccountCustomer.customer_id.in_(uuids)).scalar_subquery()
+
+    db.session.query(BankAccount).filter(BankAccount.IBAN.in_(ibans)).delete(synchronize_session=False)
+    db.session.query(Customer).filter(Customer.uuid.in_(uuids)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def main(count: int):
+    app = create_benchmark_app()
+    client = app.test_client()
+
+    with app.app_context():
+        customers_data = generate_customers_data(count)
+        with measure('POST /api/customers/', count):
+            uuids = [
+                client.post('/api/customers/', json=customer_data).json['uuid'] for customer_data in customers_data
+            ]
+        cleanup(uuids)
+
+        customers_data = generate_customers_data(count)
+        with measure('POST /api/customers/bulk (NDJSON)', count):
+            response = client.post(
+                '/api/customers/bulk',
+                data='\n'.join(json.dumps(customer_data) for customer_data in customers_data),
+                content_type='application/x-ndjson'
+            )
+        cleanup([item['uuid'] for item in response.json['created']])
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
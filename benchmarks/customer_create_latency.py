@@ -0,0 +1,52 @@
+"""Compares latency of customer creation committed per repository call with single-transaction creation.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_create_latency [count]
+"""
+import sys
+import time
+
+from benchmarks.utils import create_benchmark_app, generate_customers_data, report_latencies
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.repositories.sqlalchemy.customer import CustomerRepository
+from app.services.customer import CustomerService
+from app.storage.sqlalchemy import db
+
+
+def main(count: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        injector = app.extensions['injector']
+        customer_repository = injector.get(CustomerRepository)
+        bank_account_repository = injector.get(BankAccountRepository)
+        customer_service = injector.get(CustomerService)
+
+        uuids = []
+
+        latencies = []
+        for customer_data in generate_customers_data(count):
+            started_at = time.perf_counter()
+            customer = customer_repository.create(customer_data)
+            bank_account_repository.create(customer_data['bank_account'], customer.uuid)
+            latencies.append(time.perf_counter() - started_at)
+            uuids.append(customer.uuid)
+        report_latencies('Commit per repository call', latencies)
+
+        latencies = []
+        for customer_data in generate_customers_data(count):
+            started_at = time.perf_counter()
+            customer = customer_service.create(customer_data)
+            latencies.append(time.perf_counter() - started_at)
+            uuids.append(customer.uuid)
+        report_latencies('Single transaction', latencies)
+
+        for uuid in uuids:
+            bank_account_repository.bulk_delete([
+                bank_account.IBAN for bank_account in bank_account_repository.get_owned_by_customer(uuid)
+            ])
+            customer_repository.delete(uuid)
+        db.session.commit()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
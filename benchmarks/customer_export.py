@@ -0,0 +1,37 @@
+"""Measures the NDJSON export of all customers with bank accounts and cards written to /dev/null.
+Reports throughput and peak memory allocated by Python while exporting, which shouldn't grow with
+the number of customers. Run benchmarks.customer_pages first to have millions of customers.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_export
+"""
+import os
+import tracemalloc
+
+from benchmarks.utils import create_benchmark_app
+from app.services.customer import CustomerService
+from app.utils.json_stream import dump_ndjson
+
+
+def main():
+    app = create_benchmark_app()
+
+    with app.app_context():
+        service = app.extensions['injector'].get(CustomerService)
+
+        def report_throughput(count: int, duration: float):
+            print(f'Exported {count} customers in {duration:.2f}s, {count / duration:.0f} customers/sec')
+
+        tracemalloc.start()
+
+        with open(os.devnull, 'w') as output:
+            for chunk in dump_ndjson(service.export(), on_finish=report_throughput):
+                output.write(chunk)
+
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'Peak memory allocated while exporting: {peak / 1024 / 1024:.1f}MiB')
+
+
+if __name__ == '__main__':
+    main()
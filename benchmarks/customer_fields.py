@@ -0,0 +1,56 @@
+"""Measures pages of customers and multi-get of customers through the API with all fields
+and with a single field requested by ?fields=, reporting latency and response size.
+Pages start after random customers, multi-get asks for random ones.
+Run benchmarks.customer_pages first to have customers.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_fields [batch size] [repeats]
+"""
+import random
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.utils import create_benchmark_app, report_latencies
+from app.models.sqlalchemy.customer import Customer
+from app.schemas.customer import CursorField
+from app.storage.sqlalchemy import db
+
+
+def main(batch_size: int = 500, repeats: int = 100):
+    app = create_benchmark_app()
+    client = app.test_client()
+
+    with app.app_context():
+        uuids = db.session.execute(
+            select(Customer.uuid).where(func.random() < 0.01).limit(batch_size * repeats)
+        ).scalars().all()
+        db.session.commit()
+
+    def page_url() -> str:
+        cursor = CursorField().serialize('uuid', {'uuid': random.choice(uuids)})
+
+        return f'/api/customers/?limit={batch_size}&cursor={cursor}'
+
+    def multi_get_url() -> str:
+        return f'/api/customers/?uuid={",".join(random.sample(uuids, batch_size))}'
+
+    for title, make_url in (('Page', page_url), ('Multi-get', multi_get_url)):
+        for fields in (None, 'email'):
+            latencies, sizes = [], []
+
+            for _ in range(repeats):
+                url = make_url() + (f'&fields={fields}' if fields else '')
+
+                started_at = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - started_at)
+                sizes.append(len(response.data))
+
+            title_with_fields = f'{title} of {batch_size}, fields={fields or "all"}'
+            report_latencies(title_with_fields, latencies)
+            print(f'{title_with_fields}: {sum(sizes) / len(sizes) / 1024:.1f}KiB per response')
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:3]))
@@ -0,0 +1,72 @@
+"""Measures `flask import-customers` loading a generated CSV file of 1M customers through COPY
+and set-based merge, then the same file again, when every row is a duplicate.
+For comparison CUSTOMER_BULK_CREATE_CHUNK_SIZE-row chunks of the first 10000 rows
+are created through CustomerService.bulk_create, as by POST /api/customers/bulk.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_import [ROWS]
+"""
+import csv
+import random
+import string
+import sys
+import tempfile
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.commands.import_customers import import_customers_command
+from app.services.customer import CustomerService
+
+BULK_CREATE_ROWS = 10000
+
+
+def write_customers_csv(path: str, count: int, passport_prefix: str):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['passport_number', 'first_name', 'last_name', 'email', 'currency', 'balance'])
+
+        for number in range(count):
+            writer.writerow([
+                f'{passport_prefix}{number:07}', 'Benchmark', 'Customer', 'benchmark@example.com', 'BYN', number % 1000
+            ])
+
+
+def run_import(app, path: str):
+    result = app.test_cli_runner(mix_stderr=False).invoke(import_customers_command, [path])
+
+    print(result.stderr.splitlines()[-1])
+
+    if result.exit_code:
+        raise RuntimeError(result.stderr)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    app = create_benchmark_app()
+    # Fresh prefix for every run, so previous runs don't turn the rows into duplicates
+    prefixes = [''.join(random.choices(string.ascii_uppercase, k=2)) for _ in range(2)]
+
+    with app.app_context(), tempfile.NamedTemporaryFile(suffix='.csv') as file:
+        write_customers_csv(file.name, rows, prefixes[0])
+
+        with measure('import-customers, new customers', rows):
+            run_import(app, file.name)
+
+        with measure('import-customers, duplicates', rows):
+            run_import(app, file.name)
+
+        service = app.extensions['injector'].get(CustomerService)
+        chunk_size = int(app.config['CUSTOMER_BULK_CREATE_CHUNK_SIZE'])
+        data = [{
+            'passport_number': f'{prefixes[1]}{number:07}',
+            'first_name': 'Benchmark',
+            'last_name': 'Customer',
+            'email': 'benchmark@example.com',
+            'bank_account': {'currency': 'BYN', 'balance': number % 1000},
+        } for number in range(BULK_CREATE_ROWS)]
+
+        with measure('bulk_create', BULK_CREATE_ROWS):
+            for start in range(0, BULK_CREATE_ROWS, chunk_size):
+                service.bulk_create(data[start:start + chunk_size])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Measures reading a batch of customers through the API by one request per customer
+and by a single multi-get request, as GET with uuid list in query string and as POST.
+Uuids are drawn at random from the existing customers, so the customer cache rarely helps.
+Run benchmarks.customer_pages first to have customers.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_multi_get [repeats]
+"""
+import random
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.utils import create_benchmark_app, report_latencies
+from app.models.sqlalchemy.customer import Customer
+from app.storage.sqlalchemy import db
+
+BATCH_SIZES = (50, 200)
+
+
+def main(repeats: int = 50):
+    app = create_benchmark_app()
+    client = app.test_client()
+
+    with app.app_context():
+        uuids = db.session.execute(
+            select(Customer.uuid).where(func.random() < 0.01).limit(max(BATCH_SIZES) * repeats * 3)
+        ).scalars().all()
+        db.session.commit()
+
+    for size in BATCH_SIZES:
+        batches = {
+            title: [random.sample(uuids, size) for _ in range(repeats)]
+            for title in ('GET per customer', 'GET ?uuid=', 'POST batch')
+        }
+
+        requests = {
+            'GET per customer': lambda batch: [client.get(f'/api/customers/{uuid}') for uuid in batch],
+            'GET ?uuid=': lambda batch: client.get(f'/api/customers/?uuid={",".join(batch)}'),
+            'POST batch': lambda batch: client.post('/api/customers/batch', json={'uuids': batch}),
+        }
+
+        for title, request in requests.items():
+            latencies = []
+            for batch in batches[title]:
+                started_at = time.perf_counter()
+                request(batch)
+                latencies.append(time.perf_counter() - started_at)
+
+            report_latencies(f'{title}, {size} customers', latencies)
+
+
+if __name__ == '__main__':
+    main(*(int(argument) for argument in sys.argv[1:2]))
@@ -0,0 +1,78 @@
+"""Measures reading a page of customers at the first page and deep into the listing,
+using keyset pagination and OFFSET for comparison. Keyset pages should cost the same at any depth.
+Customers are generated by a single INSERT ... SELECT, so seeding millions of rows is quick.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.customer_pages [page size] [deep page] [repeats]
+"""
+import sys
+import time
+
+from sqlalchemy import func, literal, select, text
+
+from benchmarks.utils import create_benchmark_app, report_latencies
+from app.models.sqlalchemy.customer import Customer
+from app.services.customer import CustomerService
+from app.storage.sqlalchemy import db
+
+
+def seed(count: int):
+    """Adds customers until the table has at least count rows"""
+    missing = count - db.session.query(func.count(Customer.uuid)).scalar()
+
+    if missing > 0:
+        number = func.generate_series(1, missing).table_valued('value').render_derived()
+        db.session.execute(Customer.__table__.insert().from_select(
+            ['uuid', 'passport_number', 'first_name', 'last_name', 'email'],
+            select(
+                func.gen_random_uuid().cast(db.String),
+                literal('BP') + func.lpad(number.c.value.cast(db.String), 7, '0'),
+                literal('Benchmark'),
+                literal('Customer'),
+                literal('benchmark@example.com'),
+            ).select_from(number)
+        ))
+        db.session.commit()
+        db.session.execute(text('ANALYZE customer'))
+        db.session.commit()
+
+
+def main(page_size: int, deep_page: int, repeats: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        service = app.extensions['injector'].get(CustomerService)
+        depth = page_size * (deep_page - 1)
+        seed(depth + page_size)
+
+        # Cursor of the deep page is the uuid of the last customer of the previous one
+        deep_cursor = db.session.execute(
+            select(Customer.uuid).order_by(Customer.uuid).offset(depth - 1).limit(1)
+        ).scalar()
+
+        for title, cursor in (('Keyset, page 1', None), (f'Keyset, page {deep_page}', deep_cursor)):
+            latencies = []
+            for _ in range(repeats):
+                started_at = time.perf_counter()
+                service.get_page(page_size, cursor)
+                db.session.commit()
+                latencies.append(time.perf_counter() - started_at)
+
+            report_latencies(title, latencies)
+
+        for title, offset in (('OFFSET, page 1', 0), (f'OFFSET, page {deep_page}', depth)):
+            latencies = []
+            for _ in range(max(1, repeats // 100)):
+                started_at = time.perf_counter()
+                db.session.execute(select(Customer).order_by(Customer.uuid).offset(offset).limit(page_size)).all()
+                db.session.commit()
+                latencies.append(time.perf_counter() - started_at)
+
+            report_latencies(title, latencies)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 1000,
+    )
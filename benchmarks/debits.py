@@ -0,0 +1,72 @@
+"""Measures debits of a single bank account made from many threads, comparing SELECT then UPDATE
+in separate statements with the conditional single-statement debit.
+Reports lost updates and the final balance, which must not be negative.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.debits [threads] [debits]
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.exceptions import InsufficientFundsException
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import db
+
+
+def check_then_update(repository: BankAccountRepository, iban: str) -> bool:
+    balance = db.session.query(BankAccount.balance).filter_by(IBAN=iban).scalar()
+    db.session.commit()
+
+    if balance < 1:
+        return False
+
+    repository.update_balance_by_amount(iban, -1)
+
+    return True
+
+
+def conditional_debit(repository: BankAccountRepository, iban: str) -> bool:
+    try:
+        repository.debit(iban, 1)
+    except InsufficientFundsException:
+        db.session.rollback()
+        return False
+
+    return True
+
+
+def main(threads: int, debits: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        repository = app.extensions['injector'].get(BankAccountRepository)
+        debits = debits // threads * threads
+        # Half of the debits are covered by the balance
+        initial_balance = debits // 2
+
+        for title, operation in (('SELECT then UPDATE', check_then_update), ('Conditional debit', conditional_debit)):
+            iban = repository.create({'currency': 'BYN', 'balance': initial_balance}, 'BenchmarkUUID').IBAN
+
+            def worker(count: int) -> int:
+                with app.app_context():
+                    return sum(operation(repository, iban) for _ in range(count))
+
+            with measure(f'{title}, {threads} threads', debits):
+                with ThreadPoolExecutor(threads) as pool:
+                    succeeded = sum(pool.map(worker, [debits // threads] * threads))
+
+            balance = repository.get_by_iban(iban).balance
+            print(
+                f'{title}: {succeeded} debits succeeded, final balance {balance}, '
+                f'{initial_balance - succeeded - balance:.0f} lost updates'
+            )
+
+            repository.bulk_delete([iban])
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4000,
+    )
@@ -0,0 +1,55 @@
+"""Measures balance changes of a single hot bank account made from many threads
+with the balance updated in place and spread over different numbers of shards.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.hot_account_shards [threads] [changes]
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.repositories.sqlalchemy.allocators import IBANAllocator
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+SHARD_COUNTS = (0, 1, 4, 16)
+
+
+def main(threads: int, changes: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        injector = app.extensions['injector']
+
+        repository = BankAccountRepository(
+            storage=db,
+            config=dict(app.config, LEDGER_APPEND_ONLY='false'),
+            iban_allocator=injector.get(IBANAllocator),
+            unit_of_work=injector.get(UnitOfWork),
+        )
+
+        for shard_count in SHARD_COUNTS:
+            iban = repository.create({'currency': 'BYN'}, 'BenchmarkUUID').IBAN
+
+            if shard_count:
+                repository.promote_to_hot(iban, shard_count)
+
+            def worker(count: int):
+                with app.app_context():
+                    for _ in range(count):
+                        repository.update_balance_by_amount(iban, 1)
+
+            with measure(f'{shard_count} shards, {threads} threads', changes // threads * threads):
+                with ThreadPoolExecutor(threads) as pool:
+                    list(pool.map(worker, [changes // threads] * threads))
+
+            repository.demote_from_hot(iban)
+            print(f'{shard_count} shards: balance after demotion {repository.get_by_iban(iban).balance}')
+
+            repository.bulk_delete([iban])
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8000,
+    )
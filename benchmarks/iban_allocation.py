@@ -0,0 +1,55 @@
+"""Measures bank account creation throughput of IBAN allocator on a filled bank_account table.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.iban_allocation [existing] [count]
+"""
+import sys
+
+from sqlalchemy import text
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.repositories.sqlalchemy.allocators import SequenceIBANAllocator
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+SEED_PREFIX = 'ZZ'
+
+
+def seed(existing: int):
+    """Fills bank_account with random IBANs that can't clash with the ones made by application"""
+    present = db.session.query(BankAccount).filter(BankAccount.IBAN.startswith(SEED_PREFIX)).count()
+
+    if present < existing:
+        db.session.execute(text(
+            'INSERT INTO bank_account ("IBAN", currency, balance) '
+            "SELECT :prefix || lpad((random() * 1e15)::bigint::text, 26, '0') || series, 'BYN', 0 "
+            'FROM generate_series(:start, :stop) AS series ON CONFLICT DO NOTHING'
+        ), {'prefix': SEED_PREFIX, 'start': present, 'stop': existing - 1})
+        db.session.commit()
+
+
+def main(existing: int, count: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        seed(existing)
+
+        allocator = SequenceIBANAllocator(storage=db, config=app.config)
+        repository = BankAccountRepository(
+            storage=db, config=app.config, iban_allocator=allocator, unit_of_work=UnitOfWork(storage=db)
+        )
+
+        with measure('IBANs only', count):
+            allocator.allocate_many(count)
+
+        with measure(f'Accounts with {existing} existing', count):
+            ibans = [repository.create({'currency': 'BYN'}, 'BenchmarkUUID').IBAN for _ in range(count)]
+
+        repository.bulk_delete(ibans)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+    )
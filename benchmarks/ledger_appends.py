@@ -0,0 +1,49 @@
+"""Measures balance changes of a single hot bank account made from many threads,
+updating the balance in place and appending ledger entries only.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.ledger_appends [threads] [changes]
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.repositories.sqlalchemy.allocators import IBANAllocator
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+
+def main(threads: int, changes: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        injector = app.extensions['injector']
+
+        for title, append_only in (('In-place update', 'false'), ('Append-only ledger', 'true')):
+            repository = BankAccountRepository(
+                storage=db,
+                config=dict(app.config, LEDGER_APPEND_ONLY=append_only),
+                iban_allocator=injector.get(IBANAllocator),
+                unit_of_work=injector.get(UnitOfWork),
+            )
+            iban = repository.create({'currency': 'BYN'}, 'BenchmarkUUID').IBAN
+
+            def worker(count: int):
+                with app.app_context():
+                    for _ in range(count):
+                        repository.update_balance_by_amount(iban, 1)
+
+            with measure(f'{title}, {threads} threads', changes // threads * threads):
+                with ThreadPoolExecutor(threads) as pool:
+                    list(pool.map(worker, [changes // threads] * threads))
+
+            repository.compact_ledger()
+            print(f'{title}: balance after compaction {repository.get_by_iban(iban).balance}')
+
+            repository.bulk_delete([iban])
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8000,
+    )
@@ -0,0 +1,61 @@
+"""Measures lookups of nonexistent customer uuids, as made by scrapers, with and without the filter
+of existing uuids. Reports memory of the filter and its observed false positive rate.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.negative_lookups [customers] [lookups]
+"""
+import sys
+import time
+import uuid
+
+from benchmarks.utils import create_benchmark_app, generate_customers_data, report_latencies
+from app.exceptions import DoesNotExistException
+from app.repositories.sqlalchemy.customer import CustomerRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+
+def main(customers: int, lookups: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        unit_of_work = app.extensions['injector'].get(UnitOfWork)
+
+        seeding_repository = CustomerRepository(storage=db, config=app.config, unit_of_work=unit_of_work)
+        for start in range(0, customers, 1000):
+            seeding_repository.bulk_create(generate_customers_data(min(1000, customers - start)))
+
+        for title, enabled in (('Without filter', 'false'), ('With filter', 'true')):
+            repository = CustomerRepository(
+                storage=db, config=dict(app.config, NEGATIVE_LOOKUP_FILTER=enabled), unit_of_work=unit_of_work
+            )
+
+            if enabled == 'true':
+                started_at = time.perf_counter()
+                repository._keys.wait_until_ready(timeout=600)
+                print(f'Filter built in {time.perf_counter() - started_at:.2f}s')
+
+            latencies = []
+            for _ in range(lookups):
+                started_at = time.perf_counter()
+
+                try:
+                    repository.get_by_uuid(str(uuid.uuid4()))
+                except DoesNotExistException:
+                    pass
+
+                latencies.append(time.perf_counter() - started_at)
+
+            report_latencies(title, latencies)
+
+        stats = repository.filter_stats
+        print(
+            f'Filter of {stats["added_keys"]} keys: {stats["memory"] / 1024:.0f}KiB, {stats["hash_count"]} hashes, '
+            f'expected false positive rate {stats["expected_false_positive_rate"]:.4f}, '
+            f'observed {stats["observed_false_positive_rate"]:.4f}'
+        )
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10000,
+    )
@@ -0,0 +1,64 @@
+"""Measures concurrent reads of the same customer, as made during incident storms,
+with the in-process cache disabled, so every read misses and concurrent ones share a fetch.
+Reports latencies and the number of SELECTs sent to the database.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.read_coalescing [threads] [reads]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from benchmarks.utils import create_benchmark_app, generate_customers_data, report_latencies
+from app.repositories.sqlalchemy.customer import CustomerRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+
+def main(threads: int, reads: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        repository = CustomerRepository(
+            storage=db,
+            config=dict(app.config, CUSTOMER_CACHE_MAX_MEMORY=0),
+            unit_of_work=app.extensions['injector'].get(UnitOfWork),
+        )
+        uuid = repository.create(generate_customers_data(1)[0]).uuid
+
+        selects = []
+        event.listen(
+            db.engine, 'before_cursor_execute',
+            lambda conn, cursor, statement, *args: statement.startswith('SELECT') and selects.append(statement)
+        )
+
+        def worker(count: int) -> list[float]:
+            latencies = []
+
+            with app.app_context():
+                for _ in range(count):
+                    started_at = time.perf_counter()
+                    repository.get_by_uuid(uuid)
+                    db.session.commit()
+                    latencies.append(time.perf_counter() - started_at)
+
+            return latencies
+
+        with ThreadPoolExecutor(threads) as pool:
+            latencies = [latency for chunk in pool.map(worker, [reads // threads] * threads) for latency in chunk]
+
+        report_latencies(f'Same customer, {threads} threads', latencies)
+        stats = repository.coalescing_stats
+        print(
+            f'{len(latencies)} reads sent {len(selects)} SELECTs, '
+            f'{stats["coalesced"]} reads coalesced ({stats["coalesced_rate"]:.0%})'
+        )
+
+        repository.delete(uuid)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10000,
+    )
@@ -0,0 +1,38 @@
+"""Compares PIN hashing schemes by hashes and checks per second in a single thread.
+
+Usage: python -m benchmarks.secret_hashing [count]
+"""
+import sys
+import time
+
+from app.utils.secret_hashing import HMACSHA256HashingScheme, WerkzeugHashingScheme
+
+SCHEMES = {
+    'werkzeug': WerkzeugHashingScheme(),
+    'hmac-sha256': HMACSHA256HashingScheme(b'benchmark pepper'),
+}
+
+
+def main(count: int):
+    for name, scheme in SCHEMES.items():
+        # Expensive schemes are measured on fewer secrets, so that the run doesn't take minutes
+        scheme_count = max(1, count // 1000) if scheme.is_expensive else count
+        secrets = [(str(i % 10000).zfill(4), str(4255650000000000 + i).encode()) for i in range(scheme_count)]
+
+        started_at = time.perf_counter()
+        hashes = [scheme.generate(secret, context) for secret, context in secrets]
+        generate_duration = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        for stored_hash, (secret, context) in zip(hashes, secrets):
+            scheme.check(stored_hash, secret, context)
+        check_duration = time.perf_counter() - started_at
+
+        print(
+            f'{name}: {scheme_count / generate_duration:.0f} hashes/sec, '
+            f'{scheme_count / check_duration:.0f} checks/sec, {len(hashes[0])} bytes per hash'
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
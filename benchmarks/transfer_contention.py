@@ -0,0 +1,75 @@
+"""Measures transfers among a small set of hot bank accounts made from many threads.
+Compares two balance updates in caller order with single-statement transfer locking rows in IBAN order.
+
+Usage: BENCHMARK_DOTENV=.env.bench python -m benchmarks.transfer_contention [accounts] [threads] [transfers]
+"""
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.utils import create_benchmark_app, measure
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import UnitOfWork, db
+
+
+def update_balances(repository: BankAccountRepository, unit_of_work: UnitOfWork, source: str, target: str):
+    with unit_of_work:
+        repository.update_balance_by_amount(source, -1)
+        repository.update_balance_by_amount(target, 1)
+
+
+def transfer(repository: BankAccountRepository, unit_of_work: UnitOfWork, source: str, target: str):
+    repository.transfer(source, target, 1)
+
+
+def run(app, operation, repository, unit_of_work, ibans: list[str], threads: int, transfers: int) -> int:
+    """Returns the number of transfers failed because of deadlocks"""
+    def worker(count: int) -> int:
+        failed = 0
+
+        with app.app_context():
+            for _ in range(count):
+                source, target = random.sample(ibans, 2)
+
+                try:
+                    operation(repository, unit_of_work, source, target)
+                except OperationalError:
+                    db.session.rollback()
+                    failed += 1
+
+        return failed
+
+    with ThreadPoolExecutor(threads) as pool:
+        return sum(pool.map(worker, [transfers // threads] * threads))
+
+
+def main(accounts: int, threads: int, transfers: int):
+    app = create_benchmark_app()
+
+    with app.app_context():
+        injector = app.extensions['injector']
+        repository = injector.get(BankAccountRepository)
+        unit_of_work = injector.get(UnitOfWork)
+
+        ibans = [
+            repository.create({'currency': 'BYN', 'balance': 10 ** 9}, 'BenchmarkUUID').IBAN for _ in range(accounts)
+        ]
+        transfers = transfers // threads * threads
+
+        for title, operation in (('Two updates in caller order', update_balances), ('Ordered transfer', transfer)):
+            with measure(f'{title}, {accounts} accounts, {threads} threads', transfers):
+                failed = run(app, operation, repository, unit_of_work, ibans, threads, transfers)
+
+            print(f'{title}: {failed} of {transfers} transfers failed with deadlock')
+
+        repository.bulk_delete(ibans)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 400,
+    )
@@ -0,0 +1,60 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from app.app import create_app
+
+# Made from .env.template like .env.test, path is relative to the project root
+BENCHMARK_DOTENV = os.environ.get('BENCHMARK_DOTENV', '.env.bench')
+
+
+def create_benchmark_app():
+    """Creates application configured by BENCHMARK_DOTENV file.
+    Benchmarks write to the database, so it has to point to a disposable one"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), BENCHMARK_DOTENV)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f'Benchmark configuration {path} does not exist, create it from .env.template')
+
+    return create_app(dotenv_filename=BENCHMARK_DOTENV)
+
+
+def generate_passport_number() -> str:
+    return 'BM' + ''.join(random.choice('0123456789') for _ in range(7))
+
+
+def generate_customers_data(count: int) -> list[dict]:
+    passport_numbers = set()
+    while len(passport_numbers) < count:
+        passport_numbers.add(generate_passport_number())
+
+    return [{
+        'first_name': 'Benchmark',
+        'last_name': 'Customer',
+        'email': 'benchmark@example.com',
+        'passport_number': passport_number,
+        'bank_account': {
+            'currency': 'BYN',
+        },
+    } for passport_number in passport_numbers]
+
+
+@contextmanager
+def measure(title: str, rows: int):
+    started_at = time.perf_counter()
+    yield
+    duration = time.perf_counter() - started_at
+
+    print(f'{title}: {rows} rows in {duration:.2f}s, {rows / duration:.0f} rows/sec')
+
+
+def report_latencies(title: str, latencies: list[float]):
+    latencies = sorted(latencies)
+
+    def percentile(value: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+    print(
+        f'{title}: {len(latencies)} calls, p50 {percentile(0.5):.2f}ms, '
+        f'p95 {percentile(0.95):.2f}ms, p99 {percentile(0.99):.2f}ms'
+    )
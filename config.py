@@ -12,11 +12,39 @@ def update_config_class(dotenv_filename: str, config_class: object):
 
     for key in dir(config_class):
         if key.isupper():
-            setattr(config_class, key, os.environ.get(key, None))
+            setattr(config_class, key, os.environ.get(key, getattr(config_class, key)))
 
     return config_class
 
 
+def is_enabled(value) -> bool:
+    """Interprets flag set in .env file, where every value is a string"""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def get_secret(config, key: str) -> str:
+    """Returns key of stored data, e.g. pepper of PIN hashes. It has to be set on its own,
+    since SECRET_KEY may be rotated, while the key must stay the same as long as the data is stored"""
+    value = config.get(key)
+
+    if not value:
+        raise ValueError(f'{key} is not set.')
+    if value == config.get('SECRET_KEY'):
+        raise ValueError(f'{key} must differ from SECRET_KEY.')
+
+    return value
+
+
+def validate_config(config):
+    """Checks the settings which the configured features can't work without,
+    so that misconfigured application fails at startup rather than on the first request needing them"""
+    get_secret(config, 'IBAN_PERMUTATION_KEY')
+    get_secret(config, 'CARD_NUMBER_PERMUTATION_KEY')
+
+    if config['PIN_HASH_SCHEME'] == 'hmac-sha256':
+        get_secret(config, 'PIN_HASH_PEPPER')
+
+
 class AppConfig(object):
     SECRET_KEY = os.environ.get('SECRET_KEY')
 
@@ -27,7 +55,47 @@ class AppConfig(object):
     IBAN_COUNTRY_IDENTIFIER = os.environ.get('IBAN_COUNTRY_IDENTIFIER')
     IBAN_BBAN_LENGTH = os.environ.get('IBAN_BBAN_LENGTH')
     IBAN_BANK_IDENTIFIER = os.environ.get('IBAN_BANK_IDENTIFIER')
+    IBAN_ALLOCATOR_BLOCK_SIZE = os.environ.get('IBAN_ALLOCATOR_BLOCK_SIZE', 100)
+    IBAN_PERMUTATION_KEY = os.environ.get('IBAN_PERMUTATION_KEY')
 
     CARD_NUMBER_PAYMENT_SYSTEM_CODE = os.environ.get('CARD_NUMBER_PAYMENT_SYSTEM_CODE')
     CARD_NUMBER_BANK_IDENTIFIER = os.environ.get('CARD_NUMBER_BANK_IDENTIFIER')
     CARD_NUMBER_CUSTOMER_IDENTIFIED_LENGTH = os.environ.get('CARD_NUMBER_CUSTOMER_IDENTIFIED_LENGTH')
+    CARD_NUMBER_ALLOCATOR_BLOCK_SIZE = os.environ.get('CARD_NUMBER_ALLOCATOR_BLOCK_SIZE', 100)
+    CARD_NUMBER_PERMUTATION_KEY = os.environ.get('CARD_NUMBER_PERMUTATION_KEY')
+
+    CUSTOMER_BULK_CREATE_CHUNK_SIZE = os.environ.get('CUSTOMER_BULK_CREATE_CHUNK_SIZE', 1000)
+    CUSTOMER_CACHE_MAX_MEMORY = os.environ.get('CUSTOMER_CACHE_MAX_MEMORY', 16 * 1024 * 1024)
+    CUSTOMER_CACHE_TTL = os.environ.get('CUSTOMER_CACHE_TTL', 60)
+    CUSTOMER_PAGE_SIZE = os.environ.get('CUSTOMER_PAGE_SIZE', 50)
+    CUSTOMER_EXPORT_BATCH_SIZE = os.environ.get('CUSTOMER_EXPORT_BATCH_SIZE', 1000)
+    CUSTOMER_IMPORT_BATCH_SIZE = os.environ.get('CUSTOMER_IMPORT_BATCH_SIZE', 10000)
+
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')
+    SHARED_CACHE_SIZE = os.environ.get('SHARED_CACHE_SIZE', 64 * 1024 * 1024)
+    SHARED_CACHE_SLOT_SIZE = os.environ.get('SHARED_CACHE_SLOT_SIZE', 256)
+    SHARED_CACHE_TTL = os.environ.get('SHARED_CACHE_TTL', 60)
+
+    NEGATIVE_LOOKUP_FILTER = os.environ.get('NEGATIVE_LOOKUP_FILTER', False)
+    NEGATIVE_LOOKUP_FILTER_FALSE_POSITIVE_RATE = os.environ.get('NEGATIVE_LOOKUP_FILTER_FALSE_POSITIVE_RATE', 0.01)
+    NEGATIVE_LOOKUP_FILTER_REFRESH_INTERVAL = os.environ.get('NEGATIVE_LOOKUP_FILTER_REFRESH_INTERVAL', 3600)
+
+    HASHING_POOL_SIZE = os.environ.get('HASHING_POOL_SIZE', 2)
+    PIN_HASH_SCHEME = os.environ.get('PIN_HASH_SCHEME', 'hmac-sha256')
+    PIN_HASH_PEPPER = os.environ.get('PIN_HASH_PEPPER')
+
+    LEDGER_APPEND_ONLY = os.environ.get('LEDGER_APPEND_ONLY', False)
+    LEDGER_PAGE_SIZE = os.environ.get('LEDGER_PAGE_SIZE', 50)
+    BALANCE_BATCH_CHUNK_SIZE = os.environ.get('BALANCE_BATCH_CHUNK_SIZE', 1000)
+
+    BALANCE_WRITE_BEHIND = os.environ.get('BALANCE_WRITE_BEHIND', False)
+    BALANCE_WRITE_BEHIND_INTERVAL = os.environ.get('BALANCE_WRITE_BEHIND_INTERVAL', 100)
+    BALANCE_WRITE_BEHIND_MAX_ENTRIES = os.environ.get('BALANCE_WRITE_BEHIND_MAX_ENTRIES', 1000)
+    BALANCE_WRITE_BEHIND_SPILL_DIRECTORY = os.environ.get('BALANCE_WRITE_BEHIND_SPILL_DIRECTORY')
+
+    HOT_ACCOUNT_SHARDS = os.environ.get('HOT_ACCOUNT_SHARDS', 8)
+    HOT_ACCOUNT_CACHE_TTL = os.environ.get('HOT_ACCOUNT_CACHE_TTL', 5)
+
+    SNAPSHOT_DIRECTORY = os.environ.get('SNAPSHOT_DIRECTORY')
+    SNAPSHOT_WORKERS = os.environ.get('SNAPSHOT_WORKERS', 4)
+    SNAPSHOT_BATCH_SIZE = os.environ.get('SNAPSHOT_BATCH_SIZE', 65536)
@@ -0,0 +1,24 @@
+"""empty message
+
+Revision ID: 5b0e7c2d9a41
+Revises: 0fb69470d652
+Create Date: 2026-10-18 18:20:11.402215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b0e7c2d9a41'
+down_revision = '0fb69470d652'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.schema.CreateSequence(sa.Sequence('bank_account_bban_seq', minvalue=0, start=0)))
+
+
+def downgrade():
+    op.execute(sa.schema.DropSequence(sa.Sequence('bank_account_bban_seq')))
@@ -0,0 +1,24 @@
+"""empty message
+
+Revision ID: 8d3f1a6e0c27
+Revises: 5b0e7c2d9a41
+Create Date: 2026-10-18 18:41:37.118604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f1a6e0c27'
+down_revision = '5b0e7c2d9a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.schema.CreateSequence(sa.Sequence('bank_card_number_seq', minvalue=0, start=0)))
+
+
+def downgrade():
+    op.execute(sa.schema.DropSequence(sa.Sequence('bank_card_number_seq')))
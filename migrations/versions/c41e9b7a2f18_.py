@@ -0,0 +1,32 @@
+"""empty message
+
+Revision ID: c41e9b7a2f18
+Revises: 8d3f1a6e0c27
+Create Date: 2026-10-18 19:52:04.318227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e9b7a2f18'
+down_revision = '8d3f1a6e0c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing werkzeug hashes are kept as their text bytes and replaced on the next successful check
+    op.alter_column('bank_card', '_pin_hash', type_=sa.LargeBinary(), existing_type=sa.String(length=256),
+                    postgresql_using='convert_to("_pin_hash", \'UTF8\')')
+    op.alter_column('bank_card', '_cvv_hash', type_=sa.LargeBinary(), existing_type=sa.String(length=256),
+                    postgresql_using='convert_to("_cvv_hash", \'UTF8\')')
+
+
+def downgrade():
+    # Only werkzeug hashes can be converted back, so cards with keyed hashes have to be re-hashed beforehand
+    op.alter_column('bank_card', '_cvv_hash', type_=sa.String(length=256), existing_type=sa.LargeBinary(),
+                    postgresql_using='convert_from("_cvv_hash", \'UTF8\')')
+    op.alter_column('bank_card', '_pin_hash', type_=sa.String(length=256), existing_type=sa.LargeBinary(),
+                    postgresql_using='convert_from("_pin_hash", \'UTF8\')')
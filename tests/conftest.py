@@ -3,16 +3,22 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import event
 
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.app import create_app
+from app.repositories.sqlalchemy.allocators import CardNumberAllocator, SequenceIBANAllocator
 from app.repositories.sqlalchemy.bank_account import BankAccountRepository
 from app.repositories.sqlalchemy.customer import CustomerRepository
 from app.repositories.sqlalchemy.bank_card import BankCardRepository
 from app.models.sqlalchemy.bank_account import BankAccount
 from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
 from app.models.sqlalchemy.customer import Customer
-from app.storage.sqlalchemy import db as _db
+from app.storage.sqlalchemy import SESSION_OPTIONS, UnitOfWork, db as _db
+from app.utils.hashing_executor import HashingExecutor
+from app.utils.secret_hashing import SecretHasher
+
+# Flag in session info, which stops storage fixture from expiring instances when the savepoint is restarted
+KEEP_LOADED_AFTER_COMMIT = 'keep_loaded_after_commit'
 
 
 @pytest.fixture(scope='session')
@@ -44,13 +50,14 @@ def connection(db):
 @pytest.fixture(scope='function')
 def storage(db, connection) -> SQLAlchemy:
     trans = connection.begin()
-    db.session = scoped_session(sessionmaker(bind=connection))
+    db.session = scoped_session(sessionmaker(bind=connection, **SESSION_OPTIONS))
     db.session.begin_nested()
 
     @event.listens_for(db.session, "after_transaction_end")
     def restart_savepoint(session, transaction):
         if transaction.nested and not transaction._parent.nested:
-            session.expire_all()
+            if not session.info.get(KEEP_LOADED_AFTER_COMMIT):
+                session.expire_all()
 
             session.begin_nested()
 
@@ -60,6 +67,23 @@ def storage(db, connection) -> SQLAlchemy:
     trans.rollback()
 
 
+@pytest.fixture(scope='function')
+def statements(storage) -> list[str]:
+    """Collects SQL statements sent to the database, except savepoints opened by storage fixture.
+    Instances aren't expired when the savepoint is restarted, like by the app session with expire_on_commit=False,
+    so that committed instances don't add reloads to the counted statements"""
+    storage.session.info[KEEP_LOADED_AFTER_COMMIT] = True
+    collected = []
+
+    def collect_statement(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')):
+            collected.append(statement)
+
+    event.listen(storage.engine, 'before_cursor_execute', collect_statement)
+    yield collected
+    event.remove(storage.engine, 'before_cursor_execute', collect_statement)
+
+
 @pytest.fixture(scope='function')
 def client(app, storage):
     client = app.test_client()
@@ -68,28 +92,77 @@ def client(app, storage):
 
 
 @pytest.fixture(scope='function')
-def bank_account_repository(app, storage) -> BankAccountRepository:
-    repository = BankAccountRepository(
+def unit_of_work(storage) -> UnitOfWork:
+    yield UnitOfWork(storage=storage)
+
+
+@pytest.fixture(scope='function')
+def iban_allocator(app, storage) -> SequenceIBANAllocator:
+    allocator = SequenceIBANAllocator(
         storage=storage,
         config=app.config
     )
 
+    yield allocator
+
+
+@pytest.fixture(scope='function')
+def card_number_allocator(app, storage) -> CardNumberAllocator:
+    allocator = CardNumberAllocator(
+        storage=storage,
+        config=app.config
+    )
+
+    yield allocator
+
+
+@pytest.fixture(scope='function')
+def bank_account_repository(app, storage, iban_allocator, unit_of_work) -> BankAccountRepository:
+    repository = BankAccountRepository(
+        storage=storage,
+        config=app.config,
+        iban_allocator=iban_allocator,
+        unit_of_work=unit_of_work
+    )
+
     yield repository
 
 
 @pytest.fixture(scope='function')
-def customer_repository(storage) -> CustomerRepository:
+def customer_repository(app, storage, unit_of_work) -> CustomerRepository:
     repository = CustomerRepository(
         storage=storage,
+        config=app.config,
+        unit_of_work=unit_of_work
     )
 
     yield repository
 
 
+@pytest.fixture(scope='session')
+def hashing_executor() -> HashingExecutor:
+    executor = HashingExecutor(pool_size=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture(scope='function')
+def secret_hasher(app, hashing_executor) -> SecretHasher:
+    hasher = SecretHasher(
+        config=app.config,
+        hashing_executor=hashing_executor
+    )
+
+    yield hasher
+
+
 @pytest.fixture(scope='function')
-def bank_card_repository(storage) -> BankCardRepository:
+def bank_card_repository(storage, card_number_allocator, unit_of_work, secret_hasher) -> BankCardRepository:
     repository = BankCardRepository(
         storage=storage,
+        card_number_allocator=card_number_allocator,
+        unit_of_work=unit_of_work,
+        secret_hasher=secret_hasher
     )
 
     yield repository
@@ -103,25 +176,20 @@ def permanent_session(db):
 
 
 @pytest.fixture(scope='session')
-def bank_account(permanent_session):
-    while True:
-        try:
-            bank_account = BankAccount(
-                currency='BYN',
-                balance=0,
-            )
-
-            permanent_session.add(bank_account)
-            permanent_session.commit()
-
-            break
-        except IntegrityError:
-            '''There's very small chance to generate duplicated IBAN
-            But since this chance still exists, we have to repeat the operation'''
-            permanent_session.rollback()
-        except SQLAlchemyError:
-            permanent_session.rollback()
-            raise
+def bank_account(app, db, permanent_session):
+    bank_account = BankAccount(
+        IBAN=SequenceIBANAllocator(storage=db, config=app.config).allocate(),
+        currency='BYN',
+        compacted_balance=0,
+    )
+
+    permanent_session.add(bank_account)
+
+    try:
+        permanent_session.commit()
+    except SQLAlchemyError:
+        permanent_session.rollback()
+        raise
 
     association_row = AssociationBankAccountCustomer(
         bank_account_id=bank_account.IBAN,
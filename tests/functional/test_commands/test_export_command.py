@@ -0,0 +1,25 @@
+import json
+
+from app.commands.export import export_command
+
+CUSTOMER_DATA = {
+    'first_name': 'John',
+    'last_name': 'Smith',
+    'email': 'jsmith@gmail.com',
+    'passport_number': 'HB1111111',
+}
+
+
+def test_export(app, customer_repository, bank_account_repository, tmp_path):
+    uuid = customer_repository.create(CUSTOMER_DATA).uuid
+    iban = bank_account_repository.create({'currency': 'USD', 'balance': 10}, uuid).IBAN
+    output = tmp_path / 'customers.ndjson'
+
+    result = app.test_cli_runner(mix_stderr=False).invoke(export_command, ['--output', str(output)])
+
+    assert result.exit_code == 0
+    assert result.stderr.startswith('Exported ')
+    assert result.stderr.endswith(' customers/sec.\n')
+
+    customers = {customer['uuid']: customer for customer in map(json.loads, output.read_text().splitlines())}
+    assert customers[uuid]['bank_accounts'] == [{'iban': iban, 'currency': 'USD', 'balance': 10.0, 'cards': []}]
@@ -0,0 +1,25 @@
+from app.commands.hot_account import hot_account_command
+from app.models.sqlalchemy.balance_shard import BalanceShard
+
+
+def test_promote_and_demote(app, storage, bank_account_repository):
+    iban = bank_account_repository.create({'currency': 'BYN'}, 'MockUUID').IBAN
+
+    result = app.test_cli_runner().invoke(hot_account_command, ['promote', iban, '--shards', '3'])
+
+    assert result.exit_code == 0
+    assert result.output == f'Bank account {iban} is hot with 3 shards.\n'
+    assert storage.session.query(BalanceShard).filter_by(iban=iban).count() == 3
+
+    result = app.test_cli_runner().invoke(hot_account_command, ['demote', iban])
+
+    assert result.exit_code == 0
+    assert result.output == f'Bank account {iban} is regular.\n'
+    assert storage.session.query(BalanceShard).filter_by(iban=iban).count() == 0
+
+
+def test_promote_nonexistent_bank_account(app, storage):
+    result = app.test_cli_runner().invoke(hot_account_command, ['promote', 'NonexistentIBAN'])
+
+    assert result.exit_code == 1
+    assert 'BankAccount does not exist!' in result.output
@@ -0,0 +1,58 @@
+import json
+
+from app.commands.import_customers import import_customers_command
+from app.models.sqlalchemy.customer import Customer
+
+CSV_DATA = """passport_number,first_name,last_name,email,currency,balance
+HB1111111,John,Smith,jsmith@gmail.com,USD,10
+HB1111112,Jane,Smith,janesmith@gmail.com,EUR,
+HB1111111,John,Smith,jsmith@gmail.com,USD,10
+HB11111,Bob,Miller,bmiller@gmail.com,USD,0
+HB1111113,Tom,Miller,tmiller@gmail.com,usd,0
+"""
+
+
+def test_import_csv(app, storage, tmp_path):
+    path = tmp_path / 'customers.csv'
+    path.write_text(CSV_DATA)
+
+    result = app.test_cli_runner(mix_stderr=False).invoke(import_customers_command, [str(path), '--batch-size', '2'])
+
+    assert result.exit_code == 0
+    assert 'Row 4: ' in result.stderr
+    assert 'Row 5: Currency does not exist!' in result.stderr
+    assert 'Processed 5 rows: 2 created, 1 duplicates, 2 invalid' in result.stderr
+    assert result.stderr.startswith('Processed 2 rows: ')
+    assert result.stderr.endswith(' rows/sec.\n')
+
+    customer = storage.session.query(Customer).filter_by(passport_number='HB1111112').one()
+    assert customer.first_name == 'Jane'
+
+
+def test_import_ndjson(app, storage, customer_repository, tmp_path):
+    path = tmp_path / 'customers.ndjson'
+    path.write_text(json.dumps({
+        'first_name': 'John',
+        'last_name': 'Smith',
+        'email': 'jsmith@gmail.com',
+        'passport_number': 'HB1111111',
+        'bank_account': {'currency': 'BYN'},
+    }) + '\nnot json\n')
+
+    result = app.test_cli_runner(mix_stderr=False).invoke(import_customers_command, [str(path)])
+
+    assert result.exit_code == 0
+    assert 'Processed 2 rows: 1 created, 0 duplicates, 1 invalid' in result.stderr
+
+    uuid = storage.session.query(Customer.uuid).filter_by(passport_number='HB1111111').scalar()
+    assert customer_repository.has_bank_account(uuid)
+
+
+def test_for_unknown_format(app, tmp_path):
+    path = tmp_path / 'customers.txt'
+    path.write_text('')
+
+    result = app.test_cli_runner(mix_stderr=False).invoke(import_customers_command, [str(path)])
+
+    assert result.exit_code == 2
+    assert 'use --format' in result.stderr
@@ -0,0 +1,22 @@
+from app.commands.ledger import compact_ledger_command
+from app.models.sqlalchemy.ledger import LedgerEntry
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+
+
+def test_compact_ledger(app, storage, iban_allocator, unit_of_work):
+    repository = BankAccountRepository(
+        storage=storage,
+        config=dict(app.config, LEDGER_APPEND_ONLY='true'),
+        iban_allocator=iban_allocator,
+        unit_of_work=unit_of_work
+    )
+    iban = repository.create({'currency': 'BYN'}, 'MockUUID').IBAN
+    repository.update_balance_by_amount(iban, 20)
+
+    result = app.test_cli_runner().invoke(compact_ledger_command)
+
+    assert result.exit_code == 0
+    assert result.output == 'Compacted ledger of 1 bank accounts.\n'
+
+    assert storage.session.query(LedgerEntry).filter_by(iban=iban).one().compacted
+    assert repository.get_by_iban(iban).balance == 20.0
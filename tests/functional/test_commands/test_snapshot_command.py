@@ -0,0 +1,62 @@
+import json
+
+import pyarrow.parquet
+from sqlalchemy import update
+
+from app.commands.snapshot import snapshot_command
+from app.models.sqlalchemy.bank_account import BankAccount
+
+
+def read_snapshot(directory, snapshot_id: str, table_name: str) -> list[dict]:
+    with open(directory / snapshot_id / 'manifest.json', encoding='utf-8') as file:
+        manifest = json.load(file)
+
+    return [
+        row
+        for partition in manifest['tables'][table_name]['partitions']
+        for row in pyarrow.parquet.read_table(directory / snapshot_id / partition['path']).to_pylist()
+    ]
+
+
+def set_balance(session, iban: str, balance: float):
+    session.execute(
+        update(BankAccount).where(BankAccount.IBAN == iban).values({BankAccount.compacted_balance: balance})
+    )
+    session.commit()
+
+
+def get_latest_snapshot_id(directory) -> str:
+    return max(path.name for path in directory.iterdir())
+
+
+def test_snapshot(app, permanent_session, bank_account, tmp_path):
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(snapshot_command, ['--output', str(tmp_path), '--workers', '2', '--incremental'])
+
+    assert result.exit_code == 0
+    assert ' (full): ' in result.output
+    full_snapshot_id = get_latest_snapshot_id(tmp_path)
+    assert {'iban': bank_account.IBAN, 'currency': 'BYN', 'balance': 0.0} in read_snapshot(
+        tmp_path, full_snapshot_id, 'bank_account'
+    )
+
+    result = runner.invoke(snapshot_command, ['--output', str(tmp_path), '--incremental'])
+
+    assert result.exit_code == 0
+    assert f' (incremental since {full_snapshot_id}): ' in result.output
+    ibans = [row['iban'] for row in read_snapshot(tmp_path, get_latest_snapshot_id(tmp_path), 'bank_account')]
+    assert bank_account.IBAN not in ibans
+
+    # Command removes the session of the app context, which bank_account fixture is detached from
+    set_balance(permanent_session, bank_account.IBAN, 10)
+
+    try:
+        result = runner.invoke(snapshot_command, ['--output', str(tmp_path), '--incremental'])
+
+        assert result.exit_code == 0
+        assert {'iban': bank_account.IBAN, 'currency': 'BYN', 'balance': 10.0} in read_snapshot(
+            tmp_path, get_latest_snapshot_id(tmp_path), 'bank_account'
+        )
+    finally:
+        set_balance(permanent_session, bank_account.IBAN, 0)
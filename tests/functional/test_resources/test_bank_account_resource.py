@@ -0,0 +1,95 @@
+from http import HTTPStatus
+
+import pytest
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+
+@pytest.fixture(scope='function')
+def iban(bank_account_repository):
+    iban = bank_account_repository.create(BANK_ACCOUNT_DATA, 'MockUUID').IBAN
+
+    for amount in range(1, 6):
+        bank_account_repository.update_balance_by_amount(iban, amount)
+
+    return iban
+
+
+class TestLedger:
+    def test_pages(self, client, iban):
+        first_page = client.get(f'/api/accounts/{iban}/ledger?limit=3')
+
+        assert first_page.status_code == HTTPStatus.OK
+        assert [entry['amount'] for entry in first_page.json['entries']] == [5, 4, 3]
+        assert set(first_page.json['entries'][0]) == {'id', 'amount', 'created_at'}
+
+        second_page = client.get(f'/api/accounts/{iban}/ledger?limit=3&before={first_page.json["next_before"]}')
+
+        assert second_page.status_code == HTTPStatus.OK
+        assert [entry['amount'] for entry in second_page.json['entries']] == [2, 1]
+        assert second_page.json['next_before'] is None
+
+    def test_default_page_size(self, client, iban):
+        response = client.get(f'/api/accounts/{iban}/ledger')
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json['entries']) == 5
+        assert response.json['next_before'] is None
+
+    def test_without_entries(self, client, bank_account_repository):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, 'MockUUID').IBAN
+
+        response = client.get(f'/api/accounts/{iban}/ledger')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json == {'entries': [], 'next_before': None}
+
+    def test_for_nonexistent_bank_account(self, client):
+        response = client.get('/api/accounts/NonexistentIBAN/ledger')
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json == {'error': 'BankAccount does not exist!'}
+
+    @pytest.mark.parametrize('query', ('limit=0', 'limit=501', 'limit=ten', 'before=0'))
+    def test_with_wrong_query(self, client, iban, query):
+        response = client.get(f'/api/accounts/{iban}/ledger?{query}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestBalanceBatch:
+    def test_apply(self, client, storage, bank_account_repository):
+        ibans = [bank_account_repository.create(BANK_ACCOUNT_DATA, 'MockUUID').IBAN for _ in range(2)]
+
+        response = client.post('/api/accounts/balance-batch', json={'deltas': [
+            {'iban': ibans[0], 'amount': 10},
+            {'iban': ibans[1], 'amount': -10},
+            {'iban': 'NonexistentIBAN', 'amount': 1},
+            {'iban': ibans[0], 'amount': 2.5},
+        ]})
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json == {'missing_ibans': ['NonexistentIBAN']}
+
+        assert bank_account_repository.get_by_iban(ibans[0]).balance == 112.5
+        assert bank_account_repository.get_by_iban(ibans[1]).balance == 90.0
+
+    def test_empty_batch(self, client):
+        response = client.post('/api/accounts/balance-batch', json={'deltas': []})
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    def test_invalid_delta(self, client):
+        response = client.post('/api/accounts/balance-batch', json={'deltas': [{'iban': 'IBAN'}]})
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_write_behind_metrics_disabled(client):
+    response = client.get('/api/metrics/balance-write-behind')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json == {'enabled': False}
@@ -1,7 +1,10 @@
+import json
 import re
+from datetime import date
 from http import HTTPStatus
 
 import pytest
+from flask import g
 
 from app.models.sqlalchemy.bank_account import BankAccount
 from app.models.sqlalchemy.customer import Customer
@@ -51,6 +54,43 @@ class TestCustomerCreate:
 
         assert bank_account.currency.value == CUSTOMER_DATA['bank_account']['currency']
 
+    def test_no_reload_selects(self, client, statements):
+        # IBAN block is leased by the first request
+        client.post('/api/customers/', json={**CUSTOMER_DATA, 'passport_number': 'HB2072132'})
+        statements.clear()
+
+        response = client.post('/api/customers/', json=CUSTOMER_DATA)
+
+        assert response.status_code == HTTPStatus.CREATED
+        assert [statement.split()[:3] for statement in statements] == [
+            ['INSERT', 'INTO', 'customer'],
+            ['INSERT', 'INTO', 'bank_account'],
+            ['INSERT', 'INTO', 'association_bank_account_customer'],
+        ]
+
+    def test_single_commit(self, client):
+        with client:
+            response = client.post('/api/customers/', json=CUSTOMER_DATA)
+
+            assert response.status_code == HTTPStatus.CREATED
+            assert g.commit_count == 1
+
+    def test_rollback_on_app_exception(self, client, storage):
+        client.post('/api/customers/', json=CUSTOMER_DATA)
+
+        with client:
+            response = client.post(
+                '/api/customers/',
+                json=dict(CUSTOMER_DATA, passport_number='HB2072132', bank_account={'currency': 'byn'})
+            )
+
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+            assert g.commit_count == 0
+
+        assert storage.session.query(
+            Customer
+        ).filter_by(passport_number='HB2072132').first() is None
+
     def test_duplicated_passport_number_new_customer(self, client):
         client.post('/api/customers/', json=CUSTOMER_DATA)
         response = client.post('/api/customers/', json=CUSTOMER_DATA)
@@ -258,3 +298,392 @@ class TestCustomerRetrieve:
         assert CUSTOMER_DATA['last_name'] == response.json['last_name']
         assert CUSTOMER_DATA['passport_number'] == response.json['passport_number']
         assert CUSTOMER_DATA['email'] == response.json['email']
+
+    def test_single_select(self, client, statements):
+        new_customer = client.post('/api/customers/', json=CUSTOMER_DATA)
+        statements.clear()
+
+        response = client.get(f'/api/customers/{new_customer.json["uuid"]}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(statements) == 1
+        assert statements[0].startswith('SELECT')
+
+    def test_cached_retrieve(self, client, statements):
+        new_customer = client.post('/api/customers/', json=CUSTOMER_DATA)
+        client.get(f'/api/customers/{new_customer.json["uuid"]}')
+        hits = client.get('/api/metrics/customer-cache').json['hits']
+        statements.clear()
+
+        response = client.get(f'/api/customers/{new_customer.json["uuid"]}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json['first_name'] == CUSTOMER_DATA['first_name']
+        assert statements == []
+        metrics = client.get('/api/metrics/customer-cache').json
+        assert metrics['hits'] == hits + 1
+        assert metrics['shared'] == {'enabled': False}
+
+    def test_fields(self, client):
+        new_customer = client.post('/api/customers/', json=CUSTOMER_DATA)
+
+        response = client.get(f'/api/customers/{new_customer.json["uuid"]}?fields=first_name,email')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json == {'first_name': CUSTOMER_DATA['first_name'], 'email': CUSTOMER_DATA['email']}
+
+    @pytest.mark.parametrize('fields', ('', 'uuid', 'first_name,password'))
+    def test_with_wrong_fields(self, client, fields):
+        new_customer = client.post('/api/customers/', json=CUSTOMER_DATA)
+
+        response = client.get(f'/api/customers/{new_customer.json["uuid"]}?fields={fields}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    def test_coalescing_metrics(self, client):
+        for url in ('/api/metrics/customer-coalescing', '/api/metrics/bank-account-coalescing'):
+            assert set(client.get(url).json) == {'fetches', 'coalesced', 'coalesced_rate'}
+
+    def test_filter_metrics_disabled(self, client):
+        assert client.get('/api/metrics/customer-filter').json == {'enabled': False}
+        assert client.get('/api/metrics/bank-account-filter').json == {'enabled': False}
+
+    def test_updated_retrieve(self, client):
+        new_customer = client.post('/api/customers/', json=CUSTOMER_DATA)
+        client.get(f'/api/customers/{new_customer.json["uuid"]}')
+
+        client.patch(f'/api/customers/{new_customer.json["uuid"]}', json={'first_name': 'Jane'})
+        response = client.get(f'/api/customers/{new_customer.json["uuid"]}')
+
+        assert response.json['first_name'] == 'Jane'
+
+
+class TestCustomerConditionalRequests:
+    def test_etag(self, client):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+
+        assert client.get(f'/api/customers/{uuid}').headers['ETag'] == '"1"'
+
+        response = client.patch(f'/api/customers/{uuid}', json={'first_name': 'Jane'})
+
+        assert response.headers['ETag'] == '"2"'
+        assert client.get(f'/api/customers/{uuid}').headers['ETag'] == '"2"'
+
+    def test_not_modified(self, client, statements):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+        statements.clear()
+
+        response = client.get(f'/api/customers/{uuid}', headers={'If-None-Match': '"1"'})
+
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers['ETag'] == '"1"'
+        assert response.data == b''
+        assert len(statements) == 1
+        assert statements[0].startswith('SELECT customer.version')
+
+    def test_modified(self, client):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+        client.patch(f'/api/customers/{uuid}', json={'first_name': 'Jane'})
+
+        response = client.get(f'/api/customers/{uuid}', headers={'If-None-Match': '"1"'})
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json['first_name'] == 'Jane'
+
+    def test_not_modified_for_nonexistent_customer(self, client):
+        response = client.get('/api/customers/NonexistentUUID', headers={'If-None-Match': '"1"'})
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_if_match(self, client):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+
+        response = client.patch(f'/api/customers/{uuid}', json={'first_name': 'Jane'}, headers={'If-Match': '"1"'})
+
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert response.headers['ETag'] == '"2"'
+
+    def test_if_match_outdated(self, client):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+        client.patch(f'/api/customers/{uuid}', json={'first_name': 'Jane'})
+
+        response = client.patch(f'/api/customers/{uuid}', json={'first_name': 'Joan'}, headers={'If-Match': '"1"'})
+
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+        assert client.get(f'/api/customers/{uuid}').json['first_name'] == 'Jane'
+
+    def test_if_match_any(self, client):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+
+        response = client.patch(f'/api/customers/{uuid}', json={'first_name': 'Jane'}, headers={'If-Match': '*'})
+
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert response.headers['ETag'] == '"2"'
+        assert client.get(f'/api/customers/{uuid}').json['first_name'] == 'Jane'
+
+    def test_if_match_any_for_nonexistent_customer(self, client):
+        response = client.patch(
+            '/api/customers/NonexistentUUID', json={'first_name': 'Jane'}, headers={'If-Match': '*'}
+        )
+
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+
+    def test_update_nonexistent_customer(self, client):
+        response = client.patch('/api/customers/NonexistentUUID', json={'first_name': 'Jane'})
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert response.json['error'] == 'Customer does not exist!'
+
+    def test_if_match_for_nonexistent_customer(self, client):
+        response = client.patch(
+            '/api/customers/NonexistentUUID', json={'first_name': 'Jane'}, headers={'If-Match': '"1"'}
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestCustomerList:
+    @pytest.fixture
+    def uuids(self, customer_repository) -> list[str]:
+        uuids = customer_repository.bulk_create([{
+            'first_name': 'John',
+            'last_name': 'Paged',
+            'email': f'customer{index}@gmail.com',
+            'passport_number': f'HB111111{index}',
+        } for index in range(5)])
+
+        return sorted(uuids)
+
+    def test_pages(self, client, uuids):
+        first_page = client.get('/api/customers/?limit=3&last_name=Paged')
+
+        assert first_page.status_code == HTTPStatus.OK
+        assert [customer['uuid'] for customer in first_page.json['customers']] == uuids[:3]
+        assert set(first_page.json['customers'][0]) == {'uuid', 'passport_number', 'first_name', 'last_name', 'email'}
+
+        second_page = client.get(f'/api/customers/?limit=3&last_name=Paged&cursor={first_page.json["next_cursor"]}')
+
+        assert [customer['uuid'] for customer in second_page.json['customers']] == uuids[3:]
+        assert second_page.json['next_cursor'] is None
+
+    def test_default_page_size(self, client, uuids):
+        response = client.get('/api/customers/?last_name=Paged')
+
+        assert len(response.json['customers']) == 5
+        assert response.json['next_cursor'] is None
+
+    def test_filters(self, client, uuids):
+        response = client.get('/api/customers/?email=customer1@gmail.com')
+
+        assert [customer['email'] for customer in response.json['customers']] == ['customer1@gmail.com']
+
+        response = client.get('/api/customers/?last_name=Smith&email=customer1@gmail.com')
+
+        assert response.json['customers'] == []
+
+    def test_single_select(self, client, uuids, statements):
+        statements.clear()
+
+        client.get('/api/customers/?limit=2')
+
+        assert len(statements) == 1
+
+    def test_fields(self, client, uuids, statements):
+        statements.clear()
+
+        first_page = client.get('/api/customers/?limit=3&last_name=Paged&fields=email')
+
+        assert len(first_page.json['customers']) == 3
+        assert all(set(customer) == {'email'} for customer in first_page.json['customers'])
+        assert statements[0].startswith('SELECT customer.uuid, customer.email \nFROM customer')
+
+        second_page = client.get(f'/api/customers/?last_name=Paged&fields=uuid&cursor={first_page.json["next_cursor"]}')
+
+        assert second_page.json['customers'] == [{'uuid': uuid} for uuid in uuids[3:]]
+
+    @pytest.mark.parametrize('query', ('limit=0', 'limit=501', 'cursor=%25%25', 'uuid=', 'fields=password'))
+    def test_with_wrong_query(self, client, query):
+        response = client.get(f'/api/customers/?{query}')
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestCustomerBatch:
+    @pytest.fixture
+    def uuids(self, customer_repository) -> list[str]:
+        return customer_repository.bulk_create([
+            dict(CUSTOMER_DATA, passport_number=f'HB111111{index}') for index in range(3)
+        ])
+
+    def test_get(self, client, uuids, statements):
+        statements.clear()
+
+        response = client.get(f'/api/customers/?uuid={uuids[2]},NonexistentUUID,{uuids[0]}')
+
+        assert response.status_code == HTTPStatus.OK
+        assert [customer['uuid'] for customer in response.json['customers']] == [uuids[2], uuids[0]]
+        assert response.json['customers'][0]['first_name'] == CUSTOMER_DATA['first_name']
+        assert response.json['missing_uuids'] == ['NonexistentUUID']
+        assert len(statements) == 1
+
+    def test_fields(self, client, uuids):
+        response = client.get(f'/api/customers/?uuid={uuids[0]},NonexistentUUID&fields=uuid,first_name')
+
+        assert response.json == {
+            'customers': [{'uuid': uuids[0], 'first_name': CUSTOMER_DATA['first_name']}],
+            'missing_uuids': ['NonexistentUUID'],
+        }
+
+        response = client.post('/api/customers/batch', json={'uuids': [uuids[1]], 'fields': ['email']})
+
+        assert response.json['customers'] == [{'email': CUSTOMER_DATA['email']}]
+
+    def test_post(self, client, uuids):
+        response = client.post('/api/customers/batch', json={'uuids': [uuids[1], 'NonexistentUUID']})
+
+        assert response.status_code == HTTPStatus.OK
+        assert [customer['uuid'] for customer in response.json['customers']] == [uuids[1]]
+        assert response.json['missing_uuids'] == ['NonexistentUUID']
+
+    @pytest.mark.parametrize('data', (
+            {},
+            {'uuids': []},
+            {'uuids': ['MockUUID'] * 501},
+            {'uuids': 'MockUUID'},
+            {'uuids': ['MockUUID'], 'fields': ['password']},
+    ))
+    def test_with_wrong_data(self, client, data):
+        response = client.post('/api/customers/batch', json=data)
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestCustomerExport:
+    def test_export(self, client, customer_repository, bank_account_repository, bank_card_repository):
+        uuid = client.post('/api/customers/', json=CUSTOMER_DATA).json['uuid']
+        iban = bank_account_repository.get_owned_by_customer(uuid)[0].IBAN
+        bank_card, _, _ = bank_card_repository.create({'expiration_date': date(2030, 1, 1)}, iban)
+        other_uuid = customer_repository.create(dict(CUSTOMER_DATA, passport_number='HB2072132')).uuid
+
+        response = client.get('/api/export/customers.ndjson')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.mimetype == 'application/x-ndjson'
+
+        customers = {customer['uuid']: customer for customer in map(json.loads, response.data.splitlines())}
+        assert customers[uuid] == {
+            'uuid': uuid,
+            'passport_number': CUSTOMER_DATA['passport_number'],
+            'first_name': CUSTOMER_DATA['first_name'],
+            'last_name': CUSTOMER_DATA['last_name'],
+            'email': CUSTOMER_DATA['email'],
+            'version': 1,
+            'bank_accounts': [{
+                'iban': iban,
+                'currency': 'BYN',
+                'balance': 0.0,
+                'cards': [{'card_number': bank_card.card_number, 'expiration_date': '2030-01-01'}],
+            }],
+        }
+        assert customers[other_uuid]['bank_accounts'] == []
+
+
+class TestCustomerBulkCreate:
+    @staticmethod
+    def make_customers_data(count: int) -> list[dict]:
+        return [
+            dict(CUSTOMER_DATA, passport_number=f'HB{3000000 + index}') for index in range(count)
+        ]
+
+    def test_json_array(self, client, storage):
+        customers_data = self.make_customers_data(3)
+
+        response = client.post('/api/customers/bulk', json=customers_data)
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json['errors'] == []
+        assert [item['index'] for item in response.json['created']] == [0, 1, 2]
+
+        for item in response.json['created']:
+            assert storage.session.query(
+                BankAccount
+            ).join(
+                AssociationBankAccountCustomer
+            ).filter(AssociationBankAccountCustomer.customer_id == item['uuid']).first() is not None
+
+    def test_ndjson(self, client, storage):
+        customers_data = self.make_customers_data(2)
+
+        response = client.post(
+            '/api/customers/bulk',
+            data='\n'.join(json.dumps(customer_data) for customer_data in customers_data),
+            content_type='application/x-ndjson'
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json['created']) == 2
+
+        assert storage.session.query(
+            Customer
+        ).filter(Customer.uuid.in_([item['uuid'] for item in response.json['created']])).count() == 2
+
+    def test_per_item_errors(self, client):
+        customers_data = self.make_customers_data(3)
+        customers_data[1] = dict(customers_data[1], email='some@@@')
+        customers_data[2] = dict(customers_data[2], passport_number=customers_data[0]['passport_number'])
+
+        response = client.post('/api/customers/bulk', json=customers_data)
+
+        assert response.status_code == HTTPStatus.OK
+        assert [item['index'] for item in response.json['created']] == [0]
+        assert response.json['errors'] == [
+            {'index': 1, 'errors': {'email': ['Not a valid email format.']}},
+            {'index': 2, 'errors': {'error': 'Customer already exist!'}},
+        ]
+
+    def test_malformed_ndjson_line(self, client):
+        response = client.post(
+            '/api/customers/bulk',
+            data=json.dumps(CUSTOMER_DATA) + '\n{malformed\n',
+            content_type='application/x-ndjson'
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json['created']) == 1
+        assert response.json['errors'][0]['index'] == 1
+
+    def test_commit_per_chunk(self, client, app, monkeypatch):
+        monkeypatch.setitem(app.config, 'CUSTOMER_BULK_CREATE_CHUNK_SIZE', 2)
+
+        with client:
+            response = client.post('/api/customers/bulk', json=self.make_customers_data(5))
+
+            assert len(response.json['created']) == 5
+            # Three chunks and the end of request
+            assert g.commit_count == 4
+
+    def test_malformed_json_array(self, client, app, monkeypatch, storage):
+        monkeypatch.setitem(app.config, 'CUSTOMER_BULK_CREATE_CHUNK_SIZE', 2)
+        customers_data = self.make_customers_data(3)
+
+        response = client.post(
+            '/api/customers/bulk',
+            data=json.dumps(customers_data)[:-1] + ', {"first_name": ',
+            content_type='application/json'
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert [item['index'] for item in response.json['created']] == [0, 1, 2]
+        assert [error['index'] for error in response.json['errors']] == [3]
+        assert 'Malformed JSON' in response.json['errors'][0]['errors']['error']
+
+        assert storage.session.query(
+            Customer
+        ).filter(Customer.uuid.in_([item['uuid'] for item in response.json['created']])).count() == 3
+
+    def test_not_json_array(self, client):
+        response = client.post('/api/customers/bulk', data='{"first_name": "A"}', content_type='application/json')
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json['created'] == []
+        assert response.json['errors'] == [{'index': 0, 'errors': {'error': 'Malformed JSON: JSON array expected.'}}]
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+import pytest
+
+from app.models.sqlalchemy.bank_account import BankAccount
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+
+@pytest.fixture(scope='function')
+def bank_accounts(bank_account_repository):
+    return [bank_account_repository.create(BANK_ACCOUNT_DATA, 'MockUUID').IBAN for _ in range(2)]
+
+
+class TestTransfer:
+    def test_transfer(self, client, storage, bank_accounts):
+        source_iban, target_iban = bank_accounts
+
+        response = client.post('/api/transfers', json={
+            'source_iban': source_iban,
+            'target_iban': target_iban,
+            'amount': 25.5,
+        })
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json == {
+            'source_iban': source_iban,
+            'target_iban': target_iban,
+            'amount': 25.5,
+            'source_balance': 74.5,
+            'target_balance': 125.5,
+        }
+
+        assert storage.session.query(BankAccount).filter_by(IBAN=source_iban).first().balance == 74.5
+        assert storage.session.query(BankAccount).filter_by(IBAN=target_iban).first().balance == 125.5
+
+    def test_insufficient_funds(self, client, storage, bank_accounts):
+        source_iban, target_iban = bank_accounts
+
+        response = client.post('/api/transfers', json={
+            'source_iban': source_iban,
+            'target_iban': target_iban,
+            'amount': 1000,
+        })
+
+        assert response.status_code == HTTPStatus.CONFLICT
+        assert response.json == {'error': 'Insufficient funds!'}
+
+        assert storage.session.query(BankAccount).filter_by(IBAN=source_iban).first().balance == 100.0
+
+    def test_nonexistent_bank_account(self, client, bank_accounts):
+        response = client.post('/api/transfers', json={
+            'source_iban': bank_accounts[0],
+            'target_iban': 'NonexistentIBAN',
+            'amount': 10,
+        })
+
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json == {'error': 'BankAccount does not exist!'}
+
+    def test_same_bank_account(self, client, bank_accounts):
+        response = client.post('/api/transfers', json={
+            'source_iban': bank_accounts[0],
+            'target_iban': bank_accounts[0],
+            'amount': 10,
+        })
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert 'target_iban' in response.json['errors']
+
+    @pytest.mark.parametrize('amount', (0, -10, 'ten'))
+    def test_with_wrong_amount(self, client, bank_accounts, amount):
+        response = client.post('/api/transfers', json={
+            'source_iban': bank_accounts[0],
+            'target_iban': bank_accounts[1],
+            'amount': amount,
+        })
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert 'amount' in response.json['errors']
+
+    def test_without_fields(self, client):
+        response = client.post('/api/transfers', json={})
+
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert set(response.json['errors']) == {'source_iban', 'target_iban', 'amount'}
@@ -6,28 +6,32 @@ from app.services.bank_card import BankCardService
 
 
 @pytest.fixture(scope='function')
-def customer_service(storage, bank_account_repository, customer_repository):
+def customer_service(storage, bank_account_repository, customer_repository, unit_of_work):
     customer_service = CustomerService(
         customer_repository=customer_repository,
-        bank_account_repository=bank_account_repository
+        bank_account_repository=bank_account_repository,
+        unit_of_work=unit_of_work
     )
 
     yield customer_service
 
 
 @pytest.fixture(scope='function')
-def bank_account_service(storage, bank_account_repository) -> BankAccountService:
+def bank_account_service(app, storage, bank_account_repository) -> BankAccountService:
     bank_account_service = BankAccountService(
-        bank_account_repository=bank_account_repository
+        bank_account_repository=bank_account_repository,
+        config=app.config,
+        app=app
     )
 
     yield bank_account_service
 
 
 @pytest.fixture(scope='function')
-def bank_card_service(storage, bank_card_repository):
+def bank_card_service(storage, bank_card_repository, secret_hasher):
     bank_card_service = BankCardService(
-        bank_card_repository=bank_card_repository
+        bank_card_repository=bank_card_repository,
+        secret_hasher=secret_hasher
     )
 
     yield bank_card_service
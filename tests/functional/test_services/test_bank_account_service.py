@@ -1,11 +1,13 @@
+import os
 from datetime import date
 
 import pytest
 
-from app.exceptions import DoesNotExistException, AlreadyExistException
+from app.exceptions import DoesNotExistException, AlreadyExistException, InsufficientFundsException
 from app.models.sqlalchemy.bank_account import BankAccount
 from app.models.sqlalchemy.bank_card import BankCard
 from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
+from app.services.bank_account import BankAccountService
 
 
 BANK_ACCOUNT_DATA = {
@@ -176,6 +178,101 @@ class TestUpdateByAmount:
         assert storage_bank_account.balance == BANK_ACCOUNT_DATA['balance'] + amount
 
 
+class TestDebit:
+    def test_debit(self, bank_account_service):
+        iban = bank_account_service.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        assert bank_account_service.debit(iban, 40) == 60.0
+        assert bank_account_service.get_by_iban(iban).balance == 60.0
+
+    def test_insufficient_funds(self, bank_account_service):
+        iban = bank_account_service.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        with pytest.raises(InsufficientFundsException):
+            bank_account_service.debit(iban, 140)
+
+        assert bank_account_service.get_by_iban(iban).balance == 100.0
+
+
+class TestWriteBehind:
+    @pytest.fixture(scope='function')
+    def make_write_behind_service(self, app, storage, bank_account_repository, tmp_path):
+        services = []
+
+        def make() -> BankAccountService:
+            service = BankAccountService(
+                bank_account_repository=bank_account_repository,
+                config=dict(
+                    app.config,
+                    BALANCE_WRITE_BEHIND='true',
+                    BALANCE_WRITE_BEHIND_INTERVAL=60000,
+                    BALANCE_WRITE_BEHIND_SPILL_DIRECTORY=str(tmp_path),
+                ),
+                app=app
+            )
+            services.append(service)
+
+            return service
+
+        yield make
+
+        # Shut down while the test transaction is open, rather than at exit
+        for service in services:
+            service._balance_buffer.shutdown()
+
+    @pytest.fixture(scope='function')
+    def write_behind_service(self, make_write_behind_service) -> BankAccountService:
+        return make_write_behind_service()
+
+    def test_changes_buffered(self, write_behind_service, bank_account_repository):
+        iban = write_behind_service.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        write_behind_service.update_balance_by_amount(iban, 50)
+        write_behind_service.update_balance_by_amount(iban, -20)
+        write_behind_service.update_balance_by_amount('NonexistentIBAN', 10)
+
+        assert bank_account_repository.get_by_iban(iban).balance == 100.0
+
+        assert write_behind_service.flush_balance_changes() == 2
+
+        assert bank_account_repository.get_by_iban(iban).balance == 130.0
+
+        metrics = write_behind_service.get_write_behind_metrics()
+        assert metrics['enabled']
+        assert metrics['flushes'] == 1
+        assert metrics['coalescing_ratio'] == 1.5
+
+    def test_crash_before_spill_file_removed(self, make_write_behind_service, bank_account_repository, monkeypatch):
+        service = make_write_behind_service()
+        iban = service.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+        service.update_balance_by_amount(iban, 50)
+
+        # Deltas are committed, but the process dies before removing the spill file
+        with monkeypatch.context() as patch:
+            patch.setattr(os, 'unlink', lambda path: None)
+            service.flush_balance_changes()
+
+        assert make_write_behind_service().flush_balance_changes() == 0
+        assert bank_account_repository.get_by_iban(iban).balance == 150.0
+
+    def test_disabled(self, bank_account_service):
+        assert bank_account_service.flush_balance_changes() == 0
+        assert bank_account_service.get_write_behind_metrics() == {'enabled': False}
+
+
+class TestTransfer:
+    def test_transfer(self, bank_account_service):
+        source = bank_account_service.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = bank_account_service.create(BANK_ACCOUNT_DATA, MockUUID)
+        data = {'source_iban': source.IBAN, 'target_iban': target.IBAN, 'amount': 40}
+
+        result = bank_account_service.transfer(data)
+
+        assert result == dict(data, source_balance=60.0, target_balance=140.0)
+        assert bank_account_service.get_by_iban(source.IBAN).balance == 60.0
+        assert bank_account_service.get_by_iban(target.IBAN).balance == 140.0
+
+
 class TestGetByIBAN:
     def test_retrieve(self, bank_account_service):
         new_bank_account = bank_account_service.create(BANK_ACCOUNT_DATA, MockUUID)
@@ -1,9 +1,11 @@
 from datetime import date
 
 import pytest
+from werkzeug.security import generate_password_hash
 
 from app.exceptions import DoesNotExistException
 from app.models.sqlalchemy.bank_card import BankCard
+from app.utils.secret_hashing import HMACSHA256HashingScheme
 
 
 BANK_CARD_DATA = {
@@ -102,3 +104,39 @@ class TestGetByCardNumber:
             bank_card_service.get_by_card_number('NonexistentCardNumber')
 
         assert exception_info.value.message == 'BankCard does not exist!'
+
+
+class TestCheckPin:
+    def test_check_pin(self, bank_card_service, bank_account):
+        bank_card, pin, cvv = bank_card_service.create(BANK_CARD_DATA, bank_account.IBAN)
+
+        assert bank_card_service.check_pin(bank_card.card_number, pin)
+        assert not bank_card_service.check_pin(bank_card.card_number, str((int(pin) + 1) % 10000).zfill(4))
+
+    def test_check_cvv(self, bank_card_service, bank_account):
+        bank_card, pin, cvv = bank_card_service.create(BANK_CARD_DATA, bank_account.IBAN)
+
+        assert bank_card_service.check_cvv(bank_card.card_number, cvv)
+        assert not bank_card_service.check_cvv(bank_card.card_number, str((int(cvv) + 1) % 1000).zfill(3))
+
+    def test_legacy_hash_upgraded(self, bank_card_service, bank_account, storage):
+        bank_card, pin, cvv = bank_card_service.create(BANK_CARD_DATA, bank_account.IBAN)
+
+        storage.session.query(BankCard).filter_by(card_number=bank_card.card_number).update({
+            '_pin_hash': generate_password_hash(pin).encode('ascii')
+        })
+
+        assert not bank_card_service.check_pin(bank_card.card_number, str((int(pin) + 1) % 10000).zfill(4))
+        assert storage.session.query(BankCard).get(bank_card.card_number)._pin_hash.startswith(b'pbkdf2:')
+
+        assert bank_card_service.check_pin(bank_card.card_number, pin)
+        assert storage.session.query(BankCard).get(bank_card.card_number)._pin_hash.startswith(
+            HMACSHA256HashingScheme.TAG
+        )
+        assert bank_card_service.check_pin(bank_card.card_number, pin)
+
+    def test_for_nonexistent_bank_card(self, bank_card_service):
+        with pytest.raises(DoesNotExistException) as exception_info:
+            bank_card_service.check_pin('NonexistentCardNumber', '1234')
+
+        assert exception_info.value.message == 'BankCard does not exist!'
@@ -1,6 +1,7 @@
 import pytest
 
-from app.exceptions import AlreadyExistException, DoesNotExistException
+from app.exceptions import (AlreadyExistException, DoesNotExistException, NotFoundException,
+                            PreconditionFailedException)
 from app.models.sqlalchemy.bank_account import BankAccount
 from app.models.sqlalchemy.customer import Customer
 from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
@@ -45,6 +46,14 @@ class TestCreate:
 
         assert storage_bank_account.currency.value == CUSTOMER_DATA['bank_account']['currency']
 
+    def test_loaded_after_commit(self, customer_service, statements):
+        customer = customer_service.create(CUSTOMER_DATA)
+        statements.clear()
+
+        assert customer.uuid is not None
+        assert customer.first_name == CUSTOMER_DATA['first_name']
+        assert statements == []
+
     def test_with_duplicated_passport_number(self, customer_service):
         customer_service.create(CUSTOMER_DATA)
 
@@ -53,6 +62,27 @@ class TestCreate:
 
         assert exception_info.value.message == 'Customer already exist!'
 
+    def test_with_nonexistent_currency(self, customer_service, storage):
+        wrong_data = dict(CUSTOMER_DATA, bank_account={'currency': 'WrongData'})
+
+        with pytest.raises(DoesNotExistException) as exception_info:
+            customer_service.create(wrong_data)
+
+        assert exception_info.value.message == 'Currency does not exist!'
+
+        assert storage.session.query(
+            Customer
+        ).filter_by(passport_number=CUSTOMER_DATA['passport_number']).first() is None
+
+    def test_single_commit(self, customer_service, storage, monkeypatch):
+        commits = []
+        commit = storage.session.commit
+        monkeypatch.setattr(storage.session, 'commit', lambda: commits.append(commit()))
+
+        customer_service.create(CUSTOMER_DATA)
+
+        assert len(commits) == 1
+
 
 class TestUpdate:
     def test_one_field_update(self, customer_service, storage):
@@ -106,6 +136,14 @@ class TestUpdate:
 
         assert exception_info.value.message == 'Customer already exist!'
 
+    def test_nonexistent_customer_update(self, customer_service):
+        with pytest.raises(NotFoundException):
+            customer_service.update('NonexistentUUID', {'first_name': 'Jack'})
+
+    def test_nonexistent_customer_update_if_exists(self, customer_service):
+        with pytest.raises(PreconditionFailedException):
+            customer_service.update('NonexistentUUID', {'first_name': 'Jack'}, must_exist=True)
+
 
 class TestDelete:
     def test_delete_customer(self, customer_service, storage):
@@ -140,3 +178,55 @@ class TestGetByUUID:
             customer_service.get_by_uuid('NonExistentUUID')
 
         assert exception_info.value.message == 'Customer does not exist!'
+
+
+class TestGetMany:
+    def test_request_order(self, customer_service):
+        uuids = [
+            customer_service.create(dict(CUSTOMER_DATA, passport_number=f'HB111111{index}')).uuid
+            for index in range(3)
+        ]
+
+        result = customer_service.get_many([uuids[2], 'NonexistentUUID', uuids[0], uuids[2]])
+
+        assert [customer.uuid for customer in result['customers']] == [uuids[2], uuids[0]]
+        assert result['missing_uuids'] == ['NonexistentUUID']
+
+
+class TestBulkCreate:
+    def test_bulk_create(self, customer_service, storage):
+        second_customer_data = dict(CUSTOMER_DATA, passport_number='HB1111112')
+
+        results = customer_service.bulk_create([CUSTOMER_DATA, second_customer_data])
+
+        assert all('uuid' in result for result in results)
+
+        for result, customer_data in zip(results, (CUSTOMER_DATA, second_customer_data)):
+            storage_customer = storage.session.query(
+                Customer
+            ).filter_by(uuid=result['uuid']).first()
+
+            assert storage_customer.passport_number == customer_data['passport_number']
+
+            storage_bank_account = storage.session\
+                .query(BankAccount)\
+                .join(AssociationBankAccountCustomer)\
+                .filter(AssociationBankAccountCustomer.customer_id == result['uuid']).first()
+
+            assert storage_bank_account.currency.value == customer_data['bank_account']['currency']
+
+    def test_with_duplicated_passport_number(self, customer_service):
+        customer_service.create(CUSTOMER_DATA)
+
+        results = customer_service.bulk_create([CUSTOMER_DATA])
+
+        assert results == [{'error': 'Customer already exist!'}]
+
+    def test_with_nonexistent_currency(self, customer_service):
+        wrong_data = dict(CUSTOMER_DATA, bank_account={'currency': 'WrongData'})
+        second_customer_data = dict(CUSTOMER_DATA, passport_number='HB1111112')
+
+        results = customer_service.bulk_create([wrong_data, second_customer_data])
+
+        assert results[0] == {'error': 'Currency does not exist!'}
+        assert 'uuid' in results[1]
@@ -1,12 +1,13 @@
 import re
-from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.bank_account import format_iban
 
 
-def test_iban_generation():
-    iban = BankAccount.generate_iban(
+def test_iban_format():
+    iban = format_iban(
         'BY',
         'JPCB',
-        20
+        '00000000000000000042'
     )
 
     assert re.match(r'^[a-zA-Z]{2}[\da-zA-Z]{6}\d{20}$', iban) is not None
+    assert iban.endswith('00000000000000000042')
@@ -0,0 +1,89 @@
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.models.sqlalchemy.bank_account import BankAccount, bban_sequence
+from app.models.sqlalchemy.bank_card import BankCard, card_number_sequence
+from app.repositories.sqlalchemy.allocators import CardNumberAllocator, SequenceIBANAllocator
+from app.utils.luhn_algorithm import calculate_checksum
+from config import validate_config
+
+IBAN_REGEX = r'^[a-zA-Z]{2}[\da-zA-Z]{6}\d{20}$'
+
+
+class TestSequenceIBANAllocator:
+    def test_format(self, iban_allocator):
+        iban = iban_allocator.allocate()
+
+        assert re.match(IBAN_REGEX, iban) is not None
+
+    def test_uniqueness(self, iban_allocator):
+        ibans = iban_allocator.allocate_many(500) + [iban_allocator.allocate() for _ in range(500)]
+
+        assert len(set(ibans)) == len(ibans)
+
+    def test_uniqueness_across_allocators(self, app, storage, iban_allocator):
+        second_allocator = SequenceIBANAllocator(storage=storage, config=app.config)
+
+        first_ibans = iban_allocator.allocate_many(10)
+        second_ibans = second_allocator.allocate_many(10)
+
+        assert not set(first_ibans) & set(second_ibans)
+
+    def test_skips_existing_iban(self, app, storage):
+        allocator = SequenceIBANAllocator(storage=storage, config=dict(app.config, IBAN_ALLOCATOR_BLOCK_SIZE=1))
+        next_number = storage.session.execute(select(bban_sequence.next_value())).scalar() + 1
+
+        storage.session.add(BankAccount(IBAN=allocator._make_iban(next_number), currency='BYN', compacted_balance=0))
+        storage.session.flush()
+
+        assert allocator.allocate() == allocator._make_iban(next_number + 1)
+
+    @pytest.mark.parametrize('key', (None, '', 'secret'))
+    def test_permutation_key_required(self, app, storage, key):
+        config = dict(app.config, SECRET_KEY='secret', IBAN_PERMUTATION_KEY=key)
+
+        with pytest.raises(ValueError):
+            validate_config(config)
+        with pytest.raises(ValueError):
+            SequenceIBANAllocator(storage=storage, config=config)
+
+
+class TestCardNumberAllocator:
+    def test_format(self, app, card_number_allocator):
+        card_number = card_number_allocator.allocate()
+
+        assert len(card_number) == 16
+        assert card_number.startswith(
+            app.config['CARD_NUMBER_PAYMENT_SYSTEM_CODE'] + app.config['CARD_NUMBER_BANK_IDENTIFIER']
+        )
+        assert calculate_checksum(card_number) == 0
+
+    def test_uniqueness(self, card_number_allocator):
+        card_numbers = [card_number_allocator.allocate() for _ in range(1000)]
+
+        assert len(set(card_numbers)) == len(card_numbers)
+
+    def test_skips_existing_card_number(self, app, storage, bank_account):
+        allocator = CardNumberAllocator(storage=storage, config=dict(app.config, CARD_NUMBER_ALLOCATOR_BLOCK_SIZE=1))
+        next_number = storage.session.execute(select(card_number_sequence.next_value())).scalar() + 1
+
+        storage.session.add(BankCard(
+            card_number=allocator._make_card_number(next_number),
+            expiration_date=date(2025, 5, 5),
+            bank_account_iban=bank_account.IBAN
+        ))
+        storage.session.flush()
+
+        assert allocator.allocate() == allocator._make_card_number(next_number + 1)
+
+    @pytest.mark.parametrize('key', (None, '', 'secret'))
+    def test_permutation_key_required(self, app, storage, key):
+        config = dict(app.config, SECRET_KEY='secret', CARD_NUMBER_PERMUTATION_KEY=key)
+
+        with pytest.raises(ValueError):
+            validate_config(config)
+        with pytest.raises(ValueError):
+            CardNumberAllocator(storage=storage, config=config)
@@ -0,0 +1,112 @@
+import pytest
+
+from app.exceptions import DoesNotExistException
+from app.models.sqlalchemy.balance_shard import BalanceShard
+from app.models.sqlalchemy.bank_account import BankAccount
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+MockUUID = 'MockUUID'
+
+
+def get_balances(storage, iban: str) -> tuple[float, float]:
+    return storage.session.query(
+        BankAccount.compacted_balance, BankAccount.balance
+    ).filter_by(IBAN=iban).one()
+
+
+def get_shard_balances(storage, iban: str) -> list[float]:
+    return [balance for balance, in storage.session.query(
+        BalanceShard.balance
+    ).filter_by(iban=iban).order_by(BalanceShard.slot)]
+
+
+class TestPromoteToHot:
+    def test_shards_created(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        assert bank_account_repository.promote_to_hot(bank_account.IBAN, 4) == 4
+
+        assert get_shard_balances(storage, bank_account.IBAN) == [0.0] * 4
+
+    def test_default_shard_count(self, app, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        assert bank_account_repository.promote_to_hot(bank_account.IBAN) == int(app.config['HOT_ACCOUNT_SHARDS'])
+
+    def test_resharding_keeps_balance(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        bank_account_repository.promote_to_hot(bank_account.IBAN, 4)
+        bank_account_repository.update_balance_by_amount(bank_account.IBAN, 20)
+
+        bank_account_repository.promote_to_hot(bank_account.IBAN, 2)
+
+        assert get_balances(storage, bank_account.IBAN) == (120.0, 120.0)
+        assert get_shard_balances(storage, bank_account.IBAN) == [0.0] * 2
+
+    def test_for_nonexistent_bank_account(self, bank_account_repository):
+        with pytest.raises(DoesNotExistException):
+            bank_account_repository.promote_to_hot('NonexistentIBAN', 4)
+
+
+class TestShardedUpdate:
+    def test_update_goes_to_shard(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        bank_account_repository.promote_to_hot(bank_account.IBAN, 4)
+
+        for _ in range(10):
+            bank_account_repository.update_balance_by_amount(bank_account.IBAN, 2)
+
+        assert sum(get_shard_balances(storage, bank_account.IBAN)) == 20.0
+        assert get_balances(storage, bank_account.IBAN) == (100.0, 120.0)
+        assert bank_account_repository.get_by_iban(bank_account.IBAN).balance == 120.0
+
+    def test_stale_cache_falls_back_to_balance(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        bank_account_repository.promote_to_hot(bank_account.IBAN, 4)
+        storage.session.query(BalanceShard).filter_by(iban=bank_account.IBAN).delete()
+
+        bank_account_repository.update_balance_by_amount(bank_account.IBAN, 20)
+
+        assert get_balances(storage, bank_account.IBAN) == (120.0, 120.0)
+
+    def test_transfer_sees_shards(self, bank_account_repository, storage):
+        source = bank_account_repository.create({'currency': 'BYN', 'balance': 0}, MockUUID)
+        target = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        bank_account_repository.promote_to_hot(source.IBAN, 4)
+        bank_account_repository.update_balance_by_amount(source.IBAN, 50)
+
+        balances = bank_account_repository.transfer(source.IBAN, target.IBAN, 30)
+
+        assert balances == {source.IBAN: 20.0, target.IBAN: 130.0}
+
+
+class TestDemoteFromHot:
+    def test_shards_folded(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        bank_account_repository.promote_to_hot(bank_account.IBAN, 4)
+        bank_account_repository.update_balance_by_amount(bank_account.IBAN, 20)
+        bank_account_repository.update_balance_by_amount(bank_account.IBAN, -5)
+
+        bank_account_repository.demote_from_hot(bank_account.IBAN)
+
+        assert get_shard_balances(storage, bank_account.IBAN) == []
+        assert get_balances(storage, bank_account.IBAN) == (115.0, 115.0)
+
+        bank_account_repository.update_balance_by_amount(bank_account.IBAN, 5)
+
+        assert get_balances(storage, bank_account.IBAN) == (120.0, 120.0)
+
+    def test_for_regular_bank_account(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        bank_account_repository.demote_from_hot(bank_account.IBAN)
+
+        assert get_balances(storage, bank_account.IBAN) == (100.0, 100.0)
+
+    def test_for_nonexistent_bank_account(self, bank_account_repository):
+        with pytest.raises(DoesNotExistException):
+            bank_account_repository.demote_from_hot('NonexistentIBAN')
@@ -1,6 +1,7 @@
 import pytest
 
-from app.exceptions import DoesNotExistException, AlreadyExistException
+from app.exceptions import (AlreadyExistException, DoesNotExistException, InsufficientFundsException,
+                            ValidationException)
 from app.models.sqlalchemy.bank_account import BankAccount
 from app.models.sqlalchemy.many_to_many import AssociationBankAccountCustomer
 
@@ -214,3 +215,71 @@ class TestAssignToCustomer:
             bank_account_repository.assign_to_customer('NonexistentIBAN', MockUUID2)
 
         assert exception_info.value.message == 'BankAccount does not exist!'
+
+
+class TestTransfer:
+    def test_transfer(self, bank_account_repository, storage):
+        source = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID2)
+
+        balances = bank_account_repository.transfer(source.IBAN, target.IBAN, 30)
+
+        assert balances == {source.IBAN: 70.0, target.IBAN: 130.0}
+
+        assert storage.session.query(BankAccount).filter_by(IBAN=source.IBAN).first().balance == 70.0
+        assert storage.session.query(BankAccount).filter_by(IBAN=target.IBAN).first().balance == 130.0
+
+    def test_whole_balance(self, bank_account_repository):
+        source = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID2)
+
+        balances = bank_account_repository.transfer(source.IBAN, target.IBAN, 100)
+
+        assert balances[source.IBAN] == 0.0
+
+    def test_insufficient_funds(self, bank_account_repository, storage):
+        source = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID2)
+
+        with pytest.raises(InsufficientFundsException) as exception_info:
+            bank_account_repository.transfer(source.IBAN, target.IBAN, 100.01)
+
+        assert exception_info.value.message == 'Insufficient funds!'
+
+        assert storage.session.query(BankAccount).filter_by(IBAN=source.IBAN).first().balance == 100.0
+        assert storage.session.query(BankAccount).filter_by(IBAN=target.IBAN).first().balance == 100.0
+
+    def test_different_currencies(self, bank_account_repository, storage):
+        source = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = bank_account_repository.create(dict(BANK_ACCOUNT_DATA, currency='USD'), MockUUID2)
+
+        with pytest.raises(ValidationException) as exception_info:
+            bank_account_repository.transfer(source.IBAN, target.IBAN, 10)
+
+        assert exception_info.value.message == 'Currencies of bank accounts do not match!'
+
+        assert storage.session.query(BankAccount).filter_by(IBAN=source.IBAN).first().balance == 100.0
+
+    @pytest.mark.parametrize('nonexistent_side', ('source', 'target'))
+    def test_nonexistent_bank_account(self, bank_account_repository, storage, nonexistent_side):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        ibans = [bank_account.IBAN, 'NonexistentIBAN']
+        if nonexistent_side == 'source':
+            ibans.reverse()
+
+        with pytest.raises(DoesNotExistException) as exception_info:
+            bank_account_repository.transfer(*ibans, 10)
+
+        assert exception_info.value.message == 'BankAccount does not exist!'
+
+        assert storage.session.query(BankAccount).filter_by(IBAN=bank_account.IBAN).first().balance == 100.0
+
+    def test_single_statement(self, bank_account_repository, statements):
+        source = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID2)
+        statements.clear()
+
+        bank_account_repository.transfer(source.IBAN, target.IBAN, 10)
+
+        assert len(statements) == 1
+        assert 'FOR UPDATE' in statements[0]
@@ -31,6 +31,21 @@ class TestCreate:
         assert bank_card.check_pin(pin)
         assert storage_bank_card.bank_account_iban == bank_account.IBAN
 
+    def test_single_statement(self, bank_card_repository, statements, bank_account):
+        bank_card_repository.create(BANK_CARD_DATA, bank_account.IBAN)
+        statements.clear()
+
+        bank_card_repository.create(BANK_CARD_DATA, bank_account.IBAN)
+
+        assert len(statements) == 1
+        assert statements[0].startswith('INSERT INTO bank_card')
+
+    def test_for_nonexistent_bank_account(self, bank_card_repository):
+        with pytest.raises(DoesNotExistException) as exception_info:
+            bank_card_repository.create(BANK_CARD_DATA, 'NonexistentIBAN')
+
+        assert exception_info.value.message == 'BankAccount does not exist!'
+
 
 class TestGetByCardNumber:
     def test_get_by_card_number(self, bank_card_repository, bank_account, storage):
@@ -1,6 +1,10 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from app.exceptions import AlreadyExistException, DoesNotExistException
+from app.exceptions import AlreadyExistException, DoesNotExistException, PreconditionFailedException
 from app.models.sqlalchemy.customer import Customer
 
 
@@ -41,6 +45,31 @@ class TestCreate:
         assert exception_info.value.message == 'Customer already exist!'
 
 
+class TestImportBatch:
+    def test_import_batch(self, customer_repository, storage):
+        uuid, = customer_repository.import_batch([CUSTOMER_DATA])
+
+        storage_customer = storage.session.query(Customer).filter_by(uuid=uuid).one()
+
+        assert storage_customer.first_name == CUSTOMER_DATA['first_name']
+        assert storage_customer.last_name == CUSTOMER_DATA['last_name']
+        assert storage_customer.email == CUSTOMER_DATA['email']
+        assert storage_customer.passport_number == CUSTOMER_DATA['passport_number']
+        assert storage_customer.version == 1
+
+    def test_for_duplicated_passport_numbers(self, customer_repository):
+        customer_repository.create(CUSTOMER_DATA)
+
+        uuids = customer_repository.import_batch([
+            CUSTOMER_DATA,
+            dict(CUSTOMER_DATA, passport_number='HB1111112'),
+            dict(CUSTOMER_DATA, passport_number='HB1111112', first_name='Jane'),
+        ])
+
+        assert uuids[0] is None and uuids[2] is None
+        assert customer_repository.get_by_uuid(uuids[1]).first_name == CUSTOMER_DATA['first_name']
+
+
 class TestIsExists:
     def test_is_exists_true(self, customer_repository):
         customer = customer_repository.create(CUSTOMER_DATA)
@@ -101,6 +130,26 @@ class TestUpdate:
 
         assert exception_info.value.message == 'Customer already exist!'
 
+    def test_version_bumped(self, customer_repository):
+        customer = customer_repository.create(CUSTOMER_DATA)
+
+        assert customer.version == 1
+        assert customer_repository.update(customer.uuid, {'first_name': 'Bob'}) == 2
+        assert customer_repository.get_version(customer.uuid) == 2
+
+    def test_expected_version(self, customer_repository):
+        customer = customer_repository.create(CUSTOMER_DATA)
+
+        assert customer_repository.update(customer.uuid, {'first_name': 'Bob'}, expected_versions=[1]) == 2
+
+        with pytest.raises(PreconditionFailedException):
+            customer_repository.update(customer.uuid, {'first_name': 'Tom'}, expected_versions=[1])
+
+        assert customer_repository.get_by_uuid(customer.uuid).first_name == 'Bob'
+
+    def test_for_nonexistent_customer(self, customer_repository):
+        assert customer_repository.update('NonexistentUUID', {'first_name': 'Bob'}, expected_versions=[1]) is None
+
 
 class TestDelete:
     def test_delete(self, customer_repository, storage):
@@ -120,6 +169,61 @@ class TestDelete:
         assert not is_deleted
 
 
+class TestGetPage:
+    def test_get_page(self, customer_repository):
+        uuids = sorted(customer_repository.bulk_create([
+            dict(CUSTOMER_DATA, passport_number=f'HB111111{index}', last_name='Paged') for index in range(3)
+        ]))
+
+        first_page = customer_repository.get_page(2, last_name='Paged')
+        second_page = customer_repository.get_page(2, after_uuid=uuids[1], last_name='Paged')
+
+        assert [customer.uuid for customer in first_page] == uuids[:2]
+        assert [customer.uuid for customer in second_page] == uuids[2:]
+
+    def test_filters(self, customer_repository):
+        customer = customer_repository.create(dict(CUSTOMER_DATA, email='paged@gmail.com'))
+        customer_repository.create(dict(CUSTOMER_DATA, passport_number='HB1111112', email='other@gmail.com'))
+
+        assert customer_repository.get_page(10, email='paged@gmail.com') == [
+            customer_repository.get_by_uuid(customer.uuid)
+        ]
+        assert customer_repository.get_page(10, last_name='Miller') == []
+
+    def test_fields(self, customer_repository, statements):
+        customer = customer_repository.create(dict(CUSTOMER_DATA, last_name='Paged'))
+        statements.clear()
+
+        page = customer_repository.get_page(10, last_name='Paged', fields=['email'])
+
+        assert page == [(customer.uuid, None, None, None, CUSTOMER_DATA['email'], None)]
+        assert statements[0].startswith('SELECT customer.uuid, customer.email \nFROM customer')
+
+
+class TestGetMany:
+    def test_get_many(self, customer_repository, statements):
+        uuids = customer_repository.bulk_create([
+            dict(CUSTOMER_DATA, passport_number=f'HB111111{index}') for index in range(3)
+        ])
+        statements.clear()
+
+        customers = customer_repository.get_many(uuids + ['NonexistentUUID', uuids[0]])
+
+        assert len(statements) == 1
+        assert set(customers) == set(uuids)
+        assert customers[uuids[1]] == customer_repository.get_by_uuid(uuids[1])
+
+    def test_for_nonexistent_customers(self, customer_repository):
+        assert customer_repository.get_many(['NonexistentUUID']) == {}
+
+    def test_fields(self, customer_repository):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+
+        customer = customer_repository.get_many([uuid], ['first_name'])[uuid]
+
+        assert (customer.uuid, customer.first_name, customer.email) == (uuid, CUSTOMER_DATA['first_name'], None)
+
+
 class TestGetByUUID:
     def test_get_by_uuid(self, customer_repository, storage):
         customer = customer_repository.create(CUSTOMER_DATA)
@@ -140,3 +244,66 @@ class TestGetByUUID:
             customer_repository.get_by_uuid('NonexistentUUID')
 
         assert exception_info.value.message == 'Customer does not exist!'
+
+    def test_cached(self, customer_repository, statements):
+        customer = customer_repository.create(CUSTOMER_DATA)
+        statements.clear()
+
+        first = customer_repository.get_by_uuid(customer.uuid)
+        second = customer_repository.get_by_uuid(customer.uuid)
+
+        assert first is second
+        assert len(statements) == 1
+        assert customer_repository.cache_stats['hits'] == 1
+
+    def test_invalidated_by_update(self, customer_repository):
+        customer = customer_repository.create(CUSTOMER_DATA)
+        customer_repository.get_by_uuid(customer.uuid)
+
+        customer_repository.update(customer.uuid, {'first_name': 'Jane'})
+
+        assert customer_repository.get_by_uuid(customer.uuid).first_name == 'Jane'
+
+    def test_invalidated_by_delete(self, customer_repository):
+        customer = customer_repository.create(CUSTOMER_DATA)
+        customer_repository.get_by_uuid(customer.uuid)
+
+        customer_repository.delete(customer.uuid)
+
+        with pytest.raises(DoesNotExistException):
+            customer_repository.get_by_uuid(customer.uuid)
+
+    def test_uncommitted_read_dropped_on_rollback(self, customer_repository, unit_of_work):
+        customer = customer_repository.create(CUSTOMER_DATA)
+
+        with pytest.raises(RuntimeError):
+            with unit_of_work:
+                customer_repository.update(customer.uuid, {'first_name': 'Jane'})
+                assert customer_repository.get_by_uuid(customer.uuid).first_name == 'Jane'
+                raise RuntimeError
+
+        assert customer_repository.get_by_uuid(customer.uuid).first_name == CUSTOMER_DATA['first_name']
+
+    def test_concurrent_reads_coalesced(self, customer_repository, monkeypatch):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+        snapshot = customer_repository._load_snapshot(uuid)
+        release = threading.Event()
+        loads = []
+
+        def slow_load(key):
+            loads.append(key)
+            release.wait()
+            return snapshot
+
+        monkeypatch.setattr(customer_repository, '_load_snapshot', slow_load)
+
+        with ThreadPoolExecutor(8) as pool:
+            futures = [pool.submit(customer_repository.get_by_uuid, uuid) for _ in range(8)]
+
+            while customer_repository.coalescing_stats['coalesced'] < 7:
+                time.sleep(0.001)
+            release.set()
+
+            assert [future.result() for future in futures] == [snapshot] * 8
+
+        assert loads == [uuid]
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from app.exceptions import DoesNotExistException, InsufficientFundsException, ValidationException
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.ledger import LedgerEntry
+from app.repositories.sqlalchemy.allocators import SequenceIBANAllocator
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.storage.sqlalchemy import SESSION_OPTIONS, UnitOfWork
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+MockUUID = 'MockUUID'
+
+
+@pytest.fixture(scope='function', params=('false', 'true'), ids=('in-place', 'append-only'))
+def repository(request, app, storage, iban_allocator, unit_of_work) -> BankAccountRepository:
+    yield BankAccountRepository(
+        storage=storage,
+        config=dict(app.config, LEDGER_APPEND_ONLY=request.param),
+        iban_allocator=iban_allocator,
+        unit_of_work=unit_of_work
+    )
+
+
+class TestDebit:
+    def test_debit(self, repository, storage):
+        iban = repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        assert repository.debit(iban, 30) == 70.0
+        assert repository.debit(iban, 70) == 0.0
+
+        assert storage.session.query(BankAccount.balance).filter_by(IBAN=iban).scalar() == 0.0
+        assert [amount for amount, in storage.session.query(LedgerEntry.amount).filter_by(iban=iban)] == [-30, -70]
+
+    def test_insufficient_funds(self, repository, storage):
+        iban = repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        with pytest.raises(InsufficientFundsException):
+            repository.debit(iban, 100.5)
+
+        assert storage.session.query(BankAccount.balance).filter_by(IBAN=iban).scalar() == 100.0
+        assert storage.session.query(LedgerEntry).filter_by(iban=iban).count() == 0
+
+    def test_hot_bank_account(self, bank_account_repository):
+        iban = bank_account_repository.create({'currency': 'BYN', 'balance': 0}, MockUUID).IBAN
+        bank_account_repository.promote_to_hot(iban, 4)
+        bank_account_repository.update_balance_by_amount(iban, 50)
+
+        assert bank_account_repository.debit(iban, 20) == 30.0
+
+        with pytest.raises(InsufficientFundsException):
+            bank_account_repository.debit(iban, 31)
+
+    def test_for_nonexistent_bank_account(self, repository):
+        with pytest.raises(DoesNotExistException):
+            repository.debit('NonexistentIBAN', 1)
+
+    def test_non_positive_amount(self, repository):
+        iban = repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        with pytest.raises(ValidationException):
+            repository.debit(iban, 0)
+
+
+@pytest.mark.parametrize('append_only', ('false', 'true'))
+def test_concurrent_debits(app, db, append_only):
+    """Runs on committed data, every thread has its own session and connection"""
+    thread_storage = SimpleNamespace(session=scoped_session(sessionmaker(bind=db.engine, **SESSION_OPTIONS)))
+    repository = BankAccountRepository(
+        storage=thread_storage,
+        config=dict(app.config, LEDGER_APPEND_ONLY=append_only),
+        iban_allocator=SequenceIBANAllocator(storage=thread_storage, config=app.config),
+        unit_of_work=UnitOfWork(storage=thread_storage)
+    )
+    iban = repository.create({'currency': 'BYN', 'balance': 50}, MockUUID).IBAN
+
+    def debit(_) -> bool:
+        try:
+            repository.debit(iban, 1)
+            return True
+        except InsufficientFundsException:
+            thread_storage.session.rollback()
+            return False
+        finally:
+            thread_storage.session.remove()
+
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            succeeded = sum(pool.map(debit, range(80)))
+
+        assert succeeded == 50
+        assert thread_storage.session.query(BankAccount.balance).filter_by(IBAN=iban).scalar() == 0.0
+    finally:
+        repository.bulk_delete([iban])
+        thread_storage.session.remove()
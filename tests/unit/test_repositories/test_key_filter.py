@@ -0,0 +1,172 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.exceptions import DoesNotExistException
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.repositories.sqlalchemy.customer import CustomerRepository
+
+CUSTOMER_DATA = {
+    'first_name': 'John',
+    'last_name': 'Smith',
+    'email': 'jsmith@gmail.com',
+    'passport_number': 'HB1111111',
+}
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+MockUUID = 'MockUUID'
+
+
+@pytest.fixture(scope='function')
+def filter_config(app) -> dict:
+    return dict(app.config, NEGATIVE_LOOKUP_FILTER='true')
+
+
+@pytest.fixture(scope='function')
+def customer_repository(filter_config, storage, unit_of_work) -> CustomerRepository:
+    repository = CustomerRepository(storage=storage, config=filter_config, unit_of_work=unit_of_work)
+    assert repository._keys.wait_until_ready(timeout=5)
+
+    yield repository
+
+    repository._keys.stop()
+
+
+@pytest.fixture(scope='function')
+def bank_account_repository(filter_config, storage, iban_allocator, unit_of_work) -> BankAccountRepository:
+    repository = BankAccountRepository(
+        storage=storage,
+        config=filter_config,
+        iban_allocator=iban_allocator,
+        unit_of_work=unit_of_work
+    )
+    assert repository._keys.wait_until_ready(timeout=5)
+
+    yield repository
+
+    repository._keys.stop()
+
+
+class TestCustomer:
+    def test_missing_answered_without_query(self, customer_repository, statements):
+        with pytest.raises(DoesNotExistException):
+            customer_repository.get_by_uuid('NonexistentUUID')
+
+        assert not customer_repository.is_exists('NonexistentUUID')
+        assert not customer_repository.has_bank_account('NonexistentUUID')
+        assert statements == []
+        assert customer_repository.filter_stats['definite_misses'] == 3
+
+    def test_missing_skipped_by_get_many(self, customer_repository, statements):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+        statements.clear()
+
+        assert list(customer_repository.get_many([uuid, 'NonexistentUUID'])) == [uuid]
+        assert 'NonexistentUUID' not in str(statements)
+        assert customer_repository.get_many(['NonexistentUUID']) == {}
+        assert len(statements) == 1
+
+    def test_created(self, customer_repository):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+
+        assert customer_repository.get_by_uuid(uuid).uuid == uuid
+        assert customer_repository.is_exists(uuid)
+
+    def test_bulk_created(self, customer_repository):
+        uuids = customer_repository.bulk_create([CUSTOMER_DATA])
+
+        assert customer_repository.is_exists(uuids[0])
+
+    def test_deleted(self, customer_repository):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+        customer_repository.delete(uuid)
+
+        with pytest.raises(DoesNotExistException):
+            customer_repository.get_by_uuid(uuid)
+
+        stats = customer_repository.filter_stats
+        assert stats['removed_keys'] == 1
+        assert stats['false_positives'] == 1
+        assert stats['observed_false_positive_rate'] == 1.0
+
+    def test_stats(self, customer_repository):
+        stats = customer_repository.filter_stats
+
+        assert stats['enabled'] and stats['ready']
+        assert stats['memory'] > 0
+        assert stats['expected_false_positive_rate'] < 0.01
+
+
+class TestBankAccount:
+    def test_missing_answered_without_query(self, bank_account_repository, statements):
+        with pytest.raises(DoesNotExistException):
+            bank_account_repository.get_by_iban('NonexistentIBAN')
+
+        assert not bank_account_repository.is_exists('NonexistentIBAN')
+        assert statements == []
+
+    def test_created(self, bank_account_repository):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+        ibans = bank_account_repository.bulk_create([BANK_ACCOUNT_DATA], [MockUUID])
+
+        assert bank_account_repository.get_by_iban(iban).IBAN == iban
+        assert bank_account_repository.is_exists(ibans[0])
+
+
+def notify_created(db, uuid: str):
+    # Notification committed by another connection stands for customer created by another worker
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(select(func.pg_notify('customer_created', uuid)))
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def test_created_by_other_process(customer_repository, db):
+    notify_created(db, 'OtherUUID')
+
+    assert wait_for(lambda: customer_repository._keys.might_contain('OtherUUID'))
+
+
+def test_created_by_other_process_during_rebuild(customer_repository, db, monkeypatch):
+    keys = customer_repository._keys
+    rebuilding, released = threading.Event(), threading.Event()
+    build = keys._build
+
+    def slow_build(engine, cancelled):
+        rebuilding.set()
+        released.wait(5)
+        build(engine, cancelled)
+
+    monkeypatch.setattr(keys, '_build', slow_build)
+    built_at = keys._built_at
+    keys._refresh_interval = 0
+    assert rebuilding.wait(5)
+    # Key is only announced, the table doesn't have it, so the following rebuilds would drop it
+    keys._refresh_interval = 3600
+
+    notify_created(db, 'OtherUUID')
+
+    # Added to the current filter while the new one is being built, and copied into the new one
+    assert wait_for(lambda: keys.might_contain('OtherUUID'))
+    released.set()
+    assert wait_for(lambda: keys._built_at != built_at)
+    assert keys.might_contain('OtherUUID')
+
+
+def test_disabled(app, storage, unit_of_work):
+    repository = CustomerRepository(storage=storage, config=app.config, unit_of_work=unit_of_work)
+
+    assert repository.filter_stats == {'enabled': False}
+    assert not repository.is_exists('NonexistentUUID')
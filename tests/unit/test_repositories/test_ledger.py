@@ -0,0 +1,203 @@
+import pytest
+
+from app.exceptions import InsufficientFundsException
+from app.models.sqlalchemy.bank_account import BankAccount
+from app.models.sqlalchemy.ledger import BalanceSnapshot, LedgerEntry
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+MockUUID = 'MockUUID'
+
+
+@pytest.fixture(scope='function')
+def append_only_repository(app, storage, iban_allocator, unit_of_work) -> BankAccountRepository:
+    repository = BankAccountRepository(
+        storage=storage,
+        config=dict(app.config, LEDGER_APPEND_ONLY='true'),
+        iban_allocator=iban_allocator,
+        unit_of_work=unit_of_work
+    )
+
+    yield repository
+
+
+def get_balances(storage, iban: str) -> tuple[float, float]:
+    return storage.session.query(
+        BankAccount.compacted_balance, BankAccount.balance
+    ).filter_by(IBAN=iban).one()
+
+
+class TestUpdateByAmount:
+    def test_entry_recorded(self, bank_account_repository, storage):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        bank_account_repository.update_balance_by_amount(bank_account.IBAN, 20)
+
+        entry = storage.session.query(LedgerEntry).filter_by(iban=bank_account.IBAN).one()
+
+        assert entry.amount == 20
+        assert entry.compacted
+        assert get_balances(storage, bank_account.IBAN) == (120.0, 120.0)
+
+    def test_append_only(self, append_only_repository, storage):
+        bank_account = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        append_only_repository.update_balance_by_amount(bank_account.IBAN, 20)
+        append_only_repository.update_balance_by_amount(bank_account.IBAN, -5)
+
+        assert get_balances(storage, bank_account.IBAN) == (100.0, 115.0)
+        assert bank_account.balance == 115.0
+
+    def test_append_only_nonexistent_bank_account(self, append_only_repository, storage):
+        assert not append_only_repository.update_balance_by_amount('NonexistentIBAN', 20)
+
+        assert storage.session.query(LedgerEntry).filter_by(iban='NonexistentIBAN').first() is None
+
+
+class TestAppendOnlyTransfer:
+    def test_transfer(self, append_only_repository, storage):
+        source = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        balances = append_only_repository.transfer(source.IBAN, target.IBAN, 30)
+
+        assert balances == {source.IBAN: 70.0, target.IBAN: 130.0}
+        assert get_balances(storage, source.IBAN) == (100.0, 70.0)
+        assert get_balances(storage, target.IBAN) == (100.0, 130.0)
+
+    def test_funds_include_appended_entries(self, append_only_repository, storage):
+        source = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        append_only_repository.update_balance_by_amount(source.IBAN, -80)
+
+        with pytest.raises(InsufficientFundsException) as exception_info:
+            append_only_repository.transfer(source.IBAN, target.IBAN, 30)
+
+        assert exception_info.value.message == 'Insufficient funds!'
+        assert get_balances(storage, source.IBAN) == (100.0, 20.0)
+
+
+class TestApplyBalanceDeltas:
+    def test_deltas_aggregated(self, bank_account_repository, storage):
+        first, second = [bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN for _ in range(2)]
+
+        missing_ibans = bank_account_repository.apply_balance_deltas([
+            (first, 10), (second, -20), (first, 5.5),
+        ])
+
+        assert missing_ibans == []
+        assert get_balances(storage, first) == (115.5, 115.5)
+        assert get_balances(storage, second) == (80.0, 80.0)
+
+        entries = storage.session.query(LedgerEntry.iban, LedgerEntry.amount, LedgerEntry.compacted).filter(
+            LedgerEntry.iban.in_([first, second])
+        ).order_by(LedgerEntry.iban).all()
+        assert sorted(entries) == sorted([(first, 15.5, True), (second, -20.0, True)])
+
+    def test_chunks(self, app, storage, iban_allocator, unit_of_work):
+        repository = BankAccountRepository(
+            storage=storage,
+            config=dict(app.config, BALANCE_BATCH_CHUNK_SIZE=2),
+            iban_allocator=iban_allocator,
+            unit_of_work=unit_of_work
+        )
+        ibans = [repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN for _ in range(5)]
+
+        assert repository.apply_balance_deltas([(iban, 1) for iban in ibans] + [('NonexistentIBAN', 1)]) == [
+            'NonexistentIBAN'
+        ]
+
+        for iban in ibans:
+            assert get_balances(storage, iban) == (101.0, 101.0)
+
+    def test_missing_ibans_reported(self, bank_account_repository, storage):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        missing_ibans = bank_account_repository.apply_balance_deltas([
+            ('NonexistentIBAN2', 1), (iban, 1), ('NonexistentIBAN1', 1),
+        ])
+
+        assert missing_ibans == ['NonexistentIBAN1', 'NonexistentIBAN2']
+        assert get_balances(storage, iban) == (101.0, 101.0)
+
+    def test_loaded_bank_account_refreshed(self, bank_account_repository):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        bank_account_repository.apply_balance_deltas([(bank_account.IBAN, 1)])
+
+        assert bank_account.balance == 101.0
+
+    def test_append_only(self, append_only_repository, storage):
+        iban = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+
+        missing_ibans = append_only_repository.apply_balance_deltas([(iban, 10), ('NonexistentIBAN', 1)])
+
+        assert missing_ibans == ['NonexistentIBAN']
+        assert get_balances(storage, iban) == (100.0, 110.0)
+        assert append_only_repository.get_by_iban(iban).balance == 110.0
+        assert not storage.session.query(LedgerEntry).filter_by(iban=iban).one().compacted
+
+    def test_flushed_segments_recorded(self, bank_account_repository):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+        bank_account_repository.apply_balance_deltas([(iban, 1)], ['1-first', '1-second'])
+
+        bank_account_repository.apply_balance_deltas([(iban, 1)], ['1-third'], ['1-first'])
+
+        assert bank_account_repository.get_flushed_segments(['1-first', '1-second', '1-third', '1-fourth']) == {
+            '1-second', '1-third'
+        }
+
+
+class TestCompactLedger:
+    def test_compaction(self, append_only_repository, storage):
+        source = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        target = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        untouched = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+
+        append_only_repository.update_balance_by_amount(source.IBAN, 20)
+        append_only_repository.transfer(source.IBAN, target.IBAN, 50)
+
+        assert append_only_repository.compact_ledger() == 2
+
+        assert get_balances(storage, source.IBAN) == (70.0, 70.0)
+        assert get_balances(storage, target.IBAN) == (150.0, 150.0)
+        assert get_balances(storage, untouched.IBAN) == (100.0, 100.0)
+
+        assert storage.session.query(LedgerEntry).filter_by(compacted=False).count() == 0
+        assert {
+            (snapshot.iban, snapshot.balance) for snapshot in storage.session.query(BalanceSnapshot).all()
+        } == {(source.IBAN, 70.0), (target.IBAN, 150.0)}
+
+    def test_nothing_to_compact(self, append_only_repository):
+        append_only_repository.compact_ledger()
+
+        assert append_only_repository.compact_ledger() == 0
+
+    def test_entries_kept(self, append_only_repository):
+        bank_account = append_only_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        append_only_repository.update_balance_by_amount(bank_account.IBAN, 20)
+
+        append_only_repository.compact_ledger()
+
+        assert len(append_only_repository.get_ledger_entries(bank_account.IBAN, 10)) == 1
+
+
+class TestGetLedgerEntries:
+    def test_pages(self, bank_account_repository):
+        bank_account = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID)
+        for amount in range(1, 6):
+            bank_account_repository.update_balance_by_amount(bank_account.IBAN, amount)
+
+        first_page = bank_account_repository.get_ledger_entries(bank_account.IBAN, 3)
+        second_page = bank_account_repository.get_ledger_entries(bank_account.IBAN, 3, first_page[-1].entry_id)
+
+        assert [entry.amount for entry in first_page] == [5, 4, 3]
+        assert [entry.amount for entry in second_page] == [2, 1]
+
+    def test_for_nonexistent_bank_account(self, bank_account_repository):
+        assert bank_account_repository.get_ledger_entries('NonexistentIBAN', 10) == []
@@ -0,0 +1,107 @@
+import pytest
+
+from app.exceptions import DoesNotExistException
+from app.repositories.sqlalchemy.bank_account import BankAccountRepository
+from app.repositories.sqlalchemy.customer import CustomerRepository
+from app.utils.shared_cache import SharedCache
+
+CUSTOMER_DATA = {
+    'first_name': 'John',
+    'last_name': 'Smith',
+    'email': 'jsmith@gmail.com',
+    'passport_number': 'HB1111111',
+}
+
+BANK_ACCOUNT_DATA = {
+    'currency': 'BYN',
+    'balance': 100
+}
+
+MockUUID = 'MockUUID'
+
+
+@pytest.fixture(scope='function')
+def shared_cache(tmp_path) -> SharedCache:
+    yield SharedCache(path=str(tmp_path / 'shared.cache'), size=1024 * 1024, slot_size=256, ttl=60)
+
+
+@pytest.fixture(scope='function')
+def other_worker(tmp_path, app, storage, unit_of_work) -> CustomerRepository:
+    """Repository of another process, it has its own in-process cache and maps the same file"""
+    shared_cache = SharedCache(path=str(tmp_path / 'shared.cache'), size=1024 * 1024, slot_size=256, ttl=60)
+
+    yield CustomerRepository(storage=storage, config=app.config, unit_of_work=unit_of_work, shared_cache=shared_cache)
+
+
+@pytest.fixture(scope='function')
+def customer_repository(app, storage, unit_of_work, shared_cache) -> CustomerRepository:
+    yield CustomerRepository(storage=storage, config=app.config, unit_of_work=unit_of_work, shared_cache=shared_cache)
+
+
+@pytest.fixture(scope='function')
+def bank_account_repository(app, storage, iban_allocator, unit_of_work, shared_cache) -> BankAccountRepository:
+    yield BankAccountRepository(
+        storage=storage,
+        config=app.config,
+        iban_allocator=iban_allocator,
+        unit_of_work=unit_of_work,
+        shared_cache=shared_cache
+    )
+
+
+class TestCustomer:
+    def test_loaded_by_other_worker(self, customer_repository, other_worker, statements):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+        customer = customer_repository.get_by_uuid(uuid)
+        statements.clear()
+
+        assert other_worker.get_by_uuid(uuid) == customer
+        assert len(statements) == 0
+        assert other_worker.shared_cache_stats['hits'] == 1
+
+    def test_updated_by_other_worker(self, customer_repository, other_worker):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+        customer_repository.get_by_uuid(uuid)
+
+        other_worker.update(uuid, {'first_name': 'Jane'})
+
+        assert customer_repository.get_by_uuid(uuid).first_name == 'Jane'
+
+    def test_deleted_by_other_worker(self, customer_repository, other_worker):
+        uuid = customer_repository.create(CUSTOMER_DATA).uuid
+        customer_repository.get_by_uuid(uuid)
+
+        other_worker.delete(uuid)
+
+        with pytest.raises(DoesNotExistException):
+            customer_repository.get_by_uuid(uuid)
+
+
+class TestBankAccount:
+    def test_cached(self, bank_account_repository, statements):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+        bank_account = bank_account_repository.get_by_iban(iban)
+        statements.clear()
+
+        assert bank_account_repository.get_by_iban(iban) == bank_account
+        assert bank_account.currency.value == 'BYN'
+        assert len(statements) == 0
+
+    def test_invalidated_by_balance_change(self, bank_account_repository):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+        bank_account_repository.get_by_iban(iban)
+
+        bank_account_repository.update_balance_by_amount(iban, 20)
+        assert bank_account_repository.get_by_iban(iban).balance == 120.0
+
+        bank_account_repository.debit(iban, 50)
+        assert bank_account_repository.get_by_iban(iban).balance == 70.0
+
+    def test_invalidated_by_delete(self, bank_account_repository):
+        iban = bank_account_repository.create(BANK_ACCOUNT_DATA, MockUUID).IBAN
+        bank_account_repository.get_by_iban(iban)
+
+        bank_account_repository.delete(iban)
+
+        with pytest.raises(DoesNotExistException):
+            bank_account_repository.get_by_iban(iban)
@@ -0,0 +1,55 @@
+import pytest
+
+from app.models.sqlalchemy.customer import Customer
+
+
+CUSTOMER_DATA = {
+    'first_name': 'John',
+    'last_name': 'Smith',
+    'email': 'jsmith@gmail.com',
+    'passport_number': 'HB1111111',
+}
+
+
+@pytest.fixture(scope='function')
+def commits(storage, monkeypatch):
+    commits = []
+    commit = storage.session.commit
+    monkeypatch.setattr(storage.session, 'commit', lambda: commits.append(commit()))
+
+    yield commits
+
+
+def test_commit_outside_unit_of_work(customer_repository, commits):
+    customer_repository.create(CUSTOMER_DATA)
+
+    assert len(commits) == 1
+
+
+def test_single_commit_for_nested_blocks(unit_of_work, customer_repository, commits):
+    with unit_of_work:
+        with unit_of_work:
+            customer_repository.create(CUSTOMER_DATA)
+
+        customer_repository.create(dict(CUSTOMER_DATA, passport_number='HB1111112'))
+
+        assert unit_of_work.is_active
+        assert len(commits) == 0
+
+    assert not unit_of_work.is_active
+    assert len(commits) == 1
+
+
+def test_rollback_on_exception(unit_of_work, customer_repository, storage, commits):
+    with pytest.raises(RuntimeError):
+        with unit_of_work:
+            customer_repository.create(CUSTOMER_DATA)
+
+            raise RuntimeError()
+
+    assert len(commits) == 0
+    assert not unit_of_work.is_active
+
+    assert storage.session.query(
+        Customer
+    ).filter_by(passport_number=CUSTOMER_DATA['passport_number']).first() is None
@@ -0,0 +1,33 @@
+from app.utils.bloom_filter import BloomFilter
+
+
+def test_added_keys_contained():
+    bloom_filter = BloomFilter(capacity=1000, false_positive_rate=0.01)
+    keys = [f'key-{i}' for i in range(1000)]
+
+    for key in keys:
+        bloom_filter.add(key)
+
+    assert all(key in bloom_filter for key in keys)
+    assert len(bloom_filter) == 1000
+
+
+def test_false_positive_rate():
+    bloom_filter = BloomFilter(capacity=1000, false_positive_rate=0.01)
+
+    for i in range(1000):
+        bloom_filter.add(f'key-{i}')
+
+    false_positives = sum(f'missing-{i}' in bloom_filter for i in range(10000))
+
+    assert false_positives < 300
+    assert 0.005 < bloom_filter.false_positive_rate < 0.015
+
+
+def test_size():
+    bloom_filter = BloomFilter(capacity=1000, false_positive_rate=0.01)
+
+    # About 9.6 bits and 7 hash functions per key are needed for 1% of false positives
+    assert bloom_filter.memory == 1199
+    assert bloom_filter.hash_count == 7
+    assert bloom_filter.false_positive_rate == 0.0
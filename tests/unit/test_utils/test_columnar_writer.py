@@ -0,0 +1,35 @@
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+import pytest
+
+from app.utils.columnar_writer import ColumnarWriter
+
+SCHEMA = pyarrow.schema([('iban', pyarrow.string()), ('balance', pyarrow.float64())])
+ROWS = [('BY00000000000000000000000001', 10.0), ('BY00000000000000000000000002', 0.5)]
+
+
+@pytest.mark.parametrize('file_format, read_table', (
+        ('parquet', pyarrow.parquet.read_table),
+        ('arrow', lambda path: pyarrow.ipc.open_file(pyarrow.memory_map(str(path))).read_all()),
+))
+def test_write_rows(tmp_path, file_format, read_table):
+    path = tmp_path / f'part.{file_format}'
+
+    with ColumnarWriter(str(path), SCHEMA, file_format) as writer:
+        writer.write_rows(ROWS[:1])
+        writer.write_rows([])
+        writer.write_rows(ROWS[1:])
+
+    assert writer.rows == 2
+    assert read_table(path).to_pylist() == [{'iban': iban, 'balance': balance} for iban, balance in ROWS]
+
+
+def test_write_no_rows(tmp_path):
+    path = tmp_path / 'part.parquet'
+
+    with ColumnarWriter(str(path), SCHEMA, 'parquet') as writer:
+        pass
+
+    assert writer.rows == 0
+    assert pyarrow.parquet.read_table(path).schema == SCHEMA
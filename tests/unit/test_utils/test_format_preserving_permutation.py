@@ -0,0 +1,30 @@
+import pytest
+
+from app.utils.format_preserving_permutation import FeistelPermutation
+
+
+@pytest.mark.parametrize('domain_size', (2, 10, 97, 1000, 4096))
+def test_is_bijection(domain_size):
+    permutation = FeistelPermutation(domain_size, b'key')
+
+    assert sorted(permutation.permute(value) for value in range(domain_size)) == list(range(domain_size))
+
+
+def test_inverse():
+    permutation = FeistelPermutation(10 ** 20, b'key')
+
+    for value in (0, 1, 12345, 10 ** 20 - 1):
+        assert permutation.inverse(permutation.permute(value)) == value
+
+
+def test_depends_on_key():
+    first_permutation = FeistelPermutation(10 ** 20, b'first key')
+    second_permutation = FeistelPermutation(10 ** 20, b'second key')
+
+    assert [first_permutation.permute(value) for value in range(10)] != \
+        [second_permutation.permute(value) for value in range(10)]
+
+
+def test_out_of_domain():
+    with pytest.raises(ValueError):
+        FeistelPermutation(10, b'key').permute(10)
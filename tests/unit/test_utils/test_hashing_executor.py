@@ -0,0 +1,33 @@
+import operator
+
+import pytest
+
+from app.utils.hashing_executor import HashingExecutor
+
+
+@pytest.mark.parametrize('pool_size', (0, 1))
+def test_submit(pool_size):
+    executor = HashingExecutor(pool_size)
+
+    try:
+        assert executor.submit(operator.add, 2, 3).result() == 5
+    finally:
+        executor.shutdown()
+
+
+def test_pool_is_reused(hashing_executor):
+    hashing_executor.submit(operator.add, 2, 3).result()
+    pool = hashing_executor._get_pool()
+
+    hashing_executor.submit(operator.add, 2, 3).result()
+
+    assert hashing_executor._get_pool() is pool
+
+
+def test_inline_exception():
+    future = HashingExecutor(0).submit(operator.add, 2, None)
+
+    assert future.done()
+
+    with pytest.raises(TypeError):
+        future.result()
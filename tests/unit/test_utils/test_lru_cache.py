@@ -0,0 +1,73 @@
+import time
+
+from app.utils.lru_cache import LRUCache
+
+
+def fixed_size(key, value) -> int:
+    return 10
+
+
+def test_get_and_put():
+    cache = LRUCache(max_memory=100, ttl=60, sizeof=fixed_size)
+
+    assert cache.get('A') is None
+    assert cache.put('A', ('a',), cache.token())
+    assert cache.get('A') == ('a',)
+
+    stats = cache.stats
+    assert stats['average_latency_us'] > 0
+    assert dict(stats, average_latency_us=None) == {
+        'entries': 1, 'memory': 10, 'max_memory': 100, 'hits': 1, 'misses': 1, 'evictions': 0, 'expirations': 0,
+        'hit_rate': 0.5, 'average_latency_us': None,
+    }
+
+
+def test_least_recently_used_evicted():
+    cache = LRUCache(max_memory=30, ttl=60, sizeof=fixed_size)
+
+    for key in 'ABC':
+        cache.put(key, key, cache.token())
+    cache.get('A')
+    cache.put('D', 'D', cache.token())
+
+    assert cache.get('B') is None
+    assert [cache.get(key) for key in 'ACD'] == ['A', 'C', 'D']
+    assert cache.stats['evictions'] == 1
+
+
+def test_expired():
+    cache = LRUCache(max_memory=100, ttl=0.01, sizeof=fixed_size)
+    cache.put('A', 'a', cache.token())
+
+    time.sleep(0.02)
+
+    assert cache.get('A') is None
+    assert cache.stats['expirations'] == 1
+    assert cache.stats['memory'] == 0
+
+
+def test_invalidate():
+    cache = LRUCache(max_memory=100, ttl=60, sizeof=fixed_size)
+    cache.put('A', 'a', cache.token())
+
+    cache.invalidate('A')
+
+    assert cache.get('A') is None
+    assert cache.stats['memory'] == 0
+
+
+def test_value_loaded_before_invalidation_dropped():
+    cache = LRUCache(max_memory=100, ttl=60, sizeof=fixed_size)
+    token = cache.token()
+
+    cache.invalidate('A')
+
+    assert not cache.put('A', 'stale', token)
+    assert cache.get('A') is None
+
+
+def test_value_larger_than_cache_dropped():
+    cache = LRUCache(max_memory=5, ttl=60, sizeof=fixed_size)
+
+    assert not cache.put('A', 'a', cache.token())
+    assert cache.stats['entries'] == 0
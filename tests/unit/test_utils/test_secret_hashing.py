@@ -0,0 +1,79 @@
+import pytest
+
+from app.utils.hashing_executor import HashingExecutor
+from app.utils.secret_hashing import HMACSHA256HashingScheme, SecretHasher, WerkzeugHashingScheme
+from config import validate_config
+
+CARD_NUMBER = '4255650000000001'
+
+
+@pytest.mark.parametrize('scheme', (HMACSHA256HashingScheme(b'pepper'), WerkzeugHashingScheme()))
+def test_check(scheme):
+    stored_hash = scheme.generate('1234', CARD_NUMBER.encode())
+
+    assert scheme.identifies(stored_hash)
+    assert scheme.check(stored_hash, '1234', CARD_NUMBER.encode())
+    assert not scheme.check(stored_hash, '4321', CARD_NUMBER.encode())
+
+
+def test_hmac_is_compact():
+    assert len(HMACSHA256HashingScheme(b'pepper').generate('1234', CARD_NUMBER.encode())) == 33
+
+
+def test_hmac_depends_on_context():
+    scheme = HMACSHA256HashingScheme(b'pepper')
+
+    assert scheme.generate('1234', b'4255650000000001') != scheme.generate('1234', b'4255650000000019')
+
+
+def test_hmac_depends_on_pepper():
+    assert HMACSHA256HashingScheme(b'first pepper').generate('1234', CARD_NUMBER.encode()) != \
+        HMACSHA256HashingScheme(b'second pepper').generate('1234', CARD_NUMBER.encode())
+
+
+def test_schemes_tell_hashes_apart():
+    hmac_hash = HMACSHA256HashingScheme(b'pepper').generate('1234', CARD_NUMBER.encode())
+    werkzeug_hash = WerkzeugHashingScheme().generate('1234', CARD_NUMBER.encode())
+
+    assert not WerkzeugHashingScheme().identifies(hmac_hash)
+    assert not HMACSHA256HashingScheme(b'pepper').identifies(werkzeug_hash)
+
+
+class TestSecretHasher:
+    @staticmethod
+    def make_hasher(app, scheme: str) -> SecretHasher:
+        return SecretHasher(dict(app.config, PIN_HASH_SCHEME=scheme), HashingExecutor(0))
+
+    def test_checks_legacy_hash(self, app):
+        legacy_hash = self.make_hasher(app, 'werkzeug').generate_hash('1234', CARD_NUMBER).result()
+        hasher = self.make_hasher(app, 'hmac-sha256')
+
+        assert hasher.check_hash(legacy_hash, '1234', CARD_NUMBER).result()
+        assert hasher.needs_rehash(legacy_hash)
+
+    def test_configured_scheme_hash(self, app):
+        hasher = self.make_hasher(app, 'hmac-sha256')
+        stored_hash = hasher.generate_hash('1234', CARD_NUMBER).result()
+
+        assert stored_hash.startswith(HMACSHA256HashingScheme.TAG)
+        assert not hasher.needs_rehash(stored_hash)
+
+    def test_unknown_scheme(self, app):
+        with pytest.raises(ValueError):
+            self.make_hasher(app, 'hmac-sha256').check_hash(b'\xff' * 33, '1234', CARD_NUMBER)
+
+    @pytest.mark.parametrize('pepper', (None, '', 'secret'))
+    def test_pepper_required(self, app, pepper):
+        config = dict(app.config, SECRET_KEY='secret', PIN_HASH_PEPPER=pepper)
+
+        with pytest.raises(ValueError):
+            validate_config(config)
+        with pytest.raises(ValueError):
+            SecretHasher(config, HashingExecutor(0))
+
+    def test_legacy_scheme_without_pepper(self, app):
+        config = dict(app.config, PIN_HASH_SCHEME='werkzeug', PIN_HASH_PEPPER=None)
+        validate_config(config)
+        hasher = SecretHasher(config, HashingExecutor(0))
+
+        assert hasher.check_hash(hasher.generate_hash('1234', CARD_NUMBER).result(), '1234', CARD_NUMBER).result()
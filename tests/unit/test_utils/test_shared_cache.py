@@ -0,0 +1,105 @@
+import pytest
+
+from app.utils.shared_cache import SLOT_HEADER, SharedCache
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / 'shared.cache')
+
+
+def open_cache(path: str, ttl: float = 60) -> SharedCache:
+    return SharedCache(path=path, size=1024 * 1024, slot_size=128, ttl=ttl)
+
+
+def test_disabled_without_path():
+    cache = SharedCache(path=None, size=1024, slot_size=128, ttl=60)
+
+    assert not cache.is_enabled
+    assert cache.stats == {'enabled': False}
+
+
+def test_shared_by_processes(path):
+    # Two instances opening the same file stand for two worker processes
+    first, second = open_cache(path), open_cache(path)
+
+    assert first.put(b'A', b'a', first.token(b'A'))
+
+    assert second.get(b'A') == b'a'
+    assert second.get(b'B') is None
+    assert second.stats['hits'] == 1
+    assert second.stats['hit_rate'] == 0.5
+
+
+def test_invalidated_by_other_process(path):
+    first, second = open_cache(path), open_cache(path)
+    first.put(b'A', b'a', first.token(b'A'))
+
+    second.invalidate(b'A')
+
+    assert first.get(b'A') is None
+
+
+def test_value_loaded_before_invalidation_rejected(path):
+    first, second = open_cache(path), open_cache(path)
+    token = first.token(b'A')
+
+    second.invalidate(b'A')
+
+    assert not first.put(b'A', b'stale', token)
+    assert first.get(b'A') is None
+
+
+def test_value_replaced(path):
+    cache = open_cache(path)
+    cache.put(b'A', b'a', cache.token(b'A'))
+    cache.put(b'A', b'b', cache.token(b'A'))
+
+    assert cache.get(b'A') == b'b'
+
+
+def test_oversized_value_not_cached(path):
+    cache = open_cache(path)
+
+    assert not cache.put(b'A', b'a' * (128 - SLOT_HEADER.size), cache.token(b'A'))
+    assert cache.get(b'A') is None
+
+
+def test_expired(path):
+    cache = open_cache(path, ttl=-1)
+    cache.put(b'A', b'a', cache.token(b'A'))
+
+    assert cache.get(b'A') is None
+
+
+def test_clear(path):
+    first, second = open_cache(path), open_cache(path)
+    first.put(b'A', b'a', first.token(b'A'))
+
+    second.clear()
+
+    assert first.get(b'A') is None
+
+
+def test_layout_change_uses_separate_file(path):
+    first = open_cache(path)
+    first.put(b'A', b'a', first.token(b'A'))
+
+    second = SharedCache(path=path, size=1024 * 1024, slot_size=256, ttl=60)
+
+    assert second.get(b'A') is None
+    assert second.put(b'A', b'b', second.token(b'A'))
+    # File mapped by the process with previous layout is left intact
+    assert first.get(b'A') == b'a'
+    assert open_cache(path).get(b'A') == b'a'
+
+
+def test_reinitialized_after_interrupted_initialization(path):
+    cache = open_cache(path)
+    cache.put(b'A', b'a', cache.token(b'A'))
+    cache._file.truncate(0)
+
+    cache = open_cache(path)
+
+    assert cache.get(b'A') is None
+    assert cache.put(b'A', b'a', cache.token(b'A'))
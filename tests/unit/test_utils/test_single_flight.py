@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.single_flight import SingleFlight
+
+
+def run_concurrently(single_flight: SingleFlight, function, callers: int) -> list:
+    """Starts callers, lets them all join the call and releases it"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_function():
+        started.set()
+        release.wait()
+        return function()
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(single_flight.do, 'A', blocking_function)]
+        started.wait()
+        futures += [pool.submit(single_flight.do, 'A', blocking_function) for _ in range(callers - 1)]
+
+        while single_flight.stats['coalesced'] < callers - 1:
+            time.sleep(0.001)
+        release.set()
+
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_concurrent_calls_coalesced():
+    single_flight = SingleFlight()
+    calls = []
+
+    results = run_concurrently(single_flight, lambda: calls.append(1) or 'a', callers=8)
+
+    assert results == ['a'] * 8
+    assert len(calls) == 1
+    assert single_flight.stats == {'fetches': 1, 'coalesced': 7, 'coalesced_rate': 7 / 8}
+
+
+def test_exception_shared():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('Failed')
+
+    results = run_concurrently(single_flight, fail, callers=4)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert single_flight.stats['fetches'] == 1
+
+
+def test_sequential_calls_not_coalesced():
+    single_flight = SingleFlight()
+
+    assert single_flight.do('A', lambda: 'a') == 'a'
+    assert single_flight.do('A', lambda: 'b') == 'b'
+    assert single_flight.stats['coalesced'] == 0
+
+
+def test_forget():
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(single_flight.do, 'A', lambda: release.wait() and 'old')
+
+        while single_flight.stats['fetches'] < 1:
+            time.sleep(0.001)
+        single_flight.forget('A')
+
+        assert single_flight.do('A', lambda: 'new') == 'new'
+        release.set()
+        assert future.result() == 'old'
+
+    assert single_flight.stats == {'fetches': 2, 'coalesced': 0, 'coalesced_rate': 0.0}
@@ -0,0 +1,235 @@
+import time
+
+import pytest
+
+from app.utils.write_behind import WriteBehindBuffer
+
+
+class FlushRecorder:
+    """Stands for the database, which records ids of flushed spill files together with the deltas"""
+
+    def __init__(self, failures: int = 0, find_failures: int = 0, committed_failures: int = 0):
+        self.failures = failures
+        self.find_failures = find_failures
+        # Failures after the transaction is committed, like a lost connection while committing
+        self.committed_failures = committed_failures
+        self.batches = []
+        self.segment_ids = set()
+
+    def __call__(self, deltas, segment_ids, released_segment_ids):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('Database is unavailable')
+
+        if set(segment_ids) & self.segment_ids:
+            raise RuntimeError('Duplicate key value violates unique constraint')
+
+        if deltas:
+            self.batches.append(dict(deltas))
+        self.segment_ids = (self.segment_ids - set(released_segment_ids)) | set(segment_ids)
+
+        if self.committed_failures:
+            self.committed_failures -= 1
+            raise RuntimeError('Connection is lost')
+
+    def find_flushed(self, segment_ids):
+        if self.find_failures:
+            self.find_failures -= 1
+            raise RuntimeError('Database is unavailable')
+
+        return self.segment_ids & set(segment_ids)
+
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture(scope='function')
+def make_buffer(tmp_path):
+    buffers = []
+
+    def make(recorder: FlushRecorder, interval: float = 60, max_entries: int = 1000) -> WriteBehindBuffer:
+        buffer = WriteBehindBuffer(recorder, recorder.find_flushed, interval, max_entries, str(tmp_path))
+        buffers.append(buffer)
+
+        return buffer
+
+    yield make
+
+    for buffer in buffers:
+        buffer.shutdown()
+
+
+def test_deltas_coalesced(make_buffer, tmp_path):
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder)
+
+    for key, amount in (('A', 1), ('B', 2), ('A', 3), ('A', -1.5)):
+        buffer.add(key, amount)
+
+    assert buffer.flush() == 2
+    assert recorder.batches == [{'A': 2.5, 'B': 2.0}]
+
+    metrics = buffer.metrics
+    assert metrics['flushed_entries'] == 4
+    assert metrics['flushed_keys'] == 2
+    assert metrics['coalescing_ratio'] == 2.0
+    assert metrics['last_flush_latency_ms'] is not None
+    assert metrics['pending_entries'] == 0
+
+
+def test_flush_on_max_entries(make_buffer):
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder, max_entries=3)
+
+    for _ in range(3):
+        buffer.add('A', 1)
+
+    wait_for(lambda: recorder.batches)
+    assert recorder.batches == [{'A': 3.0}]
+
+
+def test_flush_on_interval(make_buffer):
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder, interval=0.05)
+
+    buffer.add('A', 1)
+
+    wait_for(lambda: recorder.batches)
+    assert recorder.batches == [{'A': 1.0}]
+
+
+def test_failed_flush_keeps_deltas(make_buffer, tmp_path):
+    recorder = FlushRecorder(failures=1)
+    buffer = make_buffer(recorder)
+    buffer.add('A', 1)
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+
+    buffer.add('A', 2)
+
+    assert buffer.flush() == 1
+    assert recorder.batches == [{'A': 3.0}]
+    assert buffer.metrics['failed_flushes'] == 1
+    # Only the empty spill file of new deltas is left
+    assert [path.stat().st_size for path in tmp_path.iterdir()] == [0]
+
+
+def test_committed_failed_flush_not_repeated(make_buffer, tmp_path):
+    recorder = FlushRecorder(committed_failures=1)
+    buffer = make_buffer(recorder)
+    buffer.add('A', 1)
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+
+    assert buffer.metrics['pending_entries'] == 1
+
+    buffer.add('A', 2)
+
+    assert buffer.flush() == 1
+    assert recorder.batches == [{'A': 1.0}, {'A': 2.0}]
+    assert buffer.metrics['pending_entries'] == 0
+    # Only the empty spill file of new deltas is left
+    assert [path.stat().st_size for path in tmp_path.iterdir()] == [0]
+
+
+def test_committed_failed_shutdown_not_recovered(make_buffer, tmp_path):
+    recorder = FlushRecorder(committed_failures=1)
+    buffer = make_buffer(recorder)
+    buffer.add('A', 1)
+
+    buffer.shutdown()
+
+    buffer = make_buffer(recorder)
+    buffer.start()
+
+    assert buffer.flush() == 0
+    assert recorder.batches == [{'A': 1.0}]
+    # Spill file of the committed flush is removed, only the one of the new buffer is left
+    assert [path.stat().st_size for path in tmp_path.iterdir()] == [0]
+
+
+def test_deltas_of_dead_process_recovered(make_buffer, tmp_path):
+    (tmp_path / f'1-dead{WriteBehindBuffer.SPILL_SUFFIX}').write_text('A\t1.0\nB\t2.0\nA\t3.0\nB\t4')
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder)
+
+    buffer.start()
+
+    assert buffer.flush() == 2
+    # The last delta was cut by the crash
+    assert recorder.batches == [{'A': 4.0, 'B': 2.0}]
+    assert not (tmp_path / f'1-dead{WriteBehindBuffer.SPILL_SUFFIX}').exists()
+
+
+def test_flushed_deltas_of_dead_process_not_recovered(make_buffer, tmp_path):
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder)
+    buffer.add('A', 1)
+    buffer.flush()
+    # Process died after the deltas were committed, but before the spill file was removed
+    (tmp_path / f'1-dead{WriteBehindBuffer.SPILL_SUFFIX}').write_text('A\t1.0\n')
+    recorder.segment_ids.add('1-dead')
+
+    buffer = make_buffer(recorder)
+    buffer.add('B', 2)
+
+    assert buffer.flush() == 1
+    assert recorder.batches == [{'A': 1.0}, {'B': 2.0}]
+    assert not (tmp_path / f'1-dead{WriteBehindBuffer.SPILL_SUFFIX}').exists()
+    # Record of the removed file is dropped by the flush after its removal
+    assert '1-dead' not in recorder.segment_ids
+
+
+def test_recovery_retried(make_buffer, tmp_path):
+    (tmp_path / f'1-dead{WriteBehindBuffer.SPILL_SUFFIX}').write_text('A\t1.0\n')
+    recorder = FlushRecorder(find_failures=1)
+    buffer = make_buffer(recorder)
+    buffer.add('B', 2)
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+
+    assert buffer.flush() == 2
+    assert recorder.batches == [{'A': 1.0, 'B': 2.0}]
+
+
+def test_deltas_of_live_buffer_not_recovered(make_buffer):
+    live_recorder, recorder = FlushRecorder(), FlushRecorder()
+    make_buffer(live_recorder).add('A', 1)
+
+    buffer = make_buffer(recorder)
+    buffer.start()
+
+    assert buffer.flush() == 0
+    assert recorder.batches == []
+
+
+def test_shutdown_flushes(make_buffer, tmp_path):
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder)
+    buffer.add('A', 1)
+
+    buffer.shutdown()
+
+    assert recorder.batches == [{'A': 1.0}]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_shutdown_keeps_spill_file(make_buffer, tmp_path):
+    buffer = make_buffer(FlushRecorder(failures=1))
+    buffer.add('A', 1)
+
+    buffer.shutdown()
+
+    recorder = FlushRecorder()
+    buffer = make_buffer(recorder)
+    buffer.start()
+
+    assert buffer.flush() == 1
+    assert recorder.batches == [{'A': 1.0}]